@@ -0,0 +1,215 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Benchmarks of hot endpoints on a synthetic tree.
+
+Run with
+
+    pytest benchmarks/bench_endpoints.py --benchmark-json=benchmark.json
+
+The number of people in the tree can be set with the environment
+variable GRAMPSWEB_BENCHMARK_PEOPLE (default: 10000).
+"""
+
+import os
+import shutil
+import tempfile
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+from gramps_webapi.api.search import get_search_indexer
+from gramps_webapi.app import create_app
+from gramps_webapi.auth import add_user, user_db
+from gramps_webapi.auth.const import ROLE_OWNER
+from gramps_webapi.const import ENV_CONFIG_FILE, TEST_AUTH_CONFIG
+from gramps_webapi.dbmanager import WebDbManager
+from gramps_webapi.synthetic import generate_tree
+from tests import TEST_GRAMPSHOME
+
+pytest.importorskip("pytest_benchmark")
+
+BENCHMARK_PEOPLE = int(os.getenv("GRAMPSWEB_BENCHMARK_PEOPLE", "10000"))
+BENCHMARK_SEED = 42
+BASE_URL = "/api"
+
+
+class BenchmarkTree:
+    """Application with a synthetic tree and handles of sample objects."""
+
+    def __init__(self, base_dir: str) -> None:
+        """Create the application and generate the tree."""
+        with patch.dict("os.environ", {ENV_CONFIG_FILE: TEST_AUTH_CONFIG}):
+            self.app = create_app(
+                config={
+                    "TESTING": True,
+                    "RATELIMIT_ENABLED": False,
+                    "MEDIA_BASE_DIR": os.path.join(base_dir, "media"),
+                    "THUMBNAIL_STORE_DIR": os.path.join(base_dir, "thumbnails"),
+                    # measure the endpoints, not the response cache
+                    "REQUEST_CACHE_CONFIG": {"CACHE_TYPE": "NullCache"},
+                    "MEDIA_RESULT_CACHE_CONFIG": {"CACHE_TYPE": "NullCache"},
+                }
+            )
+        self.client = self.app.test_client()
+        self.db_manager = WebDbManager(name="benchmark", create_if_missing=True)
+        tree = self.db_manager.dirname
+        with self.app.app_context():
+            user_db.create_all()
+            add_user(name="owner", password="123", role=ROLE_OWNER, tree=tree)
+            db_handle = self.db_manager.get_db(readonly=False).db
+            try:
+                generate_tree(
+                    db_handle,
+                    BENCHMARK_PEOPLE,
+                    seed=BENCHMARK_SEED,
+                    media_dir=self.app.config["MEDIA_BASE_DIR"],
+                )
+                self._find_samples(db_handle)
+                get_search_indexer(tree).reindex_full(db_handle)
+            finally:
+                db_handle.close()
+        rv = self.client.post(
+            f"{BASE_URL}/token/", json={"username": "owner", "password": "123"}
+        )
+        self.headers = {"Authorization": f"Bearer {rv.json['access_token']}"}
+
+    def _find_samples(self, db_handle) -> None:
+        """Find a person with a grandparent and the media handles."""
+        for person in db_handle.iter_people():
+            grandparent = self._get_grandparent(db_handle, person)
+            if grandparent:
+                self.person_handle = person.handle
+                self.grandparent_handle = grandparent
+                self.surname = person.get_primary_name().get_surname()
+                break
+        self.media_handles = list(db_handle.get_media_handles())
+
+    @staticmethod
+    def _get_grandparent(db_handle, person):
+        """Return the handle of the paternal grandfather, if any."""
+        for _ in range(2):
+            family_handle = person.get_main_parents_family_handle()
+            if not family_handle:
+                return None
+            family = db_handle.get_family_from_handle(family_handle)
+            if not family.father_handle:
+                return None
+            person = db_handle.get_person_from_handle(family.father_handle)
+        return person.handle
+
+    def get(self, url: str):
+        """Make a GET request and check the response."""
+        rv = self.client.get(url, headers=self.headers)
+        assert rv.status_code == 200
+        return rv
+
+    def post(self, url: str, json=None):
+        """Make a POST request and check the response."""
+        rv = self.client.post(url, json=json, headers=self.headers)
+        assert rv.status_code in {200, 201}
+        return rv
+
+
+@pytest.fixture(scope="session")
+def tree():
+    """Generate the synthetic tree once per session."""
+    base_dir = tempfile.mkdtemp()
+    yield BenchmarkTree(base_dir)
+    shutil.rmtree(base_dir)
+    if TEST_GRAMPSHOME and os.path.isdir(TEST_GRAMPSHOME):
+        shutil.rmtree(TEST_GRAMPSHOME)
+
+
+def test_people_profile(benchmark, tree):
+    """Benchmark a page of people with profiles."""
+    benchmark(tree.get, f"{BASE_URL}/people/?profile=all&pagesize=20&page=5")
+
+
+def test_people_extend(benchmark, tree):
+    """Benchmark a page of people with all references extended."""
+    benchmark(tree.get, f"{BASE_URL}/people/?extend=all&pagesize=20&page=5")
+
+
+def test_search(benchmark, tree):
+    """Benchmark a full-text search."""
+    benchmark(tree.get, f"{BASE_URL}/search/?query={tree.surname}&pagesize=20")
+
+
+def test_timeline(benchmark, tree):
+    """Benchmark the timeline of a person with relatives."""
+    benchmark(
+        tree.get,
+        f"{BASE_URL}/people/{tree.person_handle}/timeline?ancestors=2&offspring=2",
+    )
+
+
+def test_relations(benchmark, tree):
+    """Benchmark the relationship calculator."""
+    benchmark(
+        tree.get,
+        f"{BASE_URL}/relations/{tree.person_handle}/{tree.grandparent_handle}",
+    )
+
+
+def test_facts(benchmark, tree):
+    """Benchmark the statistical facts of the tree."""
+    benchmark(tree.get, f"{BASE_URL}/facts/")
+
+
+def test_thumbnail_stored(benchmark, tree):
+    """Benchmark thumbnails served from the thumbnail store."""
+    handle = tree.media_handles[0]
+    benchmark(tree.get, f"{BASE_URL}/media/{handle}/thumbnail/200")
+
+
+def test_thumbnail_render(benchmark, tree):
+    """Benchmark rendering thumbnails with the thumbnail store disabled."""
+    handle = tree.media_handles[0]
+    with patch.dict(tree.app.config, {"THUMBNAIL_STORE_DIR": ""}):
+        benchmark(tree.get, f"{BASE_URL}/media/{handle}/thumbnail/200")
+
+
+def test_transaction(benchmark, tree):
+    """Benchmark a transaction adding a note."""
+
+    def make_transaction():
+        handle = str(uuid.uuid4())
+        obj = {
+            "_class": "Note",
+            "handle": handle,
+            "text": {"_class": "StyledText", "string": "Benchmark note."},
+        }
+        trans = [
+            {"type": "add", "_class": "Note", "handle": handle, "old": None, "new": obj}
+        ]
+        return (f"{BASE_URL}/transactions/",), {"json": trans}
+
+    benchmark.pedantic(tree.post, setup=make_transaction, rounds=20)
+
+
+def test_reindex_incremental(benchmark, tree):
+    """Benchmark an incremental search reindex."""
+    benchmark(tree.post, f"{BASE_URL}/search/index/?full=0")
+
+
+def test_reindex_full(benchmark, tree):
+    """Benchmark a full search reindex."""
+    benchmark.pedantic(tree.post, args=(f"{BASE_URL}/search/index/?full=1",), rounds=1)
@@ -41,7 +41,9 @@ from .app import create_app
 from .auth import add_user, delete_user, fill_tree, user_db
 from .const import ENV_CONFIG_FILE, TREE_MULTI
 from .dbmanager import WebDbManager
+from .synthetic import generate_tree
 from .translogger import TransLogger
+from .undodb import DbUndoSQLWeb
 from .undodb import migrate as migrate_undodb
 
 
@@ -130,12 +132,18 @@ def run(
 
     print("    Control+C to quit")
     if use_wsgi:
-        waitress.serve(
-            TransLogger(
+        # with the JSON access log, requests are logged by the app itself
+        application = (
+            app
+            if app.config["ACCESS_LOG"]
+            else TransLogger(
                 app,
                 setup_console_handler=False,
                 set_logger_level=debug_level,
-            ),
+            )
+        )
+        waitress.serve(
+            application,
             host=host,
             port=port,
             threads=max_workers,
@@ -364,6 +372,42 @@ def migrate_gramps_undodb(ctx):
         close_db(db_handle)
 
 
+@grampsdb.command("generate")
+@click.option("--people", help="Number of people", type=int, default=10000)
+@click.option("--seed", help="Seed of the random generator", type=int, default=0)
+@click.option(
+    "--media-dir",
+    help="Directory to write media files to. If not given, media objects "
+    "do not point to existing files.",
+    default=None,
+)
+@click.pass_context
+def generate_gramps_db(ctx, people, seed, media_dir):
+    """Fill the database with a synthetic tree, e.g. for benchmarks."""
+    app = ctx.obj["app"]
+    dbmgr = ctx.obj["db_manager"]
+    db_handle = dbmgr.get_db(readonly=False).db
+
+    progress = {"prev": 0}
+
+    def progress_cb(current: int, total: int) -> None:
+        progress_callback_count(app, current, total, prev=progress["prev"])
+        progress["prev"] = current
+
+    t0 = time.time()
+    try:
+        counts = generate_tree(
+            db_handle, people, seed=seed, media_dir=media_dir, progress_cb=progress_cb
+        )
+        if isinstance(db_handle.undodb, DbUndoSQLWeb):
+            db_handle.undodb.ensure_person_summary()
+    finally:
+        close_db(db_handle)
+    for obj_class, count in sorted(counts.items()):
+        app.logger.info(f"{obj_class}: {count}")
+    app.logger.info(f"Done generating the tree in {time.time() - t0:.0f} seconds.")
+
+
 if __name__ == "__main__":
     try:
         cli(
@@ -26,7 +26,7 @@ from webargs import fields, validate
 
 from ..const import API_PREFIX
 from .auth import jwt_required
-from .cache import thumbnail_cache_decorator
+from .file import set_thumbnail_cache_headers
 from .media import get_media_handler
 from .resources.base import Resource
 from .resources.bookmarks import (
@@ -46,7 +46,10 @@ from .resources.exporters import (
     ExporterResource,
     ExportersResource,
 )
-from .resources.face_detection import MediaFaceDetectionResource
+from .resources.face_detection import (
+    MediaFaceDetectionResource,
+    MediaFacesDetectionResource,
+)
 from .resources.facts import FactsResource
 from .resources.families import FamiliesResource, FamilyResource
 from .resources.file import MediaFileResource
@@ -61,14 +64,16 @@ from .resources.importers import (
 )
 from .resources.living import LivingDatesResource, LivingResource
 from .resources.media import MediaObjectResource, MediaObjectsResource
+from .resources.media_regions import MediaRegionsResource
 from .resources.metadata import MetadataResource
 from .resources.name_formats import NameFormatsResource
 from .resources.name_groups import NameGroupsResource
 from .resources.notes import NoteResource, NotesResource
 from .resources.objects import CreateObjectsResource, DeleteObjectsResource
-from .resources.ocr import MediaOcrResource
+from .resources.ocr import MediaOcrAllResource, MediaOcrResource
 from .resources.people import PeopleResource, PersonResource
 from .resources.places import PlaceResource, PlacesResource
+from .resources.profiles import ProfileResource
 from .resources.relations import RelationResource, RelationsResource
 from .resources.reports import (
     ReportFileResource,
@@ -355,6 +360,13 @@ register_endpt(
     "task",
 )
 
+# Profiles
+register_endpt(
+    ProfileResource,
+    "/profiles/<string:profile_id>",
+    "profile",
+)
+
 # Media files
 register_endpt(
     MediaFileResource,
@@ -363,18 +375,35 @@ register_endpt(
 )
 
 # Face detection
+register_endpt(
+    MediaFacesDetectionResource,
+    "/media/face_detection/",
+    "media_faces_detection",
+)
 register_endpt(
     MediaFaceDetectionResource,
     "/media/<string:handle>/face_detection",
     "media_face_detection",
 )
 # OCR
+register_endpt(
+    MediaOcrAllResource,
+    "/media/ocr/",
+    "media_ocr_all",
+)
 register_endpt(
     MediaOcrResource,
     "/media/<string:handle>/ocr",
     "media_ocr",
 )
 
+# Cropped regions of several media files
+register_endpt(
+    MediaRegionsResource,
+    "/media/regions/",
+    "media_regions",
+)
+
 # Media export
 register_endpt(
     MediaArchiveResource,
@@ -403,11 +432,11 @@ register_endpt(
 @use_args(
     {
         "square": fields.Boolean(load_default=False),
+        "checksum": fields.String(required=False),
         "jwt": fields.String(required=False),
     },
     location="query",
 )
-@thumbnail_cache_decorator
 def get_thumbnail(args, handle, size):
     """Get a file's thumbnail."""
     tree = get_tree_from_jwt()
@@ -415,7 +444,8 @@ def get_thumbnail(args, handle, size):
     handler = get_media_handler(db_handle, tree=tree).get_file_handler(
         handle, db_handle=db_handle
     )
-    return handler.send_thumbnail(size=size, square=args["square"])
+    res = handler.send_thumbnail(size=size, square=args["square"])
+    return set_thumbnail_cache_headers(res, handler, checksum=args.get("checksum"))
 
 
 @api_blueprint.route(
@@ -425,11 +455,11 @@ def get_thumbnail(args, handle, size):
 @use_args(
     {
         "square": fields.Boolean(load_default=False),
+        "checksum": fields.String(required=False),
         "jwt": fields.String(required=False),
     },
     location="query",
 )
-@thumbnail_cache_decorator
 def get_cropped(args, handle: str, x1: int, y1: int, x2: int, y2: int):
     """Get the thumbnail of a cropped file."""
     tree = get_tree_from_jwt()
@@ -437,7 +467,8 @@ def get_cropped(args, handle: str, x1: int, y1: int, x2: int, y2: int):
     handler = get_media_handler(db_handle, tree=tree).get_file_handler(
         handle, db_handle=db_handle
     )
-    return handler.send_cropped(x1=x1, y1=y1, x2=x2, y2=y2, square=args["square"])
+    res = handler.send_cropped(x1=x1, y1=y1, x2=x2, y2=y2, square=args["square"])
+    return set_thumbnail_cache_headers(res, handler, checksum=args.get("checksum"))
 
 
 @api_blueprint.route(
@@ -447,11 +478,11 @@ def get_cropped(args, handle: str, x1: int, y1: int, x2: int, y2: int):
 @use_args(
     {
         "square": fields.Boolean(load_default=False),
+        "checksum": fields.String(required=False),
         "jwt": fields.String(required=False),
     },
     location="query",
 )
-@thumbnail_cache_decorator
 def get_thumbnail_cropped(
     args, handle: str, x1: int, y1: int, x2: int, y2: int, size: int
 ):
@@ -461,6 +492,7 @@ def get_thumbnail_cropped(
     handler = get_media_handler(db_handle, tree=tree).get_file_handler(
         handle, db_handle=db_handle
     )
-    return handler.send_thumbnail_cropped(
+    res = handler.send_thumbnail_cropped(
         size=size, x1=x1, y1=y1, x2=x2, y2=y2, square=args["square"]
     )
+    return set_thumbnail_cache_headers(res, handler, checksum=args.get("checksum"))
@@ -0,0 +1,173 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Structured access log in JSON format."""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from flask import Flask, Response, g, request
+from flask_jwt_extended import get_jwt
+
+from .request_stats import get_request_stats
+
+ACCESS_LOGGER_NAME = "gramps_webapi.access"
+
+_lock = threading.Lock()
+# process ID and listener of the access log queue
+_listener: Optional[tuple[int, QueueListener]] = None
+
+
+class AccessLogQueueHandler(QueueHandler):
+    """Queue handler leaving the formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Pass the record unchanged.
+
+        Access log records carry their fields as a dictionary without
+        arguments or exception info, so they are safe to format later.
+        """
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Format access log records as JSON lines."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Format a record."""
+        time_utc = datetime.fromtimestamp(record.created, timezone.utc)
+        entry = {"time": time_utc.isoformat(timespec="milliseconds")}
+        entry.update(getattr(record, "access", {}))
+        return json.dumps(entry, separators=(",", ":"))
+
+
+def start_access_log(handler: logging.Handler) -> logging.Logger:
+    """Return the access logger, starting its queue listener if needed.
+
+    The listener thread writes the records with the given handler, so that
+    requests never wait for the log output. Since threads do not survive
+    forking, a new listener is started in every worker process.
+    """
+    global _listener
+    logger = logging.getLogger(ACCESS_LOGGER_NAME)
+    pid = os.getpid()
+    with _lock:
+        if _listener is not None and _listener[0] == pid:
+            return logger
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        handler.setFormatter(JsonFormatter())
+        listener = QueueListener(log_queue, handler)
+        listener.start()
+        atexit.register(listener.stop)
+        logger.handlers = [AccessLogQueueHandler(log_queue)]
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        _listener = (pid, listener)
+    return logger
+
+
+def stop_access_log() -> None:
+    """Stop the queue listener, writing all pending records."""
+    global _listener
+    with _lock:
+        if _listener is not None and _listener[0] == os.getpid():
+            _listener[1].stop()
+            atexit.unregister(_listener[1].stop)
+        _listener = None
+
+
+def _get_token_claims() -> Dict[str, Any]:
+    """Return the claims of the token verified in this request, if any."""
+    try:
+        return get_jwt()
+    except RuntimeError:
+        # no token was verified in this request
+        return {}
+
+
+def get_access_log_entry(response: Response) -> Dict[str, Any]:
+    """Return the access log fields of a finished request, except the duration."""
+    claims = _get_token_claims()
+    entry = {
+        "remote_addr": request.access_route[0] if request.access_route else None,
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "bytes": response.content_length,
+        "tree": claims.get("tree"),
+        "user": claims.get("sub"),
+        "user_agent": request.user_agent.string or None,
+    }
+    stats = get_request_stats()
+    if stats is not None:
+        entry["cache"] = stats.get_cache_status()
+    return entry
+
+
+def init_access_log(app: Flask) -> None:
+    """Register the hook logging every request as a JSON line.
+
+    The query string is not logged, as it may contain access tokens.
+    Successful requests to endpoints listed in `ACCESS_LOG_SAMPLE_RATES`
+    are only logged with the given probability.
+    """
+    if app.config["ACCESS_LOG_FILE"]:
+        handler: logging.Handler = logging.FileHandler(
+            app.config["ACCESS_LOG_FILE"], delay=True
+        )
+    else:
+        handler = logging.StreamHandler()
+    sample_rates = app.config["ACCESS_LOG_SAMPLE_RATES"]
+
+    @app.before_request
+    def start_access_log_timer() -> None:
+        g.access_log_start = time.perf_counter()
+
+    @app.after_request
+    def log_access(response: Response) -> Response:
+        start = g.pop("access_log_start", None)
+        if start is None:
+            return response
+        sample_rate = sample_rates.get(request.endpoint, 1)
+        if response.status_code < 400 and random.random() >= sample_rate:
+            return response
+        entry = get_access_log_entry(response)
+        if sample_rate < 1:
+            entry["sample_rate"] = sample_rate
+        logger = start_access_log(handler)
+
+        def write_entry() -> None:
+            # the duration includes sending a streamed response body
+            entry["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            logger.info("", extra={"access": entry})
+
+        response.call_on_close(write_entry)
+        return response
@@ -5,22 +5,40 @@ from __future__ import annotations
 import hashlib
 import os
 
-from flask import request
+from flask import has_app_context, request
 from flask_caching import Cache
-from gramps.gen.errors import HandleError
 
 from gramps_webapi.api.auth import has_permissions
-from gramps_webapi.api.util import (
-    abort_with_message,
-    get_db_handle,
-    get_db_manager,
-    get_tree_from_jwt,
-    get_tree_from_jwt_or_fail,
-)
+from gramps_webapi.api.request_stats import record_cache_lookup
+from gramps_webapi.api.util import get_db_manager, get_tree_from_jwt_or_fail
 from gramps_webapi.auth.const import PERM_VIEW_PRIVATE
+from gramps_webapi.util.metrics import CACHE_LOOKUPS
+
+
+class MetricsCache(Cache):
+    """Cache counting hits and misses for the metrics."""
+
+    def __init__(self, name: str, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.name = name
+
+    def get(self, *args, **kwargs):
+        value = super().get(*args, **kwargs)
+        CACHE_LOOKUPS.inc(cache=self.name, result="miss" if value is None else "hit")
+        record_cache_lookup(self.name, hit=value is not None)
+        return value
 
-thumbnail_cache = Cache()
-request_cache = Cache()
+
+request_cache = MetricsCache("request")
+# results of expensive media analyses (e.g. face detection) by file checksum
+media_result_cache = MetricsCache("media_result")
+
+# version of the face detection model, part of the cache key
+FACE_DETECTION_VERSION = "yunet_2023mar"
+
+# time in seconds after which cached tree metadata expire even if the
+# database did not change, since search indices are updated asynchronously
+TREE_METADATA_TIMEOUT = 300
 
 
 def get_db_last_change_timestamp(tree_id: str) -> int | float | None:
@@ -48,29 +66,6 @@ def _hash_request_args() -> str:
     return str(arg_hash.hexdigest())
 
 
-def make_cache_key_thumbnails(*args, **kwargs):
-    """Make a cache key for thumbnails."""
-    # hash query args except jwt
-    arg_hash = _hash_request_args()
-
-    # get media checksum
-    handle = kwargs["handle"]
-    tree = get_tree_from_jwt()
-    db_handle = get_db_handle()
-    try:
-        obj = db_handle.get_media_from_handle(handle)
-    except HandleError:
-        abort_with_message(404, f"Handle {handle} not found")
-    # checksum in the DB
-    checksum = obj.checksum
-
-    dbmgr = get_db_manager(tree)
-
-    cache_key = checksum + request.path + arg_hash + dbmgr.dirname
-
-    return cache_key
-
-
 def make_cache_key_request(*args, **kwargs):
     """Make a cache key for a base request."""
     # hash query args except jwt
@@ -104,6 +99,39 @@ def skip_cache_condition_request(*args, **kwargs) -> bool:
 request_cache_decorator = request_cache.cached(
     make_cache_key=make_cache_key_request, unless=skip_cache_condition_request
 )
-thumbnail_cache_decorator = thumbnail_cache.cached(
-    make_cache_key=make_cache_key_thumbnails
-)
+
+
+def make_cache_key_tree_metadata(tree_id: str, include_private: bool) -> str | None:
+    """Make a cache key for the object and search counts of a tree.
+
+    Returns None if the last change of the database cannot be determined.
+    """
+    db_timestamp = get_db_last_change_timestamp(tree_id)
+    if db_timestamp is None:
+        return None
+    return f"tree_metadata_{tree_id}_{db_timestamp}_{int(include_private)}"
+
+
+def make_cache_key_faces(checksum: str) -> str:
+    """Make a cache key for the face regions of a media file."""
+    return f"faces_{FACE_DETECTION_VERSION}_{checksum}"
+
+
+def make_cache_key_ocr(checksum: str, lang: str, output_format: str) -> str:
+    """Make a cache key for the OCR result of a media file."""
+    return f"ocr_{lang}_{output_format}_{checksum}"
+
+
+def make_cache_key_ocr_text(checksum: str) -> str:
+    """Make a cache key for the latest recognized plain text of a media file."""
+    return f"ocr_text_{checksum}"
+
+
+def get_cached_ocr_text(checksum: str) -> str | None:
+    """Get the latest recognized plain text of a media file, if any.
+
+    Returns None if there is no app context.
+    """
+    if not checksum or not has_app_context():
+        return None
+    return media_result_cache.get(make_cache_key_ocr_text(checksum))
@@ -0,0 +1,110 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Registry of server capabilities that are expensive to determine."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+import gramps_ql as gql
+import object_ql as oql
+import sifts
+from flask import current_app
+from gramps.gen.const import ENV
+
+from ..const import TREE_MULTI, VERSION
+
+# time in seconds after which probed capabilities are determined again
+CAPABILITIES_TTL = 3600
+
+_lock = threading.Lock()
+_probed: Dict[str, Tuple[Any, float]] = {}
+
+
+def _get_probed(name: str, probe) -> Any:
+    """Return the cached result of a probe, running it if expired."""
+    now = time.monotonic()
+    with _lock:
+        cached = _probed.get(name)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+    value = probe()
+    with _lock:
+        _probed[name] = (value, now + CAPABILITIES_TTL)
+    return value
+
+
+def clear_capabilities_cache() -> None:
+    """Clear the probed capabilities, so that they are determined again."""
+    with _lock:
+        _probed.clear()
+
+
+def _probe_ocr() -> Tuple[bool, List[str]]:
+    """Check whether tesseract is installed and which languages it supports.
+
+    Both calls spawn a tesseract subprocess.
+    """
+    import pytesseract
+
+    try:
+        pytesseract.get_tesseract_version()
+    except pytesseract.TesseractNotFoundError:
+        return False, []
+    languages = [lang for lang in pytesseract.get_languages() if lang != "osd"]
+    return True, languages
+
+
+def get_ocr_capabilities() -> Tuple[bool, List[str]]:
+    """Return whether OCR is available and the list of OCR languages."""
+    has_ocr, languages = _get_probed("ocr", _probe_ocr)
+    return has_ocr, list(languages)
+
+
+def get_server_capabilities() -> Dict[str, Any]:
+    """Return the capabilities of the server.
+
+    Only the OCR probe is cached, since the flags derived from the app
+    config are cheap to determine.
+    """
+    config = current_app.config
+    has_semantic_search = bool(config["VECTOR_EMBEDDING_MODEL"])
+    has_ocr, ocr_languages = get_ocr_capabilities()
+    return {
+        "multi_tree": config["TREE"] == TREE_MULTI,
+        "task_queue": bool(config["CELERY_CONFIG"]),
+        "ocr": has_ocr,
+        "ocr_languages": ocr_languages,
+        "semantic_search": has_semantic_search,
+        "chat": has_semantic_search and bool(config["LLM_MODEL"]),
+    }
+
+
+def get_versions() -> Dict[str, str]:
+    """Return the versions of Gramps and the libraries used by the server."""
+    return {
+        "gramps": ENV["VERSION"],
+        "gramps_webapi": VERSION,
+        "gramps_ql": gql.__version__,
+        "object_ql": oql.__version__,
+        "sifts": sifts.__version__,
+    }
@@ -0,0 +1,183 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025       David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Size-bounded on-disk key-value store for files."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from typing import BinaryIO, Callable, Optional
+
+# after eviction, the store is shrunk to this fraction of its maximum size
+EVICTION_TARGET = 0.9
+
+_lock = threading.Lock()
+# estimated total size in bytes of each store directory in this process
+_sizes: dict[str, int] = {}
+# background size scans and evictions in progress, by store directory
+_threads: dict[str, threading.Thread] = {}
+
+
+class DiskStore:
+    """File store bounded by its total size in bytes.
+
+    Files are named by the SHA-256 hash of their key, so keys can contain
+    arbitrary user-controlled values, and sharded into subdirectories by the
+    first characters of the hash. When the maximum size is exceeded, the
+    least recently used files are deleted. The access time is tracked via the
+    file modification time.
+
+    The maximum size is approximate: the total size is estimated by each
+    process separately and the files are scanned and evicted in a background
+    thread, so the store can temporarily exceed it, by up to a factor of the
+    number of processes writing to it.
+    """
+
+    # file name suffix of stored files
+    SUFFIX = ""
+
+    def __init__(self, base_dir: str, max_bytes: int) -> None:
+        """Initialize given a base directory and maximum size in bytes."""
+        self.base_dir = os.path.abspath(base_dir)
+        self.max_bytes = max_bytes
+
+    def _get_path(self, key: str) -> str:
+        """Get the file path for a key."""
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(
+            self.base_dir, digest[:2], digest[2:4], f"{digest}{self.SUFFIX}"
+        )
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """Open a stored file for reading or return None if not stored.
+
+        The open file stays readable even if it is evicted concurrently.
+        """
+        path = self._get_path(key)
+        try:
+            fobj = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            # mark as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return fobj
+
+    def exists(self, key: str) -> bool:
+        """Check whether a file is stored."""
+        return os.path.isfile(self._get_path(key))
+
+    def put(self, key: str, buffer: BinaryIO) -> None:
+        """Store a file atomically."""
+        self.put_from(key, lambda f: shutil.copyfileobj(buffer, f))
+
+    def put_from(self, key: str, write: Callable[[BinaryIO], None]) -> None:
+        """Store a file atomically, given a function writing it to a file object."""
+        path = self._get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self._add_size(os.path.getsize(path))
+
+    def _add_size(self, num_bytes: int) -> None:
+        """Update the estimated size and evict files in the background if needed.
+
+        The first call in a process scans the store to determine its size.
+        """
+        with _lock:
+            if self.base_dir in _threads:
+                # the size is determined by the running scan
+                return
+            if self.base_dir in _sizes:
+                _sizes[self.base_dir] += num_bytes
+                if _sizes[self.base_dir] <= self.max_bytes:
+                    return
+            thread = threading.Thread(target=self._scan_and_evict, daemon=True)
+            _threads[self.base_dir] = thread
+            thread.start()
+
+    def _scan_and_evict(self) -> None:
+        """Determine the total size and evict files if it exceeds the maximum."""
+        total: Optional[int] = None
+        try:
+            total = self._evict()
+        finally:
+            with _lock:
+                if total is not None:
+                    _sizes[self.base_dir] = total
+                del _threads[self.base_dir]
+
+    def wait(self) -> None:
+        """Wait for a background size scan or eviction to finish."""
+        with _lock:
+            thread = _threads.get(self.base_dir)
+        if thread is not None:
+            thread.join()
+
+    def _iter_files(self):
+        """Iterate over (path, size, modification time) of all stored files."""
+        for root, _, files in os.walk(self.base_dir):
+            for name in files:
+                if name.endswith(".tmp") or not name.endswith(self.SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _get_total_size(self) -> int:
+        """Get the actual total size in bytes of the store."""
+        return sum(size for _, size, _ in self._iter_files())
+
+    def _evict(self) -> int:
+        """Delete least recently used files if needed and return the total size."""
+        files = sorted(self._iter_files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        if total <= self.max_bytes:
+            return total
+        target = self.max_bytes * EVICTION_TARGET
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        return total
+
+    def clear(self) -> None:
+        """Delete all stored files."""
+        with _lock:
+            shutil.rmtree(self.base_dir, ignore_errors=True)
+            _sizes[self.base_dir] = 0
@@ -21,32 +21,73 @@
 
 import hashlib
 import os
+import shutil
+import tempfile
+import uuid
 from io import BytesIO
 from pathlib import Path
-from typing import Any, BinaryIO, Optional, Tuple, Union
-
-import pytesseract
-from flask import jsonify, make_response, send_file, send_from_directory
+from typing import Any, BinaryIO, Callable, Optional, Sequence, Tuple, Union
+from urllib.parse import quote
+
+from flask import (
+    Response,
+    current_app,
+    jsonify,
+    make_response,
+    request,
+    send_file,
+    send_from_directory,
+)
 from gramps.gen.db.base import DbReadBase
 from gramps.gen.errors import HandleError
 from gramps.gen.lib import Media
 from PIL import Image
-from werkzeug.datastructures import FileStorage
 
-from gramps_webapi.const import MIME_JPEG
+from gramps_webapi.const import (
+    MIME_JPEG,
+    MIME_PDF,
+    SENDFILE_X_ACCEL_REDIRECT,
+    SENDFILE_X_SENDFILE,
+)
 
 from ..types import FilenameOrPath
-from .image import LocalFileThumbnailHandler, detect_faces
-from .util import abort_with_message
+from ..util.metrics import CACHE_LOOKUPS
+from .cache import (
+    make_cache_key_faces,
+    make_cache_key_ocr,
+    make_cache_key_ocr_text,
+    media_result_cache,
+)
+from .capabilities import get_ocr_capabilities
+from .image import (
+    CropRegion,
+    LocalFileThumbnailHandler,
+    ThumbnailHandlerBase,
+    detect_faces,
+    save_image_buffer,
+)
+from .request_stats import record_cache_lookup
+from .thumbnail_store import ThumbnailStore, get_thumbnail_store
+from .util import abort_with_message, get_config
+
+# maximum age in seconds of thumbnails requested with the file checksum
+THUMBNAIL_MAX_AGE = 365 * 24 * 60 * 60
+
+# size of the chunks read from uploaded files
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# uploaded files larger than this are spooled to disk instead of memory
+UPLOAD_SPOOL_SIZE = 8 * 1024 * 1024
 
 
 class FileHandler:
     """Generic handler for a single media file."""
 
-    def __init__(self, handle, db_handle: DbReadBase):
+    def __init__(self, handle, db_handle: DbReadBase, tree: Optional[str] = None):
         """Initialize self."""
         self.db_handle = db_handle
         self.handle = handle
+        self.tree = tree
         self.media = self._get_media_object()
         self.mime = self.media.mime
         self.path = self.media.path
@@ -76,44 +117,203 @@ class FileHandler:
         """Send media file to client."""
         raise NotImplementedError
 
+    def get_thumbnail_handler(self) -> ThumbnailHandlerBase:
+        """Return a thumbnail handler for the file."""
+        raise NotImplementedError
+
+    def check_access(self) -> None:
+        """Abort if the file must not be accessed."""
+
+    def _make_thumbnail_key(self, **options) -> str:
+        """Make the thumbnail store key of a rendering of the file."""
+        return ThumbnailStore.make_key(
+            self.checksum, tree=self.tree or "", path=self.path, **options
+        )
+
+    def _send_image(self, key: str, render: Callable[[], BinaryIO]):
+        """Send an image from the thumbnail store, rendering it if needed."""
+        self.check_access()
+        store = get_thumbnail_store()
+        if store is None or not self.checksum:
+            return send_file(render(), mimetype=MIME_JPEG)
+        fobj = store.open(key)
+        CACHE_LOOKUPS.inc(cache="thumbnail", result="miss" if fobj is None else "hit")
+        record_cache_lookup("thumbnail", hit=fobj is not None)
+        if fobj is None:
+            store.put(key, render())
+            fobj = store.open(key)
+        if fobj is None:
+            # evicted in the meantime
+            fobj = render()
+        return send_file(fobj, mimetype=MIME_JPEG, etag=key, conditional=True)
+
     def send_cropped(self, x1: int, y1: int, x2: int, y2: int, square: bool = False):
         """Send cropped media file to client."""
-        raise NotImplementedError
+        key = self._make_thumbnail_key(square=square, crop=(x1, y1, x2, y2))
+        return self._send_image(
+            key,
+            lambda: self.get_thumbnail_handler().get_cropped(
+                x1=x1, y1=y1, x2=x2, y2=y2, square=square
+            ),
+        )
 
     def send_thumbnail(self, size: int, square: bool = False):
         """Send thumbnail of image."""
-        raise NotImplementedError
+        key = self._make_thumbnail_key(size=size, square=square)
+        return self._send_image(
+            key,
+            lambda: self.get_thumbnail_handler().get_thumbnail(
+                size=size, square=square
+            ),
+        )
 
     def send_thumbnail_cropped(
         self, size: int, x1: int, y1: int, x2: int, y2: int, square: bool = False
     ):
         """Send thumbnail of cropped image."""
-        raise NotImplementedError
+        key = self._make_thumbnail_key(size=size, square=square, crop=(x1, y1, x2, y2))
+        return self._send_image(
+            key,
+            lambda: self.get_thumbnail_handler().get_thumbnail_cropped(
+                size=size, x1=x1, y1=y1, x2=x2, y2=y2, square=square
+            ),
+        )
+
+    def store_thumbnail(self, size: int, square: bool = False) -> bool:
+        """Render a thumbnail into the thumbnail store unless already stored.
+
+        Returns True if a thumbnail was rendered.
+        """
+        store = get_thumbnail_store()
+        if store is None or not self.checksum:
+            return False
+        self.check_access()
+        key = self._make_thumbnail_key(size=size, square=square)
+        if store.exists(key):
+            return False
+        store.put(
+            key, self.get_thumbnail_handler().get_thumbnail(size=size, square=square)
+        )
+        return True
+
+    def get_regions(self, regions: Sequence[CropRegion]) -> list[BinaryIO]:
+        """Return JPEG images of several cropped regions of the file.
+
+        Regions found in the thumbnail store are read from there, all others
+        are rendered from a single decode of the original file.
+        """
+        self.check_access()
+        store = get_thumbnail_store() if self.checksum else None
+        keys = [
+            self._make_thumbnail_key(
+                size=region.size,
+                square=region.square,
+                crop=(region.x1, region.y1, region.x2, region.y2),
+            )
+            for region in regions
+        ]
+        results: list[Optional[BinaryIO]] = [
+            store.open(key) if store else None for key in keys
+        ]
+        missing = [index for index, result in enumerate(results) if result is None]
+        if store:
+            CACHE_LOOKUPS.inc(len(keys) - len(missing), cache="thumbnail", result="hit")
+            CACHE_LOOKUPS.inc(len(missing), cache="thumbnail", result="miss")
+            record_cache_lookup("thumbnail", True, len(keys) - len(missing))
+            record_cache_lookup("thumbnail", False, len(missing))
+        if missing:
+            images = self.get_thumbnail_handler().get_regions(
+                [regions[index] for index in missing]
+            )
+            for index, image in zip(missing, images):
+                buffer = save_image_buffer(image)
+                if store:
+                    store.put(keys[index], buffer)
+                    buffer.seek(0)
+                results[index] = buffer
+        return [result for result in results if result is not None]
+
+    def get_cached_faces(self) -> Optional[list]:
+        """Return the cached face regions or None if not cached."""
+        if not self.mime.startswith("image"):
+            return []
+        if not self.checksum:
+            return None
+        return media_result_cache.get(make_cache_key_faces(self.checksum))
+
+    def set_cached_faces(self, regions: list) -> None:
+        """Cache the face regions of the file."""
+        if self.checksum:
+            media_result_cache.set(make_cache_key_faces(self.checksum), regions)
+
+    def get_faces(self) -> list:
+        """Return regions containing faces.
+
+        Results are cached by file checksum. Raises `ImportError` if OpenCV
+        is not installed.
+        """
+        regions = self.get_cached_faces()
+        if regions is None:
+            regions = [list(region) for region in detect_faces(self.get_file_object())]
+            self.set_cached_faces(regions)
+        return regions
 
     def get_face_regions(self, etag: Optional[str] = None):
         """Return regions containing faces."""
-        if self.mime.startswith("image"):
-            fobj = self.get_file_object()
-            try:
-                regions = detect_faces(fobj)
-            except ImportError:
-                # numpy or opencv missing
-                abort_with_message(501, "OpenCV is not installed")
-        else:
-            regions = []
+        try:
+            regions = self.get_faces()
+        except ImportError:
+            # numpy or opencv missing
+            abort_with_message(501, "OpenCV is not installed")
         res = make_response(jsonify(regions))
         if etag:
             res.headers["ETag"] = etag
         return res
 
-    def get_ocr(self, lang: str, output_format: str = "string"):
-        """Return regions containing faces."""
-        if not self.mime.startswith("image"):
-            return {}
-        try:
-            pytesseract.get_tesseract_version()
-        except pytesseract.TesseractNotFoundError:
-            abort_with_message(501, "Tesseract is not installed")
+    def supports_ocr(self, output_format: str = "string") -> bool:
+        """Check whether text recognition is supported for the file."""
+        if self.mime.startswith("image"):
+            return True
+        # PDF files are only supported for plain text output
+        return self.mime == MIME_PDF and output_format == "string"
+
+    def get_cached_ocr(self, lang: str, output_format: str = "string") -> Any:
+        """Return the cached OCR result or None if not cached."""
+        if not self.checksum:
+            return None
+        return media_result_cache.get(
+            make_cache_key_ocr(self.checksum, lang, output_format)
+        )
+
+    def set_cached_ocr(self, lang: str, output_format: str, data: Any) -> None:
+        """Cache an OCR result of the file."""
+        if not self.checksum:
+            return
+        media_result_cache.set(
+            make_cache_key_ocr(self.checksum, lang, output_format), data
+        )
+        if output_format == "string":
+            media_result_cache.set(make_cache_key_ocr_text(self.checksum), data)
+
+    def run_ocr(
+        self,
+        lang: str,
+        output_format: str = "string",
+        max_pdf_pages: Optional[int] = None,
+    ) -> Any:
+        """Run text recognition on the file without using the cache.
+
+        For PDF files, only the first `max_pdf_pages` pages are recognized
+        if given.
+        """
+        import pytesseract
+
+        if self.mime == MIME_PDF:
+            texts = self.get_thumbnail_handler().map_pdf_pages(
+                lambda page: pytesseract.image_to_string(page, lang=lang),
+                max_pages=max_pdf_pages,
+            )
+            return "".join(texts)
         fobj = self.get_file_object()
         image = Image.open(fobj)
         if output_format == "string":
@@ -130,13 +330,34 @@ class FileHandler:
             raise ValueError(f"Unknown output format: {output_format}")
         return data
 
+    def get_ocr(self, lang: str, output_format: str = "string"):
+        """Return the recognized text of the file.
+
+        Results are cached by file checksum, language, and output format.
+        """
+        if not self.supports_ocr(output_format):
+            return {}
+        data = self.get_cached_ocr(lang, output_format)
+        if data is not None:
+            return data
+        has_ocr, _ = get_ocr_capabilities()
+        if not has_ocr:
+            abort_with_message(501, "Tesseract is not installed")
+        data = self.run_ocr(
+            lang, output_format, max_pdf_pages=get_config("OCR_MAX_PDF_PAGES")
+        )
+        self.set_cached_ocr(lang, output_format, data)
+        return data
+
 
 class LocalFileHandler(FileHandler):
     """Handler for local files."""
 
-    def __init__(self, handle, base_dir, db_handle: DbReadBase):
+    def __init__(
+        self, handle, base_dir, db_handle: DbReadBase, tree: Optional[str] = None
+    ):
         """Initialize self given a handle and media base directory."""
-        super().__init__(handle, db_handle=db_handle)
+        super().__init__(handle, db_handle=db_handle, tree=tree)
         self.base_dir = base_dir
         if not os.path.isdir(self.base_dir):
             raise ValueError(f"Directory {self.base_dir} does not exist")
@@ -157,6 +378,13 @@ class LocalFileHandler(FileHandler):
         if base_dir not in file_path.parents:
             raise ValueError(f"File {file_path} is not within the base directory.")
 
+    def check_access(self) -> None:
+        """Abort if the file is not within the base dir."""
+        try:
+            self._check_path()
+        except ValueError:
+            abort_with_message(403, "File access not allowed")
+
     def file_exists(self) -> bool:
         """Check if the file exists."""
         try:
@@ -192,65 +420,116 @@ class LocalFileHandler(FileHandler):
     def send_file(
         self, etag: Optional[str] = None, download: bool = False, filename: str = ""
     ):
-        """Send media file to client."""
-        res = make_response(
-            send_from_directory(
-                self.base_dir,
-                self.path_rel,
-                mimetype=self.mime,
-                as_attachment=download,
-                download_name=filename,
+        """Send media file to client.
+
+        If configured, sending the file is delegated to the web server.
+        Otherwise, conditional and range requests are handled here.
+        """
+        mode = current_app.config.get("MEDIA_SENDFILE_MODE")
+        if mode:
+            res = self._send_file_offloaded(
+                mode, etag=etag, download=download, filename=filename
             )
+            if res is not None:
+                return res
+        return send_from_directory(
+            self.base_dir,
+            self.path_rel,
+            mimetype=self.mime,
+            as_attachment=download,
+            download_name=filename,
+            etag=etag or True,
+            conditional=True,
         )
-        if etag:
-            res.headers["ETag"] = etag
-        return res
 
-    def send_cropped(self, x1: int, y1: int, x2: int, y2: int, square: bool = False):
-        """Send cropped image."""
-        try:
-            self._check_path()
-        except ValueError:
-            abort_with_message(403, "File access not allowed")
-        thumb = LocalFileThumbnailHandler(self.path_abs, self.mime)
-        buffer = thumb.get_cropped(x1=x1, y1=y1, x2=x2, y2=y2, square=square)
-        return send_file(buffer, mimetype=MIME_JPEG)
+    def _send_file_offloaded(
+        self, mode: str, etag: Optional[str], download: bool, filename: str
+    ) -> Optional[Response]:
+        """Return an empty response telling the web server to send the file.
 
-    def send_thumbnail(self, size: int, square: bool = False):
-        """Send thumbnail of image."""
+        Returns None if the file cannot be mapped to the internal location,
+        so that it is sent by the application instead.
+        """
         try:
             self._check_path()
         except ValueError:
             abort_with_message(403, "File access not allowed")
-        thumb = LocalFileThumbnailHandler(self.path_abs, self.mime)
-        buffer = thumb.get_thumbnail(size=size, square=square)
-        return send_file(buffer, mimetype=MIME_JPEG)
+        if not os.path.isfile(self.path_abs):
+            abort_with_message(404, "Media file not found")
+        res = Response(mimetype=self.mime)
+        if mode == SENDFILE_X_ACCEL_REDIRECT:
+            # the internal location maps to the configured media base directory,
+            # which is the parent of the tree directories if prefixed by tree
+            root_dir = current_app.config.get("MEDIA_BASE_DIR") or self.base_dir
+            rel_path = os.path.relpath(
+                os.path.abspath(self.path_abs), os.path.abspath(root_dir)
+            )
+            if rel_path.startswith(os.pardir):
+                return None
+            prefix = current_app.config["MEDIA_SENDFILE_PREFIX"].rstrip("/")
+            uri = f"{prefix}/{Path(rel_path).as_posix()}"
+            res.headers["X-Accel-Redirect"] = quote(uri)
+        else:
+            # the mode is validated when creating the app
+            res.headers["X-Sendfile"] = os.path.abspath(self.path_abs)
+        if download:
+            try:
+                filename.encode("ascii")
+                params = {"filename": filename}
+            except UnicodeEncodeError:
+                params = {"filename*": f"UTF-8''{quote(filename)}"}
+            res.headers.set("Content-Disposition", "attachment", **params)
+        if etag:
+            res.set_etag(etag)
+        return res.make_conditional(request)
 
-    def send_thumbnail_cropped(
-        self, size: int, x1: int, y1: int, x2: int, y2: int, square: bool = False
-    ):
-        """Send thumbnail of cropped image."""
-        try:
-            self._check_path()
-        except ValueError:
-            abort_with_message(403, "File access not allowed")
-        thumb = LocalFileThumbnailHandler(self.path_abs, self.mime)
-        buffer = thumb.get_thumbnail_cropped(
-            size=size, x1=x1, y1=y1, x2=x2, y2=y2, square=square
-        )
-        return send_file(buffer, mimetype=MIME_JPEG)
+    def get_thumbnail_handler(self) -> ThumbnailHandlerBase:
+        """Return a thumbnail handler for the file."""
+        self.check_access()
+        return LocalFileThumbnailHandler(self.path_abs, self.mime)
+
+
+def set_thumbnail_cache_headers(
+    response: Response, handler: FileHandler, checksum: Optional[str] = None
+) -> Response:
+    """Set the caching headers of a thumbnail response.
+
+    If the request specified the checksum of the current file, the URL is
+    content-addressed and the response can be cached indefinitely.
+    """
+    response.cache_control.private = True
+    if checksum and checksum == handler.checksum:
+        response.cache_control.max_age = THUMBNAIL_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
 
 
 def upload_file_local(
     base_dir: FilenameOrPath, rel_path: FilenameOrPath, stream: BinaryIO
 ) -> None:
-    """Upload a file from a stream, returning the file path."""
+    """Upload a file from a stream, returning the file path.
+
+    The file is written to a temporary file first and then renamed into
+    place, so that it never appears partially written.
+    """
     path = os.path.join(base_dir, rel_path)
     path_dir = os.path.dirname(path)
     # create folders if necessary
     os.makedirs(path_dir, exist_ok=True)
-    fs = FileStorage(stream)
-    fs.save(path)
+    tmp_path = os.path.join(
+        path_dir, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp"
+    )
+    # unlike mkstemp, this respects the umask like a regular file would
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            shutil.copyfileobj(stream, f, UPLOAD_CHUNK_SIZE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
 
 
 def get_checksum(fp) -> str:
@@ -269,13 +548,24 @@ def get_checksum(fp) -> str:
 
 
 def process_file(stream: Union[Any, BinaryIO]) -> Tuple[str, int, BinaryIO]:
-    """Process a file from a stream that has a read method."""
-    fp = BytesIO()
-    fp.write(stream.read())
-    fp.seek(0)
-    checksum = get_checksum(fp)
-    size = fp.tell()
-    if not checksum:
+    """Process a file from a stream that has a read method.
+
+    The stream is copied in chunks to a temporary file that is only spooled
+    to disk when it gets large, computing the checksum and size on the way.
+    """
+    md5 = hashlib.md5()
+    size = 0
+    fp = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE)
+    try:
+        while True:
+            buf = stream.read(UPLOAD_CHUNK_SIZE)
+            if not buf:
+                break
+            md5.update(buf)
+            fp.write(buf)
+            size += len(buf)
+    except (IOError, UnicodeEncodeError):
+        fp.close()
         raise IOError("Unable to process file.")
     fp.seek(0)
-    return checksum, size, fp
+    return md5.hexdigest(), size, fp  # type: ignore[return-value]
@@ -0,0 +1,189 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025       David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""A proxy database class acting as an identity map for primary objects."""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Iterable
+
+import gramps.gen.lib
+from gramps.gen.db import DbReadBase
+from gramps.gen.db.dbconst import CLASS_TO_KEY_MAP, KEY_TO_NAME_MAP
+from gramps.gen.errors import HandleError
+from gramps.gen.lib import (
+    Citation,
+    Event,
+    Family,
+    Media,
+    Note,
+    Person,
+    Place,
+    Repository,
+    Source,
+    Tag,
+)
+from gramps.gen.proxy.proxybase import ProxyDbBase
+from gramps.plugins.db.dbapi.dbapi import DBAPI
+
+# maximum number of handles per `SELECT ... WHERE handle IN (...)` query
+PREFETCH_BATCH_SIZE = 500
+
+
+class IdentityMapProxy(ProxyDbBase):
+    """Proxy database class caching objects fetched by handle.
+
+    Every object fetched by handle is unserialized only once and the same
+    instance is returned on subsequent lookups. The proxy is meant to be
+    short-lived, e.g. for the duration of a request or a task, since
+    changes to the underlying database are not picked up.
+    """
+
+    def __init__(self, db: DbReadBase) -> None:
+        """Initialize the proxy database."""
+        super().__init__(db)
+        self.db: DbReadBase  # for type checker
+        self._cache: dict[str, dict[str, Any]] = {}
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+
+    def _get_from_handle(
+        self, class_name: str, handle: str, query_method: Callable[[str], Any]
+    ) -> Any:
+        """Get an object from the cache or the database."""
+        class_cache = self._cache.setdefault(class_name, {})
+        if handle in class_cache:
+            self.hits[class_name] = self.hits.get(class_name, 0) + 1
+            return class_cache[handle]
+        self.misses[class_name] = self.misses.get(class_name, 0) + 1
+        # a HandleError is propagated and the handle is not cached
+        obj = query_method(handle)
+        class_cache[handle] = obj
+        return obj
+
+    def prefetch(self, class_name: str, handles: Iterable[str]) -> list[Any]:
+        """Load objects of one class into the cache and return them.
+
+        On DB-API backends, uncached objects are fetched in batches with a
+        single query per batch. Otherwise, they are fetched one by one.
+        Handles that do not exist are skipped.
+        """
+        class_cache = self._cache.setdefault(class_name, {})
+        # remove duplicates and empty handles but keep the order
+        handles = [handle for handle in dict.fromkeys(handles) if handle]
+        missing = [handle for handle in handles if handle not in class_cache]
+        if missing:
+            if isinstance(self.db, DBAPI):
+                for i in range(0, len(missing), PREFETCH_BATCH_SIZE):
+                    batch = missing[i : i + PREFETCH_BATCH_SIZE]
+                    class_cache.update(self._get_batch_from_handles(class_name, batch))
+            else:
+                query_method = self.db.method("get_%s_from_handle", class_name)
+                assert query_method is not None  # type checker
+                for handle in missing:
+                    try:
+                        class_cache[handle] = query_method(handle)
+                    except HandleError:
+                        pass
+            self.misses[class_name] = self.misses.get(class_name, 0) + len(missing)
+        return [
+            class_cache[handle]
+            for handle in handles
+            if class_cache.get(handle) is not None
+        ]
+
+    def _get_batch_from_handles(
+        self, class_name: str, handles: list[str]
+    ) -> dict[str, Any]:
+        """Fetch several objects of one class with a single query."""
+        table = KEY_TO_NAME_MAP[CLASS_TO_KEY_MAP[class_name]]
+        obj_class = getattr(gramps.gen.lib, class_name)
+        serializer = self.db.serializer
+        placeholders = ", ".join("?" for _ in handles)
+        self.db.dbapi.execute(
+            f"SELECT handle, {serializer.data_field} FROM {table} "
+            f"WHERE handle IN ({placeholders})",
+            handles,
+        )
+        return {
+            handle: serializer.data_to_object(
+                serializer.string_to_data(data), obj_class
+            )
+            for handle, data in self.db.dbapi.fetchall()
+        }
+
+    def get_stats(self) -> dict[str, dict[str, int]]:
+        """Return the number of cache hits and misses per object class."""
+        class_names = sorted(set(self.hits) | set(self.misses))
+        return {
+            class_name: {
+                "hits": self.hits.get(class_name, 0),
+                "misses": self.misses.get(class_name, 0),
+            }
+            for class_name in class_names
+        }
+
+    def get_person_from_handle(self, handle: str) -> Person:
+        """Get a person from the cache or the database."""
+        return self._get_from_handle("Person", handle, self.db.get_person_from_handle)
+
+    def get_family_from_handle(self, handle: str) -> Family:
+        """Get a family from the cache or the database."""
+        return self._get_from_handle("Family", handle, self.db.get_family_from_handle)
+
+    def get_event_from_handle(self, handle: str) -> Event:
+        """Get an event from the cache or the database."""
+        return self._get_from_handle("Event", handle, self.db.get_event_from_handle)
+
+    def get_place_from_handle(self, handle: str) -> Place:
+        """Get a place from the cache or the database."""
+        return self._get_from_handle("Place", handle, self.db.get_place_from_handle)
+
+    def get_source_from_handle(self, handle: str) -> Source:
+        """Get a source from the cache or the database."""
+        return self._get_from_handle("Source", handle, self.db.get_source_from_handle)
+
+    def get_citation_from_handle(self, handle: str) -> Citation:
+        """Get a citation from the cache or the database."""
+        return self._get_from_handle(
+            "Citation", handle, self.db.get_citation_from_handle
+        )
+
+    def get_repository_from_handle(self, handle: str) -> Repository:
+        """Get a repository from the cache or the database."""
+        return self._get_from_handle(
+            "Repository", handle, self.db.get_repository_from_handle
+        )
+
+    def get_media_from_handle(self, handle: str) -> Media:
+        """Get a media object from the cache or the database."""
+        return self._get_from_handle("Media", handle, self.db.get_media_from_handle)
+
+    def get_note_from_handle(self, handle: str) -> Note:
+        """Get a note from the cache or the database."""
+        return self._get_from_handle("Note", handle, self.db.get_note_from_handle)
+
+    def get_tag_from_handle(self, handle: str) -> Tag:
+        """Get a tag from the cache or the database."""
+        return self._get_from_handle("Tag", handle, self.db.get_tag_from_handle)
+
+    def find_backlink_handles(self, handle, include_classes=None):
+        """Find all objects that hold a reference to the object handle."""
+        return self.db.find_backlink_handles(handle, include_classes)
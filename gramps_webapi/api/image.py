@@ -19,17 +19,20 @@
 
 """Image utilities."""
 
+from __future__ import annotations
+
 import io
+import math
 import os
 import shutil
 import tempfile
+import threading
 from pathlib import Path
-from typing import BinaryIO, Callable
+from typing import Any, BinaryIO, Callable, NamedTuple, Sequence
 
-import ffmpeg
-from pdf2image import convert_from_path
 from PIL import Image, ImageOps
 from PIL.Image import Image as ImageType
+from PIL.JpegImagePlugin import JpegImageFile
 from pkg_resources import resource_filename  # type: ignore[import-untyped]
 
 from gramps_webapi.const import MIME_PDF
@@ -60,6 +63,29 @@ def image_thumbnail(image: ImageType, size: int, square: bool = False) -> ImageT
     return img
 
 
+def image_draft(image: ImageType, size: tuple[int, int]) -> ImageType:
+    """Reduce the decoded resolution of an image that is at least `size`.
+
+    For JPEG images, the decoder is configured to decode directly at the
+    smallest scale (1/2, 1/4, or 1/8) that is still at least `size`, so the
+    full-resolution image is never held in memory. Other formats are reduced
+    by an integer factor right after decoding, before any further processing.
+
+    Must be called before the image data is loaded. EXIF metadata is kept, so
+    the orientation can still be applied to the reduced image.
+    """
+    width, height = size
+    if width <= 0 or height <= 0:
+        return image
+    if isinstance(image, JpegImageFile):
+        image.draft(None, size)  # type: ignore[arg-type]
+        return image
+    factor = min(image.width // width, image.height // height)
+    if factor < 2:
+        return image
+    return image.reduce(factor)
+
+
 def image_square(image: ImageType) -> ImageType:
     """Crop an image to a centered square."""
     size = min(image.size)
@@ -86,6 +112,48 @@ def crop_image(image: ImageType, x1: int, y1: int, x2: int, y2: int) -> ImageTyp
     return image.crop((x1_abs, y1_abs, x2_abs, y2_abs))
 
 
+class CropRegion(NamedTuple):
+    """A region of an image to be cropped and optionally thumbnailed.
+
+    The coordinates are in percent. If `size` is None, the cropped region is
+    returned at full resolution.
+    """
+
+    x1: int
+    y1: int
+    x2: int
+    y2: int
+    size: int | None = None
+    square: bool = False
+
+
+def image_sprite(
+    images: Sequence[ImageType],
+) -> tuple[ImageType, list[tuple[int, int, int, int]]]:
+    """Combine images into a sprite sheet.
+
+    The images are placed on a grid with cells as large as the largest image.
+    Returns the sprite sheet and, for each image, its box in the sprite sheet
+    as (left, top, width, height).
+    """
+    if not images:
+        raise ValueError("No images given")
+    columns = math.ceil(math.sqrt(len(images)))
+    rows = math.ceil(len(images) / columns)
+    cell_width = max(image.width for image in images)
+    cell_height = max(image.height for image in images)
+    sprite = Image.new("RGB", (columns * cell_width, rows * cell_height))
+    boxes = []
+    for index, image in enumerate(images):
+        left = (index % columns) * cell_width
+        top = (index // columns) * cell_height
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        sprite.paste(image, (left, top))
+        boxes.append((left, top, image.width, image.height))
+    return sprite, boxes
+
+
 def save_image_buffer(image: ImageType, fmt="JPEG") -> BinaryIO:
     """Save an image to a binary buffer."""
     buffer = io.BytesIO()
@@ -96,15 +164,14 @@ def save_image_buffer(image: ImageType, fmt="JPEG") -> BinaryIO:
     return buffer
 
 
-class ThumbnailHandler:
-    """Generic thumbnail handler."""
+class ThumbnailHandlerBase:
+    """Generic thumbnail handler base class."""
 
     # supported MIME types that are not images
     MIME_NO_IMAGE = [MIME_PDF]
 
-    def __init__(self, stream: BinaryIO, mime_type: str) -> None:
-        """Initialize self given a binary stream and MIME type."""
-        self.stream = stream
+    def __init__(self, mime_type: str) -> None:
+        """Initialize self given a MIME type."""
         self.mime_type = mime_type
         if self.mime_type.startswith("image/"):
             self.is_image = True
@@ -120,13 +187,24 @@ class ThumbnailHandler:
             self.is_image = False
             self.is_video = False
 
-    def get_image(self) -> ImageType:
-        """Get a Pillow Image instance."""
+    def get_image(self, min_size: tuple[int, int] | None = None) -> ImageType:
+        """Get a Pillow Image instance.
+
+        If `min_size` is given, the image may be decoded at a reduced
+        resolution that is at least `min_size`.
+        """
         if self.mime_type == MIME_PDF:
             return self._get_image_pdf()
         if self.is_video:
             return self._get_image_video()
-        return Image.open(self.stream)
+        img = self._open_image()
+        if min_size is not None:
+            img = image_draft(img, min_size)
+        return img
+
+    def _open_image(self) -> ImageType:
+        """Open the image lazily without decoding it."""
+        raise NotImplementedError
 
     def get_cropped(
         self, x1: int, y1: int, x2: int, y2: int, square: bool = False
@@ -146,29 +224,58 @@ class ThumbnailHandler:
 
     def _get_image_pdf(self) -> ImageType:
         """Get a Pillow Image instance of the PDF's first page."""
+        from pdf2image import convert_from_path
+
         ims = self._apply_to_path(
             convert_from_path, single_file=True, use_cropbox=True, dpi=100
         )
         return ims[0]
 
+    def map_pdf_pages(
+        self,
+        func: Callable[[ImageType], Any],
+        dpi: int = 300,
+        max_pages: int | None = None,
+    ) -> list:
+        """Apply a function to the pages of a PDF and return the results.
+
+        The pages are rendered one at a time, so only a single page is held
+        in memory. If `max_pages` is given, further pages are skipped.
+        """
+        from pdf2image import convert_from_path, pdfinfo_from_path
+
+        def apply(path: str) -> list:
+            num_pages = pdfinfo_from_path(path)["Pages"]
+            if max_pages is not None:
+                num_pages = min(num_pages, max_pages)
+            results = []
+            for page_number in range(1, num_pages + 1):
+                (page,) = convert_from_path(
+                    path,
+                    use_cropbox=True,
+                    dpi=dpi,
+                    first_page=page_number,
+                    last_page=page_number,
+                )
+                try:
+                    results.append(func(page))
+                finally:
+                    page.close()
+            return results
+
+        return self._apply_to_path(apply)
+
     def _apply_to_path(self, func: Callable, *args, **kwargs):
-        """Apply a function to a file path instead of the buffer.
+        """Apply a function to a path of the file.
 
         The first argument of the callable f must be the file path.
         """
-        fh, temp_filename = tempfile.mkstemp()
-        try:
-            with open(temp_filename, "wb") as f:
-                shutil.copyfileobj(self.stream, f, length=131072)
-                f.flush()
-                output = func(temp_filename, *args, **kwargs)
-        finally:
-            os.close(fh)
-            os.remove(temp_filename)
-        return output
+        raise NotImplementedError
 
     def _get_image_video(self) -> ImageType:
         """Get a Pillow Image instance of the video's first frame."""
+        import ffmpeg
+
         out, _ = self._apply_to_path(
             lambda path: (
                 ffmpeg.input(path, ss=0)
@@ -185,7 +292,7 @@ class ThumbnailHandler:
 
         If `square` is true, the image is cropped to a centered square.
         """
-        img = self.get_image()
+        img = self.get_image(min_size=(size, size))
         img = image_thumbnail(image=img, size=size, square=square)
         return save_image_buffer(img, fmt=fmt)
 
@@ -199,24 +306,125 @@ class ThumbnailHandler:
 
         If `square` is true, the image is cropped to a centered square.
         """
-        img = self.get_image()
+        # the cropped region must still be at least `size` after reduction
+        min_size = (
+            math.ceil(size * 100 / max(x2 - x1, 1)),
+            math.ceil(size * 100 / max(y2 - y1, 1)),
+        )
+        img = self.get_image(min_size=min_size)
         img = crop_image(img, x1, y1, x2, y2)
         img = image_thumbnail(image=img, size=size, square=square)
         return save_image_buffer(img)
 
+    def get_regions(self, regions: Sequence[CropRegion]) -> list[ImageType]:
+        """Return cropped (thumbnail) images of several regions of the image.
 
-class LocalFileThumbnailHandler(ThumbnailHandler):
+        The image is decoded only once, at the lowest resolution that is
+        sufficient for all regions.
+        """
+        min_size: tuple[int, int] | None = (0, 0)
+        for region in regions:
+            if region.size is None or min_size is None:
+                min_size = None
+                continue
+            min_size = (
+                max(
+                    min_size[0],
+                    math.ceil(region.size * 100 / max(region.x2 - region.x1, 1)),
+                ),
+                max(
+                    min_size[1],
+                    math.ceil(region.size * 100 / max(region.y2 - region.y1, 1)),
+                ),
+            )
+        img = self.get_image(min_size=min_size)
+        img.load()
+        images = []
+        for region in regions:
+            cropped = crop_image(img, region.x1, region.y1, region.x2, region.y2)
+            if region.size is not None:
+                cropped = image_thumbnail(
+                    image=cropped, size=region.size, square=region.square
+                )
+            elif region.square:
+                cropped = image_square(cropped)
+            images.append(cropped)
+        return images
+
+
+class ThumbnailHandler(ThumbnailHandlerBase):
+    """Thumbnail handler for binary streams."""
+
+    def __init__(self, stream: BinaryIO, mime_type: str) -> None:
+        """Initialize self given a binary stream and MIME type."""
+        super().__init__(mime_type=mime_type)
+        self.stream = stream
+
+    def _open_image(self) -> ImageType:
+        """Open the image lazily without decoding it."""
+        return Image.open(self.stream)
+
+    def _apply_to_path(self, func: Callable, *args, **kwargs):
+        """Apply a function to a file path instead of the buffer.
+
+        The first argument of the callable f must be the file path.
+        """
+        fh, temp_filename = tempfile.mkstemp()
+        try:
+            with open(temp_filename, "wb") as f:
+                shutil.copyfileobj(self.stream, f, length=131072)
+                f.flush()
+                output = func(temp_filename, *args, **kwargs)
+        finally:
+            os.close(fh)
+            os.remove(temp_filename)
+        return output
+
+
+class LocalFileThumbnailHandler(ThumbnailHandlerBase):
     """Thumbnail handler for local files."""
 
     def __init__(self, path: FilenameOrPath, mime_type: str) -> None:
-        """Initialize self given a path and MIME type."""
+        """Initialize self given a path and MIME type.
+
+        The file is not read into memory but opened directly when needed.
+        """
         self.path = Path(path)
-        try:
-            with open(self.path, "rb") as f:
-                stream = io.BytesIO(f.read())
-        except FileNotFoundError:
+        if not self.path.is_file():
             abort_with_message(404, "Media file not found")
-        super().__init__(stream=stream, mime_type=mime_type)
+        super().__init__(mime_type=mime_type)
+
+    def _open_image(self) -> ImageType:
+        """Open the image file lazily without decoding it."""
+        # Pillow closes the file once the image data has been loaded
+        return Image.open(self.path)
+
+    def _apply_to_path(self, func: Callable, *args, **kwargs):
+        """Apply a function to the file path."""
+        return func(str(self.path), *args, **kwargs)
+
+
+_local = threading.local()
+
+
+def get_face_detector():
+    """Get the YuNet face detector of the current thread.
+
+    The detector is created on first use and then reused by all subsequent
+    detections in the same thread, as it is not safe to share between threads.
+    """
+    detector = getattr(_local, "face_detector", None)
+    if detector is None:
+        import cv2
+
+        model_path = resource_filename(
+            "gramps_webapi", "data/face_detection_yunet_2023mar.onnx"
+        )
+        detector = cv2.FaceDetectorYN.create(
+            model_path, "", (320, 320), score_threshold=0.5
+        )
+        _local.face_detector = detector
+    return detector
 
 
 def detect_faces(stream: BinaryIO) -> list[tuple[float, float, float, float]]:
@@ -228,13 +436,7 @@ def detect_faces(stream: BinaryIO) -> list[tuple[float, float, float, float]]:
     file_bytes = np.asarray(bytearray(stream.read()), dtype=np.uint8)
     cv_image = cv2.imdecode(file_bytes, cv2.IMREAD_COLOR)
 
-    # Load the YuNet model
-    model_path = resource_filename(
-        "gramps_webapi", "data/face_detection_yunet_2023mar.onnx"
-    )
-    face_detector = cv2.FaceDetectorYN.create(
-        model_path, "", (320, 320), score_threshold=0.5
-    )
+    face_detector = get_face_detector()
 
     # Set input image size for YuNet
     height, width, _ = cv_image.shape
@@ -0,0 +1,121 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025       David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Process-wide cache of locale-dependent objects.
+
+Constructing a `GrampsLocale` loads the gettext catalogs as well as the date
+displayer and parser for the language, so instances are created only once per
+language and process and then shared between threads. The same holds for the
+name displayers and the relationship calculator classes.
+"""
+
+from __future__ import annotations
+
+import threading
+
+from gramps.gen.const import GRAMPS_LOCALE
+from gramps.gen.display.name import NameDisplay
+from gramps.gen.relationship import RelationshipCalculator, get_relationship_calculator
+from gramps.gen.utils.grampslocale import GrampsLocale
+
+_lock = threading.Lock()
+_language_codes: frozenset[str] | None = None
+_locales: dict[str, GrampsLocale] = {}
+_name_displayers: dict[str, NameDisplay] = {}
+_relationship_calculator_classes: dict[str, type[RelationshipCalculator]] = {}
+
+
+def get_language_codes() -> frozenset[str]:
+    """Get the codes of the languages with an available translation."""
+    global _language_codes
+
+    if _language_codes is None:
+        with _lock:
+            if _language_codes is None:
+                catalog = GRAMPS_LOCALE.get_language_dict()
+                _language_codes = frozenset(catalog.values())
+    return _language_codes
+
+
+def get_gramps_locale(lang: str) -> GrampsLocale:
+    """Get a shared `GrampsLocale` instance for a locale code."""
+    try:
+        return _locales[lang]
+    except KeyError:
+        pass
+    with _lock:
+        if lang not in _locales:
+            _locales[lang] = GrampsLocale(lang=lang)
+        return _locales[lang]
+
+
+def _get_locale_key(locale: GrampsLocale) -> str:
+    """Get the cache key for a locale."""
+    return locale.lang or ""
+
+
+def get_name_displayer(locale: GrampsLocale = GRAMPS_LOCALE) -> NameDisplay:
+    """Get a shared name displayer for a locale.
+
+    The returned instance must not be modified, e.g. by changing its name
+    formats.
+    """
+    key = _get_locale_key(locale)
+    try:
+        return _name_displayers[key]
+    except KeyError:
+        pass
+    with _lock:
+        if key not in _name_displayers:
+            _name_displayers[key] = NameDisplay(xlocale=locale)
+        return _name_displayers[key]
+
+
+def get_relationship_calculator_for_locale(
+    locale: GrampsLocale = GRAMPS_LOCALE,
+) -> RelationshipCalculator:
+    """Get a new relationship calculator for a locale.
+
+    Only the language-specific calculator class is cached since calculator
+    instances hold state such as the search depth.
+    """
+    key = _get_locale_key(locale)
+    try:
+        return _relationship_calculator_classes[key]()
+    except KeyError:
+        pass
+    with _lock:
+        if key not in _relationship_calculator_classes:
+            # Gramps stores the class in a module-level global when
+            # reinitializing, so this must not run concurrently
+            calculator = get_relationship_calculator(reinit=True, clocale=locale)
+            _relationship_calculator_classes[key] = type(calculator)
+            return calculator
+    return _relationship_calculator_classes[key]()
+
+
+def clear_locale_cache() -> None:
+    """Clear all cached locale-dependent objects."""
+    global _language_codes
+
+    with _lock:
+        _language_codes = None
+        _locales.clear()
+        _name_displayers.clear()
+        _relationship_calculator_classes.clear()
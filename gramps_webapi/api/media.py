@@ -21,20 +21,34 @@
 
 import os
 import zipfile
+from functools import partial
 from pathlib import Path
-from typing import BinaryIO, Callable, List, Optional, Set
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Set
 
 from flask import current_app
 from flask_jwt_extended import get_jwt_identity
 from gramps.gen.db.base import DbReadBase
 from gramps.gen.lib import Media
 from gramps.gen.utils.file import expand_media_path
-
-from ..auth import get_tree_usage, set_tree_usage
+from gramps.plugins.db.dbapi.dbapi import DBAPI
+
+from ..auth import (
+    add_media_usage,
+    get_tree_usage,
+    has_media_usage,
+    remove_media_usage,
+    set_media_usage,
+)
 from ..types import FilenameOrPath
 from ..util import get_extension
 from .file import FileHandler, LocalFileHandler, upload_file_local
-from .s3 import ObjectStorageFileHandler, get_object_keys_size, upload_file_s3
+from .media_archive import ArchiveEntry, prefetch_entries, stream_zip, write_entries
+from .s3 import (
+    ObjectStorageFileHandler,
+    download_file_s3,
+    get_object_keys_size,
+    upload_file_s3,
+)
 from .util import (
     abort_with_message,
     close_db,
@@ -46,13 +60,34 @@ from .util import (
 
 PREFIX_S3 = "s3://"
 
+# number of parallel downloads when creating an archive from object storage
+ARCHIVE_DOWNLOAD_WORKERS = 8
+
+# maximum number of files downloaded ahead when creating an archive
+ARCHIVE_PREFETCH = 16
+
+# files up to this size are buffered in memory when downloaded for an archive
+ARCHIVE_SPOOL_SIZE = 8 * 1024 * 1024
+
+# maximum number of checksums looked up in a single query
+CHECKSUM_QUERY_CHUNK_SIZE = 500
+
+
+def open_binary(path: str) -> BinaryIO:
+    """Open a local file for reading in binary mode."""
+    return open(path, "rb")
+
 
 class MediaHandlerBase:
     """Generic handler for media files."""
 
-    def __init__(self, base_dir: str):
-        """Initialize given a base dir or URL."""
+    # whether files are stored by checksum rather than by path
+    content_addressed = False
+
+    def __init__(self, base_dir: str, tree: Optional[str] = None):
+        """Initialize given a base dir or URL and optional tree ID."""
         self.base_dir = base_dir or ""
+        self.tree = tree
 
     def get_file_handler(self, handle, db_handle: DbReadBase) -> FileHandler:
         """Get an appropriate file handler."""
@@ -84,19 +119,77 @@ class MediaHandlerBase:
         """Given a list of media objects, return the ones with existing files."""
         raise NotImplementedError
 
+    def get_media_sizes(self, db_handle: Optional[DbReadBase] = None) -> Dict[str, int]:
+        """Return the sizes of all existing media files by checksum."""
+        raise NotImplementedError
+
     def get_media_size(self, db_handle: Optional[DbReadBase] = None) -> int:
         """Return the total disk space used by all existing media objects."""
+        return sum(self.get_media_sizes(db_handle=db_handle).values())
+
+    def iter_archive_entries(
+        self,
+        db_handle: DbReadBase,
+        include_private: bool,
+        since: Optional[int] = None,
+        progress_cb: Optional[Callable] = None,
+    ) -> Iterator[ArchiveEntry]:
+        """Iterate over the media files to add to an archive."""
         raise NotImplementedError
 
+    @staticmethod
+    def iter_archive_objects(
+        db_handle: DbReadBase,
+        include_private: bool,
+        since: Optional[int] = None,
+        progress_cb: Optional[Callable] = None,
+    ) -> Iterator[Media]:
+        """Iterate over the media objects to include in an archive.
+
+        If `since` is given, only objects changed after that Unix timestamp
+        are included.
+        """
+        if progress_cb:
+            total = db_handle.get_number_of_media()
+        for i, obj in enumerate(db_handle.iter_media()):
+            if progress_cb:
+                progress_cb(current=i, total=total)
+            if not include_private and obj.private:
+                continue
+            if since is not None and obj.change <= since:
+                continue
+            yield obj
+
     def create_file_archive(
         self,
         db_handle: DbReadBase,
         zip_filename: FilenameOrPath,
         include_private: bool,
         progress_cb: Optional[Callable] = None,
+        since: Optional[int] = None,
     ) -> None:
         """Create a ZIP archive on disk containing all media files."""
-        raise NotImplementedError
+        entries = self.iter_archive_entries(
+            db_handle,
+            include_private=include_private,
+            since=since,
+            progress_cb=progress_cb,
+        )
+        with zipfile.ZipFile(zip_filename, "w") as zip_file:
+            for _ in write_entries(zip_file, entries):
+                pass
+
+    def stream_file_archive(
+        self,
+        db_handle: DbReadBase,
+        include_private: bool,
+        since: Optional[int] = None,
+    ) -> Iterator[bytes]:
+        """Stream a ZIP archive containing all media files."""
+        entries = self.iter_archive_entries(
+            db_handle, include_private=include_private, since=since
+        )
+        return stream_zip(entries)
 
 
 class MediaHandlerLocal(MediaHandlerBase):
@@ -104,7 +197,9 @@ class MediaHandlerLocal(MediaHandlerBase):
 
     def get_file_handler(self, handle, db_handle: DbReadBase) -> LocalFileHandler:
         """Get a local file handler."""
-        return LocalFileHandler(handle, base_dir=self.base_dir, db_handle=db_handle)
+        return LocalFileHandler(
+            handle, base_dir=self.base_dir, db_handle=db_handle, tree=self.tree
+        )
 
     def upload_file(
         self,
@@ -136,16 +231,17 @@ class MediaHandlerLocal(MediaHandlerBase):
             if self.get_file_handler(obj.handle, db_handle=db_handle).file_exists()
         ]
 
-    def get_media_size(self, db_handle: Optional[DbReadBase] = None) -> int:
-        """Return the total disk space used by all existing media objects.
+    def get_media_sizes(self, db_handle: Optional[DbReadBase] = None) -> Dict[str, int]:
+        """Return the sizes of all existing media files by checksum.
 
-        Only works with a request context.
+        Files without checksum are keyed by path. Only works with a request
+        context if no database handle is given.
         """
         if not db_handle:
             db_handle = get_db_handle()
         if not os.path.isdir(self.base_dir):
-            return 0
-        size = 0
+            return {}
+        sizes: Dict[str, int] = {}
         paths_seen = set()
         for obj in db_handle.iter_media():
             path = obj.path
@@ -155,54 +251,60 @@ class MediaHandlerLocal(MediaHandlerBase):
             else:
                 path = os.path.join(self.base_dir, path)
             if Path(path).is_file() and path not in paths_seen:
-                file_size = os.path.getsize(path)
-                size += file_size
+                sizes[obj.checksum or path] = os.path.getsize(path)
                 paths_seen.add(path)
-        return size
+        return sizes
 
-    def create_file_archive(
+    def iter_archive_entries(
         self,
         db_handle: DbReadBase,
-        zip_filename: FilenameOrPath,
         include_private: bool,
+        since: Optional[int] = None,
         progress_cb: Optional[Callable] = None,
-    ) -> None:
-        """Create a ZIP archive on disk containing all media files."""
+    ) -> Iterator[ArchiveEntry]:
+        """Iterate over the media files to add to an archive."""
         if not os.path.isdir(self.base_dir):
             raise ValueError(f"Directory {self.base_dir} does not exist")
+        base_dir_resolved = Path(self.base_dir).resolve()
         paths_seen = set()
-        if progress_cb:
-            total = db_handle.get_number_of_media()
-        with zipfile.ZipFile(zip_filename, "w") as zip_file:
-            for i, obj in enumerate(db_handle.iter_media()):
-                if progress_cb:
-                    progress_cb(current=i, total=total)
-
-                if not include_private and obj.private:
-                    continue
-                path = obj.path
-                if os.path.isabs(path):
-                    if (
-                        Path(self.base_dir).resolve()
-                        not in Path(path).resolve().parents
-                    ):
-                        continue  # file outside base dir - ignore
-                else:
-                    path = os.path.join(self.base_dir, path)
-                rel_path = os.path.relpath(path, self.base_dir)
-                if Path(path).is_file() and path not in paths_seen:
-                    zip_file.write(path, arcname=rel_path)
-                    paths_seen.add(path)
+        for obj in self.iter_archive_objects(
+            db_handle,
+            include_private=include_private,
+            since=since,
+            progress_cb=progress_cb,
+        ):
+            path = obj.path
+            if os.path.isabs(path):
+                if base_dir_resolved not in Path(path).resolve().parents:
+                    continue  # file outside base dir - ignore
+            else:
+                path = os.path.join(self.base_dir, path)
+            if path in paths_seen:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # file missing
+            paths_seen.add(path)
+            yield ArchiveEntry(
+                arcname=os.path.relpath(path, self.base_dir),
+                mime=obj.mime,
+                open=partial(open_binary, path),
+                size=stat.st_size,
+                mtime=stat.st_mtime,
+            )
 
 
 class MediaHandlerS3(MediaHandlerBase):
     """Generic handler for object storage media files."""
 
-    def __init__(self, base_dir: str):
-        """Initialize given a base dir or URL."""
+    content_addressed = True
+
+    def __init__(self, base_dir: str, tree: Optional[str] = None):
+        """Initialize given a base dir or URL and optional tree ID."""
         if not base_dir.startswith(PREFIX_S3):
-            raise ValueError(f"Invalid object storage URL: {self.base_dir}")
-        super().__init__(base_dir)
+            raise ValueError(f"Invalid object storage URL: {base_dir}")
+        super().__init__(base_dir, tree=tree)
 
     @property
     def endpoint_url(self) -> Optional[str]:
@@ -239,6 +341,7 @@ class MediaHandlerS3(MediaHandlerBase):
             db_handle=db_handle,
             prefix=self.prefix,
             endpoint_url=self.endpoint_url,
+            tree=self.tree,
         )
 
     def upload_file(
@@ -267,8 +370,8 @@ class MediaHandlerS3(MediaHandlerBase):
         remote_keys = self.get_remote_keys()
         return [obj for obj in objects if obj.checksum in remote_keys]
 
-    def get_media_size(self, db_handle: Optional[DbReadBase] = None) -> int:
-        """Return the total disk space used by all existing media objects."""
+    def get_media_sizes(self, db_handle: Optional[DbReadBase] = None) -> Dict[str, int]:
+        """Return the sizes of all existing media files by checksum."""
         if not db_handle:
             db_handle = get_db_handle()
         keys = set(obj.checksum for obj in db_handle.iter_media())
@@ -283,40 +386,73 @@ class MediaHandlerS3(MediaHandlerBase):
                 key.removeprefix(self.prefix).lstrip("/"): size
                 for key, size in keys_size.items()
             }
-        return sum(keys_size.get(key, 0) for key in keys)
+        return {key: keys_size[key] for key in keys if key in keys_size}
 
-    def create_file_archive(
+    def iter_archive_entries(
         self,
         db_handle: DbReadBase,
-        zip_filename: FilenameOrPath,
         include_private: bool,
+        since: Optional[int] = None,
         progress_cb: Optional[Callable] = None,
-    ) -> None:
-        """Create a ZIP archive on disk containing all media files."""
-        remote_keys = self.get_remote_keys()
-        if progress_cb:
-            total = db_handle.get_number_of_media()
-        with zipfile.ZipFile(zip_filename, "w") as zip_file:
-            for i, obj in enumerate(db_handle.iter_media()):
-                if progress_cb:
-                    progress_cb(current=i, total=total)
-                if not include_private and obj.private:
-                    continue
-                if obj.checksum not in remote_keys:
+    ) -> Iterator[ArchiveEntry]:
+        """Iterate over the media files to add to an archive.
+
+        The files are downloaded ahead of time in parallel.
+        """
+        keys_size = get_object_keys_size(
+            bucket_name=self.bucket_name,
+            prefix=self.prefix,
+            endpoint_url=self.endpoint_url,
+        )
+        if self.prefix:
+            keys_size = {
+                key.removeprefix(self.prefix).lstrip("/"): size
+                for key, size in keys_size.items()
+            }
+
+        def _iter_entries() -> Iterator[ArchiveEntry]:
+            paths_seen = set()
+            for obj in self.iter_archive_objects(
+                db_handle,
+                include_private=include_private,
+                since=since,
+                progress_cb=progress_cb,
+            ):
+                if obj.checksum not in keys_size:
                     continue
                 media_path = obj.path
-                if os.path.isabs(media_path):
+                if os.path.isabs(media_path) or media_path in paths_seen:
                     continue  # ignore absolute paths
-                file_handler = self.get_file_handler(obj.handle, db_handle=db_handle)
-                fobj = file_handler.get_file_object()
-                zip_file.writestr(media_path, fobj.read())
+                paths_seen.add(media_path)
+                yield ArchiveEntry(
+                    arcname=media_path,
+                    mime=obj.mime,
+                    open=partial(
+                        download_file_s3,
+                        self.bucket_name,
+                        obj.checksum,
+                        prefix=self.prefix,
+                        endpoint_url=self.endpoint_url,
+                        max_memory_size=ARCHIVE_SPOOL_SIZE,
+                    ),
+                    size=keys_size[obj.checksum],
+                    mtime=obj.change,
+                )
+
+        return prefetch_entries(
+            _iter_entries(),
+            max_workers=ARCHIVE_DOWNLOAD_WORKERS,
+            max_pending=ARCHIVE_PREFETCH,
+        )
 
 
-def MediaHandler(base_dir: Optional[str]) -> MediaHandlerBase:
+def MediaHandler(
+    base_dir: Optional[str], tree: Optional[str] = None
+) -> MediaHandlerBase:
     """Return an appropriate media handler."""
     if base_dir and base_dir.startswith(PREFIX_S3):
-        return MediaHandlerS3(base_dir=base_dir)
-    return MediaHandlerLocal(base_dir=base_dir or "")
+        return MediaHandlerS3(base_dir=base_dir, tree=tree)
+    return MediaHandlerLocal(base_dir=base_dir or "", tree=tree)
 
 
 def get_media_handler(
@@ -344,13 +480,17 @@ def get_media_handler(
         if prefix:
             # construct subdirectory using OS dependent path join
             base_dir = os.path.join(base_dir, prefix)
-    return MediaHandler(base_dir)
+    return MediaHandler(base_dir, tree=tree)
 
 
 def update_usage_media(
     tree: Optional[str] = None, user_id: Optional[str] = None
 ) -> int:
-    """Update the usage of media."""
+    """Update the usage of media by scanning all media files.
+
+    Also rebuilds the table of file sizes used for incremental updates, so
+    this reconciles the usage with the actual state of the media storage.
+    """
     if not tree:
         tree = get_tree_from_jwt_or_fail()
     if not user_id:
@@ -361,11 +501,100 @@ def update_usage_media(
     )
     try:
         media_handler = get_media_handler(db_handle, tree=tree)
-        usage_media = media_handler.get_media_size(db_handle=db_handle)
+        sizes = media_handler.get_media_sizes(db_handle=db_handle)
     finally:
         close_db(db_handle)
-    set_tree_usage(tree, usage_media=usage_media)
-    return usage_media
+    set_media_usage(tree, sizes)
+    return sum(sizes.values())
+
+
+def add_usage_media(
+    checksum: str,
+    size: int,
+    tree: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> None:
+    """Add the size of an uploaded media file to the usage of media.
+
+    Falls back to a full scan if no file sizes have been recorded yet.
+    """
+    if not tree:
+        tree = get_tree_from_jwt_or_fail()
+    if not has_media_usage(tree):
+        update_usage_media(tree=tree, user_id=user_id)
+        return
+    add_media_usage(tree, checksum, size)
+
+
+def remove_usage_media(
+    checksums: Iterable[str],
+    tree: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> None:
+    """Subtract the sizes of media files that are no longer referenced.
+
+    Only the usage of the given checksums is updated; checksums still
+    referenced by any media object are kept. Falls back to a full scan if no
+    file sizes have been recorded yet.
+    """
+    checksums = set(checksum for checksum in checksums if checksum)
+    if not checksums:
+        return
+    if not tree:
+        tree = get_tree_from_jwt_or_fail()
+    if not user_id:
+        user_id = get_jwt_identity()
+    assert user_id is not None, "Unexpected error while looking up user ID."
+    if not has_media_usage(tree):
+        update_usage_media(tree=tree, user_id=user_id)
+        return
+    db_handle = get_db_outside_request(
+        tree=tree, view_private=True, readonly=True, user_id=user_id
+    )
+    try:
+        referenced = get_referenced_checksums(db_handle, checksums)
+    finally:
+        close_db(db_handle)
+    remove_media_usage(tree, list(checksums - referenced))
+
+
+def get_referenced_checksums(db_handle: DbReadBase, checksums: Set[str]) -> Set[str]:
+    """Return the checksums that are referenced by any media object.
+
+    For SQL databases, only the given checksums are looked up in the
+    secondary checksum column; otherwise, all media objects are scanned.
+    """
+    base_db = getattr(db_handle, "basedb", db_handle)
+    if not isinstance(base_db, DBAPI):
+        return set(obj.checksum for obj in db_handle.iter_media()) & checksums
+    referenced: Set[str] = set()
+    checksum_list = sorted(checksums)
+    for i in range(0, len(checksum_list), CHECKSUM_QUERY_CHUNK_SIZE):
+        chunk = checksum_list[i : i + CHECKSUM_QUERY_CHUNK_SIZE]
+        placeholders = ", ".join("?" for _ in chunk)
+        base_db.dbapi.execute(
+            f"SELECT DISTINCT checksum FROM media WHERE checksum IN ({placeholders})",
+            chunk,
+        )
+        referenced.update(row[0] for row in base_db.dbapi.fetchall())
+    return referenced
+
+
+def update_usage_media_from_transaction(
+    trans_dict: List[Dict],
+    tree: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> None:
+    """Update the usage of media after deleting or modifying media objects."""
+    checksums = set()
+    for item in trans_dict:
+        if item["_class"] != "Media" or item["type"] not in {"delete", "update"}:
+            continue
+        old_checksum = (item.get("old") or {}).get("checksum")
+        new_checksum = (item.get("new") or {}).get("checksum")
+        if old_checksum and old_checksum != new_checksum:
+            checksums.add(old_checksum)
+    remove_usage_media(checksums, tree=tree, user_id=user_id)
 
 
 def check_quota_media(
@@ -0,0 +1,187 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Utilities for writing and streaming ZIP archives of media files."""
+
+from __future__ import annotations
+
+import io
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Callable, Iterable, Iterator, NamedTuple, Optional
+
+# size of the chunks read from media files
+CHUNK_SIZE = 1024 * 1024
+
+# MIME types (or prefixes) of formats that are compressed already
+COMPRESSED_MIME_TYPES = (
+    "image/jpeg",
+    "image/png",
+    "image/gif",
+    "image/webp",
+    "image/heic",
+    "image/heif",
+    "image/avif",
+    "image/jp2",
+    "video/",
+    "audio/",
+    "application/zip",
+    "application/gzip",
+    "application/x-7z-compressed",
+    "application/x-bzip2",
+    "application/x-rar-compressed",
+    "application/x-xz",
+    "application/vnd.openxmlformats-officedocument.",
+    "application/vnd.oasis.opendocument.",
+)
+
+
+class ArchiveEntry(NamedTuple):
+    """A file to add to a media archive."""
+
+    arcname: str
+    mime: str
+    open: Callable[[], BinaryIO]
+    size: Optional[int] = None
+    mtime: Optional[float] = None
+
+
+def get_compress_type(mime: str) -> int:
+    """Get the ZIP compression method for a MIME type.
+
+    Formats that are compressed already are stored as they are, since
+    compressing them again costs CPU time without reducing their size.
+    """
+    if mime and mime.lower().startswith(COMPRESSED_MIME_TYPES):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def get_zip_info(entry: ArchiveEntry) -> zipfile.ZipInfo:
+    """Get the ZIP archive member info for an entry."""
+    mtime = time.localtime(entry.mtime or time.time())
+    zinfo = zipfile.ZipInfo(entry.arcname, date_time=mtime[:6])
+    # the DOS date format does not support dates before 1980
+    if zinfo.date_time[0] < 1980:
+        zinfo.date_time = (1980, 1, 1, 0, 0, 0)
+    zinfo.compress_type = get_compress_type(entry.mime)
+    zinfo.external_attr = 0o644 << 16
+    if entry.size is not None:
+        zinfo.file_size = entry.size
+    return zinfo
+
+
+def write_entries(
+    zip_file: zipfile.ZipFile, entries: Iterable[ArchiveEntry]
+) -> Iterator[None]:
+    """Write entries to a ZIP archive, pausing after every chunk.
+
+    This is a generator that has to be exhausted to write the archive, so
+    that a caller streaming the archive can flush it in between.
+    """
+    for entry in entries:
+        zinfo = get_zip_info(entry)
+        force_zip64 = entry.size is None or entry.size > zipfile.ZIP64_LIMIT
+        with entry.open() as src:
+            with zip_file.open(zinfo, "w", force_zip64=force_zip64) as dst:
+                while True:
+                    chunk = src.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    yield None
+        yield None
+
+
+class _StreamBuffer(io.RawIOBase):
+    """Unseekable file object collecting the bytes written to it."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def pop(self) -> bytes:
+        """Return and clear the bytes written since the last call."""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries: Iterable[ArchiveEntry]) -> Iterator[bytes]:
+    """Stream a ZIP archive of the entries without writing it to disk.
+
+    Since the output is not seekable, sizes and checksums are written after
+    every member's data.
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, "w") as zip_file:
+        for _ in write_entries(zip_file, entries):
+            data = buffer.pop()
+            if data:
+                yield data
+    data = buffer.pop()
+    if data:
+        yield data
+
+
+def prefetch_entries(
+    entries: Iterable[ArchiveEntry], max_workers: int, max_pending: int
+) -> Iterator[ArchiveEntry]:
+    """Open the files of archive entries ahead of time in a thread pool.
+
+    At most `max_pending` files are opened ahead of the consumer, which
+    bounds the memory needed for buffered downloads. The entries are
+    returned in their original order.
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending: deque[tuple[ArchiveEntry, Future]] = deque()
+
+    def _pop() -> ArchiveEntry:
+        entry, future = pending.popleft()
+        fobj = future.result()
+        return entry._replace(open=lambda: fobj)
+
+    try:
+        for entry in entries:
+            pending.append((entry, executor.submit(entry.open)))
+            if len(pending) >= max_pending:
+                yield _pop()
+        while pending:
+            yield _pop()
+    finally:
+        for _, future in pending:
+            if not future.cancel():
+                # files of running downloads are closed once they are opened
+                future.add_done_callback(_close_result)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _close_result(future: Future) -> None:
+    """Close the file opened by a finished future, if any."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    future.result().close()
@@ -1,20 +1,21 @@
 """Class for handling the import of a media ZIP archive."""
 
 import os
-import shutil
-import tempfile
+import threading
 import zipfile
-from typing import Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from gramps.gen.db import DbTxn
 from gramps.gen.db.base import DbReadBase
 from gramps.gen.lib import Media
 
-from ..auth import set_tree_usage
+from ..auth import add_media_usage, has_media_usage, remove_media_usage
 from ..types import FilenameOrPath
 from .file import get_checksum
-from .media import check_quota_media, get_media_handler
+from .media import check_quota_media, get_media_handler, update_usage_media
 from .resources.util import update_object
+from .util import get_config
 
 MissingFiles = Dict[str, List[Dict[str, str]]]
 
@@ -40,6 +41,8 @@ class MediaImporter:
       a file with the right (relative) path. If one is found, the media object is
       updated with that file's checksum. Then, in a second step, the file is uploaded.
 
+    Files are hashed and uploaded directly from the ZIP archive in parallel,
+    without extracting it first.
     """
 
     def __init__(
@@ -58,6 +61,11 @@ class MediaImporter:
         self.delete = delete
         self.media_handler = get_media_handler(self.db_handle, tree=self.tree)
         self.objects: List[Media] = self._get_objects()
+        self.failed_checksums: Set[str] = set()
+        self.max_workers = get_config("MEDIA_IMPORT_WORKERS") or None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._zip_files: List[zipfile.ZipFile] = []
 
     def _get_objects(self) -> List[Media]:
         """Get a list of all media objects in the database."""
@@ -90,40 +98,72 @@ class MediaImporter:
 
         return missing_files
 
-    def _check_disk_space_and_extract(self) -> str:
-        """Check disk space and extract files into a temporary directory."""
-        total_size = 0
+    def _get_members(self) -> List[zipfile.ZipInfo]:
+        """Get the list of files in the ZIP archive."""
         with zipfile.ZipFile(self.file_name, "r") as zip_file:
-            for file_info in zip_file.infolist():
-                total_size += file_info.file_size
-
-            disk_usage = shutil.disk_usage(self.file_name)
-            if total_size > disk_usage.free:
-                raise ValueError("Not enough free space on disk")
-
-            temp_dir = tempfile.mkdtemp()
-            zip_file.extractall(temp_dir)
-
-        return temp_dir
-
-    def _fix_missing_checksums(self, temp_dir: str, missing_files: MissingFiles) -> int:
+            return [info for info in zip_file.infolist() if not info.is_dir()]
+
+    def _open_member(self, name: str):
+        """Open a file in the ZIP archive.
+
+        Every thread uses its own handle of the archive, so that members can
+        be read concurrently.
+        """
+        zip_file = getattr(self._local, "zip_file", None)
+        if zip_file is None:
+            zip_file = self._local.zip_file = zipfile.ZipFile(self.file_name, "r")
+            with self._lock:
+                self._zip_files.append(zip_file)
+        return zip_file.open(name)
+
+    def _close_members(self) -> None:
+        """Close the handles of the ZIP archive opened by all threads."""
+        with self._lock:
+            for zip_file in self._zip_files:
+                zip_file.close()
+            self._zip_files.clear()
+        self._local = threading.local()
+
+    def _get_checksum(self, name: str) -> str:
+        """Get the checksum of a file in the ZIP archive."""
+        with self._open_member(name) as f:
+            return get_checksum(f)
+
+    def _get_checksums(
+        self, names: List[str], progress_cb: Optional[Callable] = None
+    ) -> Dict[str, str]:
+        """Get the checksums of files in the ZIP archive in parallel."""
+        checksums: Dict[str, str] = {}
+        total = len(names)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._get_checksum, name): name for name in names
+            }
+            for i, future in enumerate(as_completed(futures)):
+                if progress_cb:
+                    progress_cb(current=i, total=total)
+                checksums[futures[future]] = future.result()
+        return checksums
+
+    def _fix_missing_checksums(
+        self, members: List[zipfile.ZipInfo], missing_files: MissingFiles
+    ) -> int:
         """Fix objects with missing checksums if we have a file with matching path."""
         handles_by_path: Dict[str, List[str]] = {}
         for obj_details in missing_files[""]:
-            path = obj_details["media_path"]
+            path = os.path.normpath(obj_details["media_path"])
             if path not in handles_by_path:
                 handles_by_path[path] = []
             handles_by_path[path].append(obj_details["handle"])
+        names = [
+            info.filename
+            for info in members
+            if os.path.normpath(info.filename) in handles_by_path
+        ]
         checksums_by_handle: Dict[str, str] = {}
-        for root, _, files in os.walk(temp_dir):
-            for name in files:
-                abs_file_path = os.path.join(root, name)
-                rel_file_path = os.path.relpath(abs_file_path, temp_dir)
-                if rel_file_path in handles_by_path:
-                    with open(abs_file_path, "rb") as f:
-                        checksum = get_checksum(f)
-                    for handle in handles_by_path[rel_file_path]:
-                        checksums_by_handle[handle] = checksum
+        for name, checksum in self._get_checksums(names).items():
+            for handle in handles_by_path[os.path.normpath(name)]:
+                checksums_by_handle[handle] = checksum
         if not checksums_by_handle:
             return 0
         with DbTxn("Updating checksums on media", self.db_handle) as trans:
@@ -140,20 +180,44 @@ class MediaImporter:
         return len(checksums_by_handle)
 
     def _identify_files_to_upload(
-        self, temp_dir: str, missing_files: MissingFiles
+        self,
+        members: List[zipfile.ZipInfo],
+        missing_files: MissingFiles,
+        progress_cb: Optional[Callable] = None,
     ) -> Dict[str, Tuple[str, int]]:
-        """Identify files to upload from the extracted temporary directory."""
+        """Identify files to upload by hashing the files in the ZIP archive."""
+        sizes = {info.filename: info.file_size for info in members}
+        checksums = self._get_checksums(list(sizes), progress_cb=progress_cb)
         to_upload = {}
-        for root, _, files in os.walk(temp_dir):
-            for name in files:
-                file_path = os.path.join(root, name)
-                with open(file_path, "rb") as f:
-                    checksum = get_checksum(f)
-                    if checksum in missing_files and checksum not in to_upload:
-                        to_upload[checksum] = (file_path, os.path.getsize(file_path))
+        for info in members:
+            checksum = checksums[info.filename]
+            if checksum in missing_files and checksum not in to_upload:
+                to_upload[checksum] = (info.filename, sizes[info.filename])
 
         return to_upload
 
+    def _upload_file(self, name: str, checksum: str, obj_details_list) -> None:
+        """Upload a file from the ZIP archive for all objects referencing it."""
+        if self.media_handler.content_addressed:
+            # stored by checksum, so a single upload serves all objects
+            obj_details_list = obj_details_list[:1]
+        else:
+            # stored by path, so upload once per distinct path
+            obj_details_list = list(
+                {
+                    obj_details["media_path"]: obj_details
+                    for obj_details in obj_details_list
+                }.values()
+            )
+        for obj_details in obj_details_list:
+            with self._open_member(name) as f:
+                self.media_handler.upload_file(
+                    f,
+                    checksum,
+                    obj_details["mime"],
+                    path=obj_details["media_path"],
+                )
+
     def _upload_files(
         self,
         to_upload: Dict[str, Tuple[str, int]],
@@ -163,20 +227,21 @@ class MediaImporter:
         """Upload identified files and return the number of failures."""
         num_failures = 0
         total = len(to_upload)
-        for i, (checksum, (file_path, file_size)) in enumerate(to_upload.items()):
-            if progress_cb:
-                progress_cb(current=i, total=total)
-            for obj_details in missing_files[checksum]:
-                with open(file_path, "rb") as f:
-                    try:
-                        self.media_handler.upload_file(
-                            f,
-                            checksum,
-                            obj_details["mime"],
-                            path=obj_details["media_path"],
-                        )
-                    except Exception:
-                        num_failures += 1
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(
+                    self._upload_file, name, checksum, missing_files[checksum]
+                ): checksum
+                for checksum, (name, _) in to_upload.items()
+            }
+            for i, future in enumerate(as_completed(futures)):
+                if progress_cb:
+                    progress_cb(current=i, total=total)
+                try:
+                    future.result()
+                except Exception:
+                    num_failures += 1
+                    self.failed_checksums.add(futures[future])
 
         return num_failures
 
@@ -184,52 +249,75 @@ class MediaImporter:
         """Delete the ZIP file."""
         return os.remove(self.file_name)
 
-    def _delete_temporary_directory(self, temp_dir):
-        """Delete the temporary directory."""
-        return shutil.rmtree(temp_dir)
-
-    def _update_media_usage(self) -> None:
-        """Update the media usage."""
-        usage_media = self.media_handler.get_media_size(db_handle=self.db_handle)
-        set_tree_usage(self.tree, usage_media=usage_media)
+    def _update_media_usage(
+        self,
+        to_upload: Dict[str, Tuple[str, int]],
+        missing_files: MissingFiles,
+    ) -> None:
+        """Update the media usage.
+
+        Adds the sizes of the uploaded files and removes files that are still
+        missing, without scanning the whole media storage.
+        """
+        if not has_media_usage(self.tree):
+            update_usage_media(tree=self.tree, user_id=self.user_id)
+            return
+        still_missing = [
+            checksum
+            for checksum in missing_files
+            if checksum not in to_upload or checksum in self.failed_checksums
+        ]
+        remove_media_usage(self.tree, still_missing)
+        for checksum, (_, file_size) in to_upload.items():
+            if checksum not in self.failed_checksums:
+                add_media_usage(self.tree, checksum, file_size)
 
     def __call__(
         self, fix_missing_checksums: bool = True, progress_cb: Optional[Callable] = None
     ) -> Dict[str, int]:
         """Import a media archive file."""
+        try:
+            return self._import(
+                fix_missing_checksums=fix_missing_checksums, progress_cb=progress_cb
+            )
+        finally:
+            self._close_members()
+            if self.delete and os.path.exists(self.file_name):
+                self._delete_zip_file()
+
+    def _import(
+        self, fix_missing_checksums: bool = True, progress_cb: Optional[Callable] = None
+    ) -> Dict[str, int]:
+        """Import the files from the archive without extracting it."""
         missing_files = self._identify_missing_files()
 
         if not missing_files:
             # no missing files
-            # delete ZIP file
-            if self.delete:
-                self._delete_zip_file()
             return {"missing": 0, "uploaded": 0, "failures": 0}
 
-        temp_dir = self._check_disk_space_and_extract()
+        members = self._get_members()
 
         if "" in missing_files:
             if fix_missing_checksums:
                 # files without checksum! Need to fix that first
-                fixed = self._fix_missing_checksums(temp_dir, missing_files)
+                fixed = self._fix_missing_checksums(members, missing_files)
                 # after fixing checksums, we need fetch media objects again and re-run
                 if fixed:
                     self._update_objects()
                     # set fix_missing_checksums to False to avoid an infinite loop
-                    return self(fix_missing_checksums=False)
+                    return self._import(
+                        fix_missing_checksums=False, progress_cb=progress_cb
+                    )
             else:
                 # we already tried fixing checksums - ignore the 2nd time
                 missing_files.pop("")
 
-        # delete ZIP file
-        if self.delete:
-            self._delete_zip_file()
-
-        to_upload = self._identify_files_to_upload(temp_dir, missing_files)
+        to_upload = self._identify_files_to_upload(
+            members, missing_files, progress_cb=progress_cb
+        )
 
         if not to_upload:
             # no files to upload
-            self._delete_temporary_directory(temp_dir)
             return {"missing": len(missing_files), "uploaded": 0, "failures": 0}
 
         upload_size = sum(file_size for (_, file_size) in to_upload.values())
@@ -239,8 +327,7 @@ class MediaImporter:
             to_upload, missing_files, progress_cb=progress_cb
         )
 
-        self._delete_temporary_directory(temp_dir)
-        self._update_media_usage()
+        self._update_media_usage(to_upload, missing_files)
 
         return {
             "missing": len(missing_files),
@@ -250,4 +337,4 @@ class MediaImporter:
 
 
 # _identify_missing_files -> missing_files = {checksum: [(handle, media_path, mime), ...]}
-# _identify_files_to_upload -> to_upload = {checksum: (file_path, file_size)}
+# _identify_files_to_upload -> to_upload = {checksum: (member_name, file_size)}
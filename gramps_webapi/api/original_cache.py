@@ -0,0 +1,121 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025       David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Local disk cache of original media files stored on object storage."""
+
+from __future__ import annotations
+
+import threading
+from io import BytesIO
+from typing import BinaryIO, Callable, Optional
+
+from flask import current_app, has_app_context
+
+from ..util.metrics import CACHE_LOOKUPS
+from .disk_store import DiskStore
+
+_lock = threading.Lock()
+# downloads in progress in this process, by cache directory and key
+_in_flight: dict[tuple[str, str], threading.Event] = {}
+_stats = {"hits": 0, "misses": 0}
+
+
+class OriginalCache(DiskStore):
+    """Cache of original media files keyed by object name.
+
+    Concurrent requests for the same file in a process share a single
+    download.
+    """
+
+    SUFFIX = ".bin"
+
+    def get(self, key: str, download: Callable[[BinaryIO], None]) -> BinaryIO:
+        """Return a cached file, downloading it first if needed.
+
+        `download` must write the file contents to the given file object.
+        """
+        fobj = self.open(key)
+        if fobj is not None:
+            _count("hits")
+            return fobj
+        flight_key = (self.base_dir, key)
+        with _lock:
+            event = _in_flight.get(flight_key)
+            is_leader = event is None
+            if event is None:
+                event = _in_flight[flight_key] = threading.Event()
+        if not is_leader:
+            event.wait()
+            fobj = self.open(key)
+            if fobj is not None:
+                _count("hits")
+                return fobj
+            # the other download failed, so try again independently
+        _count("misses")
+        try:
+            self.put_from(key, download)
+        finally:
+            if is_leader:
+                with _lock:
+                    del _in_flight[flight_key]
+                event.set()
+        fobj = self.open(key)
+        if fobj is None:
+            # evicted in the meantime
+            buffer = BytesIO()
+            download(buffer)
+            buffer.seek(0)
+            return buffer
+        return fobj
+
+
+def _count(name: str) -> None:
+    """Increment a cache statistics counter."""
+    with _lock:
+        _stats[name] += 1
+    CACHE_LOOKUPS.inc(cache="original", result=name[:-1])
+
+
+def get_original_cache_stats() -> dict[str, int]:
+    """Get the number of cache hits and misses in this process."""
+    with _lock:
+        return dict(_stats)
+
+
+def reset_original_cache_stats() -> None:
+    """Reset the cache statistics counters."""
+    with _lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def get_original_cache() -> Optional[OriginalCache]:
+    """Get the cache of original media files or None if it is disabled.
+
+    Also returns None outside of the flask app context.
+    """
+    if not has_app_context():
+        return None
+    base_dir = current_app.config.get("S3_ORIGINAL_CACHE_DIR")
+    if not base_dir:
+        return None
+    return OriginalCache(
+        base_dir=base_dir,
+        max_bytes=current_app.config["S3_ORIGINAL_CACHE_MAX_BYTES"],
+    )
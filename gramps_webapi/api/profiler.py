@@ -0,0 +1,90 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Profiling of requests on demand."""
+
+from __future__ import annotations
+
+import uuid
+
+from flask import Flask, Response, g, has_request_context, request
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+
+from ..auth.const import PERM_PROFILE_REQUESTS
+from ..util.profiler import PROFILE_ID_PATTERN, save_profile, start_profiler
+from .auth import has_permissions
+
+# request header asking for a profile
+PROFILE_HEADER = "X-Profile"
+# response header with the ID of the stored profile
+PROFILE_ID_HEADER = "X-Profile-Id"
+REQUEST_ID_HEADER = "X-Request-Id"
+
+_TRUE_VALUES = {"1", "true", "yes"}
+
+
+def is_profile_requested() -> bool:
+    """Return whether the client asks for the request to be profiled."""
+    return request.headers.get(PROFILE_HEADER, "").lower() in _TRUE_VALUES
+
+
+def is_request_profiled() -> bool:
+    """Return whether the current request is being profiled."""
+    return has_request_context() and g.get("profiler") is not None
+
+
+def get_request_id() -> str:
+    """Return the ID sent by the client or proxy, or a new one."""
+    request_id = request.headers.get(REQUEST_ID_HEADER, "")
+    if PROFILE_ID_PATTERN.match(request_id):
+        return request_id
+    return uuid.uuid4().hex
+
+
+def init_request_profiler(app: Flask) -> None:
+    """Register the hooks profiling requests on demand."""
+
+    @app.before_request
+    def start_request_profiler() -> None:
+        if not is_profile_requested():
+            return
+        try:
+            verify_jwt_in_request(optional=True)
+        except (JWTExtendedException, PyJWTError):
+            # the endpoint reports invalid tokens itself
+            return
+        if not has_permissions({PERM_PROFILE_REQUESTS}):
+            return
+        profiler = start_profiler()
+        if profiler is not None:
+            g.profiler = profiler
+            g.profile_id = get_request_id()
+
+    @app.after_request
+    def save_request_profile(response: Response) -> Response:
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return response
+        tree = get_jwt().get("tree", "")
+        profile_id = g.pop("profile_id")
+        save_profile(profiler, app.config["PROFILE_DIR"], tree, profile_id)
+        response.headers[PROFILE_ID_HEADER] = profile_id
+        return response
@@ -0,0 +1,248 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Statistics of the database calls and timings of a request."""
+
+from __future__ import annotations
+
+import json
+import re
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from typing import Any, Callable, ContextManager, Dict, List, Optional
+
+from flask import Flask, Response, current_app, g, has_request_context, request
+from gramps.gen.db.base import DbReadBase
+
+from ..auth.const import PERM_VIEW_DIAGNOSTICS
+from .auth import has_permissions
+
+# database methods whose calls are counted
+DB_CALL_PATTERN = re.compile(r"(get_\w+_from_handle|iter_\w+|find_backlink_handles)$")
+
+
+class RequestStats:
+    """Database calls, timings and cache lookups of a single request."""
+
+    def __init__(self) -> None:
+        """Initialize the statistics."""
+        self.start = time.perf_counter()
+        # number of calls and cumulative time in seconds by method name
+        self.db_calls: Dict[str, List[Any]] = {}
+        self.timings: Dict[str, float] = {}
+        self.cache: Dict[str, Dict[str, int]] = {}
+
+    def add_db_call(self, name: str, seconds: float, count: int = 1) -> None:
+        """Record the call of a database method."""
+        calls = self.db_calls.setdefault(name, [0, 0.0])
+        calls[0] += count
+        calls[1] += seconds
+
+    @property
+    def db_count(self) -> int:
+        """Return the total number of database calls."""
+        return sum(count for count, _ in self.db_calls.values())
+
+    @property
+    def db_time(self) -> float:
+        """Return the total time spent in database calls in seconds."""
+        return sum(seconds for _, seconds in self.db_calls.values())
+
+    @contextmanager
+    def timer(self, name: str):
+        """Add the time spent in the context to a named timing."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = (
+                self.timings.get(name, 0.0) + time.perf_counter() - start
+            )
+
+    def add_cache_lookup(self, name: str, hit: bool, count: int = 1) -> None:
+        """Record lookups in a cache."""
+        if not count:
+            return
+        lookups = self.cache.setdefault(name, {"hits": 0, "misses": 0})
+        lookups["hits" if hit else "misses"] += count
+
+    def get_cache_status(self) -> Dict[str, str]:
+        """Return "hit", "miss" or "partial" for every cache looked up."""
+        status = {}
+        for name, lookups in self.cache.items():
+            if not lookups["misses"]:
+                status[name] = "hit"
+            elif not lookups["hits"]:
+                status[name] = "miss"
+            else:
+                status[name] = "partial"
+        return status
+
+    def get_server_timing(self, duration: float) -> str:
+        """Return the statistics as value of a Server-Timing header."""
+        metrics = [f'db;dur={self.db_time * 1000:.2f};desc="{self.db_count} calls"']
+        metrics += [
+            f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.timings.items()
+        ]
+        metrics.append(f"total;dur={duration * 1000:.2f}")
+        return ", ".join(metrics)
+
+    def get_breakdown(self, response: Response, duration: float) -> Dict[str, Any]:
+        """Return a breakdown of the statistics of a finished request."""
+        breakdown = {
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+            "size": response.content_length,
+            "duration_ms": _ms(duration),
+            "db": {
+                "calls": self.db_count,
+                "time_ms": _ms(self.db_time),
+                "methods": {
+                    name: {"calls": count, "time_ms": _ms(seconds)}
+                    for name, (count, seconds) in sorted(
+                        self.db_calls.items(), key=lambda item: -item[1][1]
+                    )
+                },
+            },
+            "timings_ms": {
+                name: _ms(seconds) for name, seconds in self.timings.items()
+            },
+            "cache": self.cache,
+        }
+        identity_map = g.get("identity_map")
+        if identity_map is not None:
+            breakdown["identity_map"] = identity_map.get_stats()
+        return breakdown
+
+
+def _ms(seconds: float) -> float:
+    """Convert seconds to milliseconds rounded to microseconds."""
+    return round(seconds * 1000, 3)
+
+
+def get_request_stats() -> Optional[RequestStats]:
+    """Return the statistics of the current request, if any."""
+    if not has_request_context():
+        return None
+    return g.get("request_stats")
+
+
+def record_cache_lookup(name: str, hit: bool, count: int = 1) -> None:
+    """Record cache lookups in the statistics of the current request, if any."""
+    stats = get_request_stats()
+    if stats is not None:
+        stats.add_cache_lookup(name, hit, count)
+
+
+def request_timer(name: str) -> ContextManager:
+    """Return a context manager adding to a timing of the current request."""
+    stats = get_request_stats()
+    if stats is None:
+        return nullcontext()
+    return stats.timer(name)
+
+
+def _can_view_diagnostics() -> bool:
+    """Return whether the user of the current request may view diagnostics."""
+    try:
+        return has_permissions({PERM_VIEW_DIAGNOSTICS})
+    except RuntimeError:
+        # no token was verified in this request
+        return False
+
+
+def _wrap_db_method(
+    method: Callable, name: str, stats: RequestStats
+) -> Callable[..., Any]:
+    """Wrap a database method to record its calls."""
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = method(*args, **kwargs)
+        stats.add_db_call(name, time.perf_counter() - start)
+        if isinstance(result, Iterator):
+            # the time is spent while iterating
+            return _iter_timed(result, name, stats)
+        return result
+
+    return wrapper
+
+
+def _iter_timed(iterator: Iterator, name: str, stats: RequestStats) -> Iterator[Any]:
+    """Iterate and add the time spent to a database method."""
+    seconds = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                seconds += time.perf_counter() - start
+            yield item
+    finally:
+        stats.add_db_call(name, seconds, count=0)
+
+
+def instrument_db(db: DbReadBase) -> None:
+    """Record the calls of a request's database instance, if needed.
+
+    The lookup methods are only wrapped if the request is logged when it is
+    slow or if the user may view the statistics.
+    """
+    stats = get_request_stats()
+    if stats is None:
+        return
+    logged = bool(current_app.config["SLOW_REQUEST_THRESHOLD"])
+    if not logged and not _can_view_diagnostics():
+        return
+    for name in dir(type(db)):
+        if DB_CALL_PATTERN.match(name):
+            method = getattr(db, name)
+            if callable(method):
+                setattr(db, name, _wrap_db_method(method, name, stats))
+
+
+def init_request_stats(app: Flask) -> None:
+    """Register the hooks collecting the statistics of every request."""
+
+    @app.before_request
+    def start_request_stats() -> None:
+        g.request_stats = RequestStats()
+
+    @app.after_request
+    def finish_request_stats(response: Response) -> Response:
+        stats = g.pop("request_stats", None)
+        if stats is None:
+            return response
+        duration = time.perf_counter() - stats.start
+        if _can_view_diagnostics():
+            response.headers["Server-Timing"] = stats.get_server_timing(duration)
+        threshold = app.config["SLOW_REQUEST_THRESHOLD"]
+        if threshold and duration > threshold:
+            app.logger.warning(
+                "Slow request: %s", json.dumps(stats.get_breakdown(response, duration))
+            )
+        return response
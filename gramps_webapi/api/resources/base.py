@@ -40,11 +40,14 @@ from ...auth.const import PERM_ADD_OBJ, PERM_DEL_OBJ, PERM_EDIT_OBJ
 from ...const import GRAMPS_OBJECT_PLURAL
 from ..auth import require_permissions
 from ..cache import request_cache_decorator
+from ..media import update_usage_media_from_transaction
 from ..search import SearchIndexer, get_search_indexer
+from ..sorted_handles import get_sorted_handle_index
 from ..tasks import run_task, update_search_indices_from_transaction
 from ..util import (
     check_quota_people,
     get_db_handle,
+    get_identity_map,
     get_locale_for_language,
     get_tree_from_jwt_or_fail,
     gramps_object_from_dict,
@@ -67,6 +70,8 @@ from .util import (
     get_reference_profile_for_object,
     get_soundex,
     hash_object,
+    prefetch_extended_attributes,
+    prefetch_profiles,
     transaction_to_json,
     update_object,
     validate_object_dict,
@@ -89,7 +94,9 @@ class GrampsObjectResourceHelper(GrampsJSONEncoder):
                 abort_with_message(
                     422, f"Option soundex is not allowed for {self.gramps_class_name}"
                 )
-            obj.soundex = get_soundex(self.db_handle, obj, self.gramps_class_name)
+            obj.soundex = get_soundex(
+                self.db_handle_cached, obj, self.gramps_class_name
+            )
         obj = self.object_extend(obj, args, locale=locale)
         if args.get("profile") and (
             "all" in args["profile"] or "references" in args["profile"]
@@ -98,22 +105,37 @@ class GrampsObjectResourceHelper(GrampsJSONEncoder):
                 # create profile if doesn't exist
                 obj.profile = {}
             obj.profile["references"] = get_reference_profile_for_object(
-                self.db_handle, obj, locale=locale
+                self.db_handle_cached, obj, locale=locale
             )
         return obj
 
     def object_extend(self, obj: T, args: dict, locale: GrampsLocale = glocale) -> T:
         """Extend the base object attributes as needed."""
         if "extend" in args:
-            obj.extended = get_extended_attributes(self.db_handle, obj, args)
+            obj.extended = get_extended_attributes(self.db_handle_cached, obj, args)
         return obj
 
+    def prefetch_objects(self, objects: list[GrampsObject], args: dict) -> None:
+        """Load the objects referenced by a list of objects in batches."""
+        db_handle = self.db_handle_cached
+        if args.get("profile"):
+            prefetch_profiles(
+                db_handle, objects, self.gramps_class_name, args["profile"]
+            )
+        if args.get("extend"):
+            prefetch_extended_attributes(db_handle, objects, args)
+
     def sort_objects(
         self, objects: list[GrampsObject], args: dict, locale: GrampsLocale = glocale
     ) -> list:
         """Sort the list of objects as needed."""
         return sort_objects(
-            self.db_handle, self.gramps_class_name, objects, args, locale=locale
+            self.db_handle,
+            self.gramps_class_name,
+            objects,
+            args,
+            locale=locale,
+            tree_id=get_tree_from_jwt_or_fail(),
         )
 
     def match_dates(self, objects: list[GrampsObject], date: str) -> list[GrampsObject]:
@@ -127,6 +149,11 @@ class GrampsObjectResourceHelper(GrampsJSONEncoder):
         """Get the readonly database instance."""
         return get_db_handle(readonly=True)
 
+    @property
+    def db_handle_cached(self) -> DbReadBase:
+        """Get the readonly database instance wrapped in an identity map."""
+        return get_identity_map()
+
     @property
     def db_handle_writable(self) -> DbReadBase:
         """Get the writable database instance."""
@@ -257,6 +284,8 @@ class GrampsObjectResource(GrampsObjectResourceHelper, Resource):
         # update usage
         if self.gramps_class_name == "Person":
             update_usage_people()
+        elif self.gramps_class_name == "Media":
+            update_usage_media_from_transaction(trans_dict)
         # update search index
         tree = get_tree_from_jwt_or_fail()
         indexer: SearchIndexer = get_search_indexer(tree)
@@ -284,6 +313,8 @@ class GrampsObjectResource(GrampsObjectResourceHelper, Resource):
             except ValueError as exc:
                 abort_with_message(400, "Error while updating object")
             trans_dict = transaction_to_json(trans)
+        if self.gramps_class_name == "Media":
+            update_usage_media_from_transaction(trans_dict)
         # update search index
         tree = get_tree_from_jwt_or_fail()
         user_id = get_jwt_identity()
@@ -400,16 +431,15 @@ class GrampsObjectsResource(GrampsObjectResourceHelper, Resource):
         # for all objects except events, repos, and notes, Gramps supports
         # a database-backed default sort order. Use that if no sort order
         # requested.
-        query_method = self.db_handle.method("get_%s_handles", self.gramps_class_name)
-        assert query_method is not None  # type checker
-        if self.gramps_class_name in ["Event", "Repository", "Note"]:
-            handles = query_method()
-        else:
-            handles = query_method(sort_handles=True, locale=locale)
-        handle_index = {handle: index for index, handle in enumerate(handles)}
+        handle_index = get_sorted_handle_index(
+            self.db_handle,
+            self.gramps_class_name,
+            tree_id=get_tree_from_jwt_or_fail(),
+            locale=locale,
+        )
         # sort objects by the sorted handle order
         objects = sorted(
-            objects, key=lambda obj: handle_index.get(obj.handle, len(handles) + 1)
+            objects, key=lambda obj: handle_index.get(obj.handle, len(handle_index))
         )
 
         if "filter" in args or "rules" in args:
@@ -454,6 +484,8 @@ class GrampsObjectsResource(GrampsObjectResourceHelper, Resource):
             offset = (args["page"] - 1) * args["pagesize"]
             objects = objects[offset : offset + args["pagesize"]]
 
+        self.prefetch_objects(objects, args)
+
         return self.response(
             200,
             [self.full_object(obj, args, locale=locale) for obj in objects],
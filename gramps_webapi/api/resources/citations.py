@@ -49,13 +49,13 @@ class CitationResourceHelper(GrampsObjectResourceHelper):
         """Extend citation attributes as needed."""
         if "profile" in args:
             obj.profile = get_citation_profile_for_object(
-                self.db_handle, obj, args["profile"]
+                self.db_handle_cached, obj, args["profile"]
             )
         if "extend" in args:
-            obj.extended = get_extended_attributes(self.db_handle, obj, args)
+            obj.extended = get_extended_attributes(self.db_handle_cached, obj, args)
             if "all" in args["extend"] or "source_handle" in args["extend"]:
                 obj.extended["source"] = get_source_by_handle(
-                    self.db_handle, obj.source_handle, args
+                    self.db_handle_cached, obj.source_handle, args
                 )
         return obj
 
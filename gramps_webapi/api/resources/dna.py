@@ -30,7 +30,6 @@ from gramps.gen.const import GRAMPS_LOCALE as glocale
 from gramps.gen.db.base import DbReadBase
 from gramps.gen.errors import HandleError
 from gramps.gen.lib import Citation, Note, Person
-from gramps.gen.relationship import get_relationship_calculator
 from gramps.gen.utils.grampslocale import GrampsLocale
 from webargs import fields, validate
 
@@ -40,6 +39,7 @@ from gramps_webapi.types import Handle, MatchSegment, ResponseReturnValue
 
 from ...types import Handle
 from ..cache import request_cache_decorator
+from ..locales import get_relationship_calculator_for_locale
 from ..util import get_db_handle, get_locale_for_language, use_args
 from . import ProtectedResource
 from .util import get_person_profile_for_handle
@@ -113,7 +113,7 @@ def get_match_data(
     include_raw_data: bool = False,
 ) -> dict[str, Any]:
     """Get the DNA match data in the appropriate format."""
-    relationship = get_relationship_calculator(reinit=True, clocale=locale)
+    relationship = get_relationship_calculator_for_locale(locale)
     association = person.get_person_ref_list()[association_index]
     associate = db_handle.get_person_from_handle(association.ref)
     data, _ = relationship.get_relationship_distance_new(
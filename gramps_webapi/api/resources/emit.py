@@ -27,6 +27,7 @@ from flask import Response, current_app, json
 from gramps.gen.db import DbBookmarks
 from gramps.gen.lib.baseobj import BaseObject
 
+from ..request_stats import request_timer
 from .util import return_304_if_unchanged
 
 
@@ -72,12 +73,13 @@ class GrampsJSONEncoder:
             self.filter_skip_keys = args["skipkeys"]
         else:
             self.filter_skip_keys = []
-        response_string = json.dumps(
-            self.extract_objects(payload),
-            ensure_ascii=False,
-            sort_keys=True,
-            default=default,
-        )
+        with request_timer("serialize"):
+            response_string = json.dumps(
+                self.extract_objects(payload),
+                ensure_ascii=False,
+                sort_keys=True,
+                default=default,
+            )
         res = Response(
             status=status,
             response=response_string,
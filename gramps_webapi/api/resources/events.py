@@ -55,7 +55,7 @@ class EventResourceHelper(GrampsObjectResourceHelper):
         self, obj: Event, args: Dict, locale: GrampsLocale = glocale
     ) -> Event:
         """Extend event attributes as needed."""
-        db_handle = self.db_handle
+        db_handle = self.db_handle_cached
         if "extend" in args:
             obj.extended = get_extended_attributes(db_handle, obj, args)
             if "all" in args["extend"] or "place" in args["extend"]:
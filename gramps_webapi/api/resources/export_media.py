@@ -22,15 +22,31 @@
 import os
 import re
 import time
+from typing import Dict, Optional
 
-from flask import Response, abort, current_app, jsonify, send_file
+from flask import (
+    Response,
+    abort,
+    current_app,
+    jsonify,
+    send_file,
+    stream_with_context,
+)
 from flask_jwt_extended import get_jwt_identity
+from webargs import fields, validate
 
 from ...auth.const import PERM_VIEW_PRIVATE
 from ..auth import has_permissions
+from ..media import get_media_handler
 from ..ratelimiter import limiter_per_user
 from ..tasks import AsyncResult, export_media, make_task_response, run_task
-from ..util import abort_with_message, get_buffer_for_file, get_tree_from_jwt
+from ..util import (
+    abort_with_message,
+    get_buffer_for_file,
+    get_db_handle,
+    get_tree_from_jwt_or_fail,
+    use_args,
+)
 from . import ProtectedResource
 from gramps_webapi.types import ResponseReturnValue
 
@@ -40,19 +56,55 @@ def get_limit() -> str:
     return current_app.config["RATE_LIMIT_MEDIA_ARCHIVE"]
 
 
+def stream_media_archive(
+    tree: str, view_private: bool, since: Optional[int]
+) -> Response:
+    """Stream a media archive directly to the response."""
+    db_handle = get_db_handle()
+    media_handler = get_media_handler(db_handle, tree=tree)
+    chunks = media_handler.stream_file_archive(
+        db_handle, include_private=view_private, since=since
+    )
+    date_str = time.strftime("%Y%m%d%H%M%S")
+    download_name = f"gramps-web-media-export-{date_str}.zip"
+    return Response(
+        stream_with_context(chunks),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={download_name}"},
+    )
+
+
 class MediaArchiveResource(ProtectedResource):
     """Resource for downloading an archive of media files."""
 
     @limiter_per_user.limit(get_limit)
-    def post(self) -> ResponseReturnValue:
-        """Create an archive of media files."""
-        tree = get_tree_from_jwt()
+    @use_args(
+        {
+            "since": fields.Integer(load_default=None, validate=validate.Range(min=0)),
+            "stream": fields.Boolean(load_default=False),
+        },
+        location="query",
+    )
+    def post(self, args: Dict) -> ResponseReturnValue:
+        """Create an archive of media files.
+
+        If `stream` is true, the archive is streamed directly instead of
+        being created in the background. If `since` is given, only media
+        changed after this Unix timestamp are included.
+        """
+        tree = get_tree_from_jwt_or_fail()
         user_id = get_jwt_identity()
+        view_private = has_permissions({PERM_VIEW_PRIVATE})
+        if args["stream"]:
+            return stream_media_archive(
+                tree=tree, view_private=view_private, since=args["since"]
+            )
         task = run_task(
             export_media,
             tree=tree,
             user_id=user_id,
-            view_private=has_permissions({PERM_VIEW_PRIVATE}),
+            view_private=view_private,
+            since=args["since"],
         )
         if isinstance(task, AsyncResult):
             return make_task_response(task)
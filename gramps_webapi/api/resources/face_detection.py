@@ -23,11 +23,15 @@
 from http import HTTPStatus
 
 from flask import Response, abort
+from flask_jwt_extended import get_jwt_identity
 from gramps.gen.errors import HandleError
 
+from ...auth.const import PERM_TRIGGER_REINDEX
+from ..auth import require_permissions
 from ..cache import request_cache_decorator
 from ..media import get_media_handler
-from ..util import get_db_handle, get_tree_from_jwt
+from ..tasks import AsyncResult, detect_faces_all, make_task_response, run_task
+from ..util import get_db_handle, get_tree_from_jwt, get_tree_from_jwt_or_fail
 from . import ProtectedResource
 
 
@@ -47,3 +51,17 @@ class MediaFaceDetectionResource(ProtectedResource):
             handle, db_handle=db_handle
         )
         return handler.get_face_regions(etag=obj.checksum)
+
+
+class MediaFacesDetectionResource(ProtectedResource):
+    """Resource to run face detection on all media files."""
+
+    def post(self) -> Response:
+        """Trigger face detection on all media files."""
+        require_permissions([PERM_TRIGGER_REINDEX])
+        tree = get_tree_from_jwt_or_fail()
+        user_id = get_jwt_identity()
+        task = run_task(detect_faces_all, tree=tree, user_id=user_id)
+        if isinstance(task, AsyncResult):
+            return make_task_response(task)
+        return Response(status=201)
@@ -51,7 +51,7 @@ class FamilyResourceHelper(GrampsObjectResourceHelper):
         self, obj: Family, args: Dict, locale: GrampsLocale = glocale
     ) -> Family:
         """Extend family attributes as needed."""
-        db_handle = self.db_handle
+        db_handle = self.db_handle_cached
         if "profile" in args:
             obj.profile = get_family_profile_for_object(
                 db_handle, obj, args["profile"], locale=locale
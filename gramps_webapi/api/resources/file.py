@@ -26,6 +26,7 @@ from http import HTTPStatus
 from typing import Dict
 
 from flask import Response, abort, request
+from flask_jwt_extended import get_jwt_identity
 from gramps.gen.db import DbTxn
 from gramps.gen.errors import HandleError
 from gramps.gen.lib import Media
@@ -34,8 +35,20 @@ from webargs import fields
 from ...auth.const import PERM_EDIT_OBJ
 from ..auth import require_permissions
 from ..file import process_file
-from ..media import check_quota_media, get_media_handler, update_usage_media
-from ..util import abort_with_message, get_db_handle, get_tree_from_jwt, use_args
+from ..media import (
+    add_usage_media,
+    check_quota_media,
+    get_media_handler,
+    update_usage_media_from_transaction,
+)
+from ..tasks import pregenerate_thumbnails
+from ..util import (
+    abort_with_message,
+    get_db_handle,
+    get_tree_from_jwt,
+    get_tree_from_jwt_or_fail,
+    use_args,
+)
 from . import ProtectedResource
 from .util import transaction_to_json, update_object
 
@@ -89,7 +102,7 @@ class MediaFileResource(ProtectedResource):
         if not mime:
             abort_with_message(HTTPStatus.NOT_ACCEPTABLE, "Media type not recognized")
         checksum, size, f = process_file(request.stream)
-        tree = get_tree_from_jwt()
+        tree = get_tree_from_jwt_or_fail()
         media_handler = get_media_handler(db_handle, tree)
         file_handler = media_handler.get_file_handler(handle, db_handle=db_handle)
         if checksum == obj.checksum:
@@ -105,6 +118,10 @@ class MediaFileResource(ProtectedResource):
             # use existing path
             path = obj.get_path()
             media_handler.upload_file(f, checksum, mime, path=path)
+            add_usage_media(checksum, size, tree=tree)
+            pregenerate_thumbnails(
+                tree=tree, user_id=get_jwt_identity(), handles=[handle]
+            )
             return Response(status=200)
         if args.get("uploadmissing"):
             abort_with_message(
@@ -127,7 +144,9 @@ class MediaFileResource(ProtectedResource):
             except (AttributeError, ValueError) as exc:
                 abort_with_message(400, "Error while updating object")
             trans_dict = transaction_to_json(trans)
-        update_usage_media()
+        add_usage_media(checksum, size, tree=tree)
+        update_usage_media_from_transaction(trans_dict, tree=tree)
+        pregenerate_thumbnails(tree=tree, user_id=get_jwt_identity(), handles=[handle])
         return Response(
             response=json.dumps(trans_dict), status=200, mimetype="application/json"
         )
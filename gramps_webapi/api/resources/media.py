@@ -25,6 +25,7 @@ from http import HTTPStatus
 from typing import Dict
 
 from flask import Response, abort, request
+from flask_jwt_extended import get_jwt_identity
 from gramps.gen.const import GRAMPS_LOCALE as glocale
 from gramps.gen.db import DbTxn
 from gramps.gen.lib import Media
@@ -33,8 +34,9 @@ from gramps.gen.utils.grampslocale import GrampsLocale
 from ...auth.const import PERM_ADD_OBJ
 from ..auth import require_permissions
 from ..file import process_file
-from ..media import check_quota_media, get_media_handler, update_usage_media
-from ..util import abort_with_message, get_tree_from_jwt
+from ..media import add_usage_media, check_quota_media, get_media_handler
+from ..tasks import pregenerate_thumbnails
+from ..util import abort_with_message, get_tree_from_jwt_or_fail
 from .base import (
     GrampsObjectProtectedResource,
     GrampsObjectResourceHelper,
@@ -59,10 +61,10 @@ class MediaObjectResourceHelper(GrampsObjectResourceHelper):
         """Extend media attributes as needed."""
         if "profile" in args:
             obj.profile = get_media_profile_for_object(
-                self.db_handle, obj, args["profile"], locale=locale
+                self.db_handle_cached, obj, args["profile"], locale=locale
             )
         if "extend" in args:
-            obj.extended = get_extended_attributes(self.db_handle, obj, args)
+            obj.extended = get_extended_attributes(self.db_handle_cached, obj, args)
         return obj
 
 
@@ -81,7 +83,7 @@ class MediaObjectsResource(GrampsObjectsProtectedResource, MediaObjectResourceHe
             abort_with_message(HTTPStatus.NOT_ACCEPTABLE, "Media type not recognized")
         checksum, size, f = process_file(request.stream)
         check_quota_media(to_add=size)
-        tree = get_tree_from_jwt()
+        tree = get_tree_from_jwt_or_fail()
         media_handler = get_media_handler(self.db_handle, tree)
         media_handler.upload_file(f, checksum, mime)
         path = media_handler.get_default_filename(checksum, mime)
@@ -96,5 +98,8 @@ class MediaObjectsResource(GrampsObjectsProtectedResource, MediaObjectResourceHe
             except ValueError as exc:
                 abort_with_message(400, "Error while adding object")
             trans_dict = transaction_to_json(trans)
-        update_usage_media()
+        add_usage_media(checksum, size, tree=tree)
+        pregenerate_thumbnails(
+            tree=tree, user_id=get_jwt_identity(), handles=[obj.handle]
+        )
         return self.response(201, trans_dict, total_items=len(trans_dict))
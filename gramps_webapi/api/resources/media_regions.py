@@ -0,0 +1,150 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Batch endpoint for cropped regions of media files."""
+
+import base64
+import uuid
+from typing import BinaryIO, Dict, List
+
+from flask import Response, jsonify
+from marshmallow import Schema, ValidationError, validates_schema
+from PIL import Image
+from webargs import fields, validate
+
+from ...const import MIME_JPEG
+from ..image import CropRegion, image_sprite, save_image_buffer
+from ..media import get_media_handler
+from ..util import get_db_handle, get_tree_from_jwt, use_args
+from . import ProtectedResource
+
+# maximum number of regions per request
+MAX_REGIONS = 200
+# default and maximum size of a region in pixels
+DEFAULT_REGION_SIZE = 200
+MAX_REGION_SIZE = 500
+
+
+class RegionSchema(Schema):
+    """Structure for a cropped region of a media file."""
+
+    handle = fields.Str(required=True, validate=validate.Length(min=1))
+    x1 = fields.Integer(required=True, validate=validate.Range(min=0, max=100))
+    y1 = fields.Integer(required=True, validate=validate.Range(min=0, max=100))
+    x2 = fields.Integer(required=True, validate=validate.Range(min=0, max=100))
+    y2 = fields.Integer(required=True, validate=validate.Range(min=0, max=100))
+    size = fields.Integer(
+        load_default=DEFAULT_REGION_SIZE,
+        validate=validate.Range(min=1, max=MAX_REGION_SIZE),
+    )
+    square = fields.Boolean(required=False, load_default=False)
+
+    @validates_schema
+    def validate_box(self, data, **kwargs):
+        """Validate that the region is not empty."""
+        if data["x2"] <= data["x1"]:
+            raise ValidationError("x2 must be greater than x1.", "x2")
+        if data["y2"] <= data["y1"]:
+            raise ValidationError("y2 must be greater than y1.", "y2")
+
+
+def make_multipart_response(images: List[BinaryIO]) -> Response:
+    """Make a multipart/mixed response with one JPEG image per part."""
+    boundary = uuid.uuid4().hex
+    parts: List[bytes] = []
+    for index, image in enumerate(images):
+        parts.append(
+            (
+                f"--{boundary}\r\n"
+                f"Content-Type: {MIME_JPEG}\r\n"
+                f"Content-ID: <{index}>\r\n\r\n"
+            ).encode()
+        )
+        parts.append(image.read())
+        parts.append(b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return Response(b"".join(parts), mimetype=f"multipart/mixed; boundary={boundary}")
+
+
+def make_sprite_response(images: List[BinaryIO], regions: List[Dict]) -> Response:
+    """Make a JSON response with a sprite sheet and an index of the regions."""
+    sprite, boxes = image_sprite([Image.open(image) for image in images])
+    buffer = save_image_buffer(sprite)
+    index = []
+    for region, (left, top, width, height) in zip(regions, boxes):
+        index.append(
+            {**region, "left": left, "top": top, "width": width, "height": height}
+        )
+    data = base64.b64encode(buffer.read()).decode()
+    return jsonify({"image": f"data:{MIME_JPEG};base64,{data}", "regions": index})
+
+
+class MediaRegionsResource(ProtectedResource):
+    """Resource for cropped regions of several media files."""
+
+    @use_args(
+        {
+            "regions": fields.List(
+                fields.Nested(RegionSchema),
+                required=True,
+                validate=validate.Length(min=1, max=MAX_REGIONS),
+            ),
+            "format": fields.Str(
+                load_default="sprite",
+                validate=validate.OneOf(["sprite", "multipart"]),
+            ),
+        },
+        location="json",
+    )
+    def post(self, args: Dict) -> Response:
+        """Get cropped regions of media files.
+
+        The regions are grouped by media file, so that every file is only
+        read and decoded once.
+        """
+        tree = get_tree_from_jwt()
+        db_handle = get_db_handle()
+        media_handler = get_media_handler(db_handle, tree=tree)
+        regions = args["regions"]
+        indices_by_handle: Dict[str, List[int]] = {}
+        for index, region in enumerate(regions):
+            indices_by_handle.setdefault(region["handle"], []).append(index)
+        images: List[BinaryIO] = [None] * len(regions)  # type: ignore[list-item]
+        for handle, indices in indices_by_handle.items():
+            handler = media_handler.get_file_handler(handle, db_handle=db_handle)
+            crop_regions = [
+                CropRegion(
+                    x1=regions[index]["x1"],
+                    y1=regions[index]["y1"],
+                    x2=regions[index]["x2"],
+                    y2=regions[index]["y2"],
+                    size=regions[index]["size"],
+                    square=regions[index]["square"],
+                )
+                for index in indices
+            ]
+            for index, image in zip(indices, handler.get_regions(crop_regions)):
+                images[index] = image
+        try:
+            if args["format"] == "multipart":
+                return make_multipart_response(images)
+            return make_sprite_response(images, regions)
+        finally:
+            for image in images:
+                image.close()
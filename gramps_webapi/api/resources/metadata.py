@@ -20,23 +20,23 @@
 
 """Metadata API resource."""
 
-import gramps_ql as gql
-import object_ql as oql
-import pytesseract
-import sifts
+from typing import Any, Dict
+
 from flask import Response, current_app
-from gramps.gen.const import ENV, GRAMPS_LOCALE
+from gramps.gen.const import GRAMPS_LOCALE
 from gramps.gen.db.base import DbReadBase
 from gramps.gen.db.generic import DbGeneric
 from gramps.gen.db.utils import get_dbid_from_path
 from gramps.gen.utils.grampslocale import INCOMPLETE_TRANSLATIONS
 from webargs import fields
 
-from gramps_webapi.const import TREE_MULTI, VERSION
+from gramps_webapi.const import VERSION
 
 from ...auth.const import PERM_VIEW_PRIVATE
 from ...dbmanager import WebDbManager
 from ..auth import has_permissions
+from ..cache import TREE_METADATA_TIMEOUT, make_cache_key_tree_metadata, request_cache
+from ..capabilities import get_server_capabilities, get_versions
 from ..search import get_search_indexer, get_semantic_search_indexer
 from ..util import get_db_handle, get_tree_from_jwt_or_fail, use_args
 from . import ProtectedResource
@@ -54,6 +54,68 @@ def get_dbid_from_tree_id(tree_id: str) -> str:
     return get_dbid_from_path(db_path)
 
 
+def get_tree_metadata(
+    db_handle: DbReadBase, tree_id: str, include_private: bool
+) -> Dict[str, Any]:
+    """Get the database details and the object and search counts of a tree."""
+    database = {
+        "id": db_handle.get_dbid(),
+        "name": db_handle.get_dbname(),
+        "type": get_dbid_from_tree_id(tree_id),
+    }
+    data = db_handle.get_summary()
+    db_version_key = GRAMPS_LOCALE.translation.sgettext("Database version")
+    db_module_key = GRAMPS_LOCALE.translation.sgettext("Database module version")
+    db_schema_key = GRAMPS_LOCALE.translation.sgettext("Schema version")
+    for item in data:
+        if item == db_version_key:
+            database["version"] = data[item]
+        elif item == db_module_key:
+            database["module"] = data[item]
+        elif item == db_schema_key:
+            database["schema"] = data[item]
+    if isinstance(db_handle, DbGeneric):
+        database["actual_schema"] = db_handle.get_schema_version()
+    searcher = get_search_indexer(tree_id)
+    search_counts = {"count": searcher.count(include_private=include_private)}
+    if current_app.config.get("VECTOR_EMBEDDING_MODEL"):
+        searcher_s = get_semantic_search_indexer(tree_id)
+        search_counts["count_semantic"] = searcher_s.count(
+            include_private=include_private
+        )
+    return {
+        "database": database,
+        "object_counts": {
+            "people": db_handle.get_number_of_people(),
+            "families": db_handle.get_number_of_families(),
+            "sources": db_handle.get_number_of_sources(),
+            "citations": db_handle.get_number_of_citations(),
+            "events": db_handle.get_number_of_events(),
+            "media": db_handle.get_number_of_media(),
+            "places": db_handle.get_number_of_places(),
+            "repositories": db_handle.get_number_of_repositories(),
+            "notes": db_handle.get_number_of_notes(),
+            "tags": db_handle.get_number_of_tags(),
+        },
+        "search_counts": search_counts,
+    }
+
+
+def get_tree_metadata_cached(
+    db_handle: DbReadBase, tree_id: str, include_private: bool
+) -> Dict[str, Any]:
+    """Get the tree metadata, cached until the database changes."""
+    cache_key = make_cache_key_tree_metadata(tree_id, include_private)
+    if cache_key is not None:
+        tree_metadata = request_cache.get(cache_key)
+        if tree_metadata is not None:
+            return tree_metadata
+    tree_metadata = get_tree_metadata(db_handle, tree_id, include_private)
+    if cache_key is not None:
+        request_cache.set(cache_key, tree_metadata, timeout=TREE_METADATA_TIMEOUT)
+    return tree_metadata
+
+
 class MetadataResource(ProtectedResource, GrampsJSONEncoder):
     """Metadata resource."""
 
@@ -77,54 +139,24 @@ class MetadataResource(ProtectedResource, GrampsJSONEncoder):
                 break
 
         db_handle = self.db_handle
-        db_name = db_handle.get_dbname()
         tree_id = get_tree_from_jwt_or_fail()
-        db_type = get_dbid_from_tree_id(tree_id)
-        is_multi_tree = current_app.config["TREE"] == TREE_MULTI
-        has_task_queue = bool(current_app.config["CELERY_CONFIG"])
-        has_semantic_search = bool(current_app.config["VECTOR_EMBEDDING_MODEL"])
-        has_chat = has_semantic_search and bool(current_app.config["LLM_MODEL"])
-
-        try:
-            pytesseract.get_tesseract_version()
-            has_ocr = True
-            ocr_languages = [
-                lang for lang in pytesseract.get_languages() if lang != "osd"
-            ]
-        except pytesseract.TesseractNotFoundError:
-            has_ocr = False
-            ocr_languages = []
-        searcher = get_search_indexer(tree_id)
-        search_count = searcher.count(
-            include_private=has_permissions({PERM_VIEW_PRIVATE})
+        tree_metadata = get_tree_metadata_cached(
+            db_handle, tree_id, include_private=has_permissions({PERM_VIEW_PRIVATE})
         )
-        sifts_info = {
-            "version": sifts.__version__,
-            "count": search_count,
-        }
-        if current_app.config.get("VECTOR_EMBEDDING_MODEL"):
-            searcher_s = get_semantic_search_indexer(tree_id)
-            search_count_s = searcher_s.count(
-                include_private=has_permissions({PERM_VIEW_PRIVATE})
-            )
-            sifts_info["count_semantic"] = search_count_s
+        versions = get_versions()
 
         result = {
-            "database": {
-                "id": db_handle.get_dbid(),
-                "name": db_name,
-                "type": db_type,
-            },
+            "database": dict(tree_metadata["database"]),
             "default_person": db_handle.get_default_handle(),
             "gramps": {
-                "version": ENV["VERSION"],
+                "version": versions["gramps"],
             },
             "gramps_webapi": {
                 "schema": VERSION,
-                "version": VERSION,
+                "version": versions["gramps_webapi"],
             },
-            "gramps_ql": {"version": gql.__version__},
-            "object_ql": {"version": oql.__version__},
+            "gramps_ql": {"version": versions["gramps_ql"]},
+            "object_ql": {"version": versions["object_ql"]},
             "locale": {
                 "lang": GRAMPS_LOCALE.lang,
                 "language": GRAMPS_LOCALE.language[0],
@@ -133,44 +165,16 @@ class MetadataResource(ProtectedResource, GrampsJSONEncoder):
                     GRAMPS_LOCALE.language[0] in INCOMPLETE_TRANSLATIONS
                 ),
             },
-            "object_counts": {
-                "people": db_handle.get_number_of_people(),
-                "families": db_handle.get_number_of_families(),
-                "sources": db_handle.get_number_of_sources(),
-                "citations": db_handle.get_number_of_citations(),
-                "events": db_handle.get_number_of_events(),
-                "media": db_handle.get_number_of_media(),
-                "places": db_handle.get_number_of_places(),
-                "repositories": db_handle.get_number_of_repositories(),
-                "notes": db_handle.get_number_of_notes(),
-                "tags": db_handle.get_number_of_tags(),
-            },
+            "object_counts": dict(tree_metadata["object_counts"]),
             "researcher": db_handle.get_researcher(),
             "search": {
-                "sifts": sifts_info,
-            },
-            "server": {
-                "multi_tree": is_multi_tree,
-                "task_queue": has_task_queue,
-                "ocr": has_ocr,
-                "ocr_languages": ocr_languages,
-                "semantic_search": has_semantic_search,
-                "chat": has_chat,
+                "sifts": {
+                    "version": versions["sifts"],
+                    **tree_metadata["search_counts"],
+                },
             },
+            "server": get_server_capabilities(),
         }
         if args["surnames"]:
             result["surnames"] = db_handle.get_surname_list()
-        data = db_handle.get_summary()
-        db_version_key = GRAMPS_LOCALE.translation.sgettext("Database version")
-        db_module_key = GRAMPS_LOCALE.translation.sgettext("Database module version")
-        db_schema_key = GRAMPS_LOCALE.translation.sgettext("Schema version")
-        for item in data:
-            if item == db_version_key:
-                result["database"]["version"] = data[item]
-            elif item == db_module_key:
-                result["database"]["module"] = data[item]
-            elif item == db_schema_key:
-                result["database"]["schema"] = data[item]
-        if isinstance(db_handle, DbGeneric):
-            result["database"]["actual_schema"] = db_handle.get_schema_version()
         return self.response(200, result)
@@ -68,7 +68,7 @@ class NoteResourceHelper(GrampsObjectResourceHelper):
                 for fmt in formats_allowed
             }
         if "extend" in args:
-            obj.extended = get_extended_attributes(self.db_handle, obj, args)
+            obj.extended = get_extended_attributes(self.db_handle_cached, obj, args)
         return obj
 
     def get_formatted_note(
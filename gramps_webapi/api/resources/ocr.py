@@ -27,10 +27,16 @@ from flask_jwt_extended import get_jwt_identity
 from gramps.gen.errors import HandleError
 from webargs import fields, validate
 
-from ...auth.const import PERM_VIEW_PRIVATE
-from ..auth import has_permissions
-from ..tasks import AsyncResult, make_task_response, media_ocr, run_task
-from ..util import get_db_handle, get_tree_from_jwt, use_args
+from ...auth.const import PERM_TRIGGER_REINDEX, PERM_VIEW_PRIVATE
+from ..auth import has_permissions, require_permissions
+from ..tasks import (
+    AsyncResult,
+    make_task_response,
+    media_ocr,
+    media_ocr_all,
+    run_task,
+)
+from ..util import get_db_handle, get_tree_from_jwt, get_tree_from_jwt_or_fail, use_args
 from . import ProtectedResource
 from gramps_webapi.types import ResponseReturnValue
 
@@ -68,3 +74,21 @@ class MediaOcrResource(ProtectedResource):
         if isinstance(task, (str, bytes)):
             return task, 201
         return jsonify(task), 201
+
+
+class MediaOcrAllResource(ProtectedResource):
+    """Resource to run text recognition on all media files."""
+
+    @use_args(
+        {"lang": fields.Str(required=True, validate=validate.Length(min=1))},
+        location="query",
+    )
+    def post(self, args: Dict) -> ResponseReturnValue:
+        """Trigger text recognition on all media files."""
+        require_permissions([PERM_TRIGGER_REINDEX])
+        tree = get_tree_from_jwt_or_fail()
+        user_id = get_jwt_identity()
+        task = run_task(media_ocr_all, tree=tree, user_id=user_id, lang=args["lang"])
+        if isinstance(task, AsyncResult):
+            return make_task_response(task)
+        return jsonify(task), 201
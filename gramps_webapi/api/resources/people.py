@@ -47,7 +47,7 @@ class PersonResourceHelper(GrampsObjectResourceHelper):
         self, obj: Person, args: Dict, locale: GrampsLocale = glocale
     ) -> Person:
         """Extend person attributes as needed."""
-        db_handle = self.db_handle
+        db_handle = self.db_handle_cached
         if "profile" in args:
             obj.profile = get_person_profile_for_object(
                 db_handle, obj, args["profile"], locale=locale
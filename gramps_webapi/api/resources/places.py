@@ -43,7 +43,7 @@ class PlaceResourceHelper(GrampsObjectResourceHelper):
         self, obj: Place, args: Dict, locale: GrampsLocale = glocale
     ) -> Place:
         """Extend place attributes as needed."""
-        db_handle = self.db_handle
+        db_handle = self.db_handle_cached
         if "profile" in args:
             obj.profile = get_place_profile_for_object(
                 db_handle=db_handle, place=obj, locale=locale
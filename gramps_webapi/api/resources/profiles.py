@@ -0,0 +1,53 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Endpoint for downloading profiles of requests and tasks."""
+
+import os
+
+from flask import abort, current_app, send_file
+
+from gramps_webapi.types import ResponseReturnValue
+
+from ...auth.const import PERM_PROFILE_REQUESTS
+from ...util.profiler import PROFILE_SUFFIX, get_profile_path
+from ..auth import require_permissions
+from ..util import get_tree_from_jwt_or_fail
+from . import ProtectedResource
+
+
+class ProfileResource(ProtectedResource):
+    """Resource for downloading a stored profile."""
+
+    def get(self, profile_id: str) -> ResponseReturnValue:
+        """Get a profile in pstats format."""
+        require_permissions([PERM_PROFILE_REQUESTS])
+        tree = get_tree_from_jwt_or_fail()
+        try:
+            path = get_profile_path(current_app.config["PROFILE_DIR"], tree, profile_id)
+        except ValueError:
+            abort(422)
+        if not os.path.isfile(path):
+            abort(404)
+        return send_file(
+            path,
+            mimetype="application/octet-stream",
+            as_attachment=True,
+            download_name=f"{profile_id}{PROFILE_SUFFIX}",
+        )
@@ -24,13 +24,13 @@ from typing import Dict
 
 from flask import Response
 from gramps.gen.errors import HandleError
-from gramps.gen.relationship import get_relationship_calculator
 from webargs import fields, validate
 
 from gramps_webapi.api.people_families_cache import CachePeopleFamiliesProxy
 
 from ...types import Handle
 from ..cache import request_cache_decorator
+from ..locales import get_relationship_calculator_for_locale
 from ..util import abort_with_message, get_db_handle, get_locale_for_language, use_args
 from . import ProtectedResource
 from .emit import GrampsJSONEncoder
@@ -114,7 +114,7 @@ class RelationsResource(ProtectedResource, GrampsJSONEncoder):
         db_handle.cache_families()
 
         locale = get_locale_for_language(args["locale"], default=True)
-        calc = get_relationship_calculator(reinit=True, clocale=locale)
+        calc = get_relationship_calculator_for_locale(locale)
         calc.set_depth(args["depth"])
 
         data = calc.get_all_relationships(db_handle, person1, person2)
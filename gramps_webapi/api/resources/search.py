@@ -50,6 +50,7 @@ from ..tasks import (
 )
 from ..util import (
     get_db_handle,
+    get_identity_map,
     get_locale_for_language,
     get_tree_from_jwt_or_fail,
     use_args,
@@ -85,29 +86,30 @@ class SearchResource(GrampsJSONEncoder, ProtectedResource):
         if obj is None:
             raise HandleError(f"Object not found for handle {handle}")
         if "profile" in args:
+            db_handle = get_identity_map()
             if class_name == "person":
                 obj.profile = get_person_profile_for_object(
-                    self.db_handle, obj, args["profile"], locale=locale
+                    db_handle, obj, args["profile"], locale=locale
                 )
             elif class_name == "family":
                 obj.profile = get_family_profile_for_object(
-                    self.db_handle, obj, args["profile"], locale=locale
+                    db_handle, obj, args["profile"], locale=locale
                 )
             elif class_name == "event":
                 obj.profile = get_event_profile_for_object(
-                    self.db_handle, obj, args["profile"], locale=locale
+                    db_handle, obj, args["profile"], locale=locale
                 )
             elif class_name == "citation":
                 obj.profile = get_citation_profile_for_object(
-                    self.db_handle, obj, args["profile"], locale=locale
+                    db_handle, obj, args["profile"], locale=locale
                 )
             elif class_name == "place":
                 obj.profile = get_place_profile_for_object(
-                    self.db_handle, obj, locale=locale
+                    db_handle, obj, locale=locale
                 )
             elif class_name == "media":
                 obj.profile = get_media_profile_for_object(
-                    self.db_handle, obj, args["profile"], locale=locale
+                    db_handle, obj, args["profile"], locale=locale
                 )
 
         return obj
@@ -22,26 +22,40 @@
 
 """Sorting support."""
 
-from typing import List
+from typing import Any, Dict, List, Optional
 
 from flask import abort
 from gramps.gen.const import GRAMPS_LOCALE as glocale
-from gramps.gen.display.name import NameDisplay
 from gramps.gen.display.place import PlaceDisplay
 from gramps.gen.lib import Date
 from gramps.gen.lib.primaryobj import BasicPrimaryObject as GrampsObject
+from gramps.gen.proxy.proxybase import ProxyDbBase
 from gramps.gen.soundex import soundex
 from gramps.gen.utils.db import get_birth_or_fallback, get_death_or_fallback
 
+from ...person_summary import PersonSummaryTable
+from ..locales import get_name_displayer
+from ..sorted_handles import get_person_summary_ranks
+
 
 class Sort:
     """Class for extracting sort keys."""
 
-    def __init__(self, database, locale=glocale):
-        """Initialize sort class."""
+    def __init__(
+        self,
+        database,
+        locale=glocale,
+        person_summaries: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
+        """Initialize sort class.
+
+        If given, `person_summaries` maps person handles to precomputed
+        summaries that are used instead of recomputing the person sort keys.
+        """
         self.database = database
         self.locale = locale
-        self.name_display = NameDisplay(xlocale=self.locale)
+        self.person_summaries = person_summaries or {}
+        self.name_display = get_name_displayer(self.locale)
         self.place_display = PlaceDisplay()
 
     # Generic object key methods
@@ -70,8 +84,25 @@ class Sort:
 
     # Specific object key methods
 
+    def by_person_summary_key(self, sort_key: str, summary: Dict[str, Any]):
+        """Compute a person sort key from the person's precomputed summary."""
+        if sort_key == "surname":
+            return self.locale.sort_key(summary["surname_key"])
+        if sort_key == "name":
+            return self.locale.sort_key(summary["sorted_name"])
+        if sort_key == "soundex":
+            return summary["soundex"]
+        if sort_key in {"birth", "death"}:
+            return "%08d" % summary[f"{sort_key}_sortval"] + str(
+                self.locale.sort_key(summary["surname_key"])
+            )
+        raise ValueError(f"Unknown person summary sort key: {sort_key}")
+
     def by_person_surname_key(self, obj: GrampsObject):
         """Compare by surname, if equal uses given name and suffix."""
+        summary = self.person_summaries.get(obj.handle)
+        if summary is not None:
+            return self.by_person_summary_key("surname", summary)
         name = obj.get_primary_name()
         fsn = name.get_surname()
         ffn = name.get_first_name()
@@ -80,29 +111,46 @@ class Sort:
 
     def by_person_sorted_name_key(self, obj: GrampsObject):
         """Compare by displayed names."""
+        summary = self.person_summaries.get(obj.handle)
+        # the stored name uses the default locale's name separators
+        if summary is not None and self.locale.lang == glocale.lang:
+            return self.by_person_summary_key("name", summary)
         return self.locale.sort_key(self.name_display.sorted(obj))
 
     def by_person_soundex_key(self, obj: GrampsObject):
         """Compare by soundex."""
+        summary = self.person_summaries.get(obj.handle)
+        if summary is not None:
+            return self.by_person_summary_key("soundex", summary)
         return soundex(obj.get_primary_name().get_surname())
 
     def by_person_birthdate_key(self, obj: GrampsObject):
         """Compare by birth date, if equal sorts by name."""
-        birth = get_birth_or_fallback(self.database, obj)
-        if birth:
-            date = birth.get_date_object()
+        summary = self.person_summaries.get(obj.handle)
+        if summary is not None:
+            sortval = summary["birth_sortval"]
         else:
-            date = Date()
-        return "%08d" % date.get_sort_value() + str(self.by_person_surname_key(obj))
+            birth = get_birth_or_fallback(self.database, obj)
+            if birth:
+                date = birth.get_date_object()
+            else:
+                date = Date()
+            sortval = date.get_sort_value()
+        return "%08d" % sortval + str(self.by_person_surname_key(obj))
 
     def by_person_deathdate_key(self, obj: GrampsObject):
         """Compare by death date, if equal sorts by name."""
-        death = get_death_or_fallback(self.database, obj)
-        if death:
-            date = death.get_date_object()
+        summary = self.person_summaries.get(obj.handle)
+        if summary is not None:
+            sortval = summary["death_sortval"]
         else:
-            date = Date()
-        return "%08d" % date.get_sort_value() + str(self.by_person_surname_key(obj))
+            death = get_death_or_fallback(self.database, obj)
+            if death:
+                date = death.get_date_object()
+            else:
+                date = Date()
+            sortval = date.get_sort_value()
+        return "%08d" % sortval + str(self.by_person_surname_key(obj))
 
     def by_person_gender_key(self, obj: GrampsObject):
         """Compare by gender."""
@@ -207,11 +255,93 @@ class Sort:
         return obj.priority
 
 
+# summary columns used by the person sort keys
+PERSON_SORT_COLUMNS = {
+    "surname": ["surname_key"],
+    "name": ["sorted_name"],
+    "soundex": ["soundex"],
+    "birth": ["birth_sortval", "surname_key"],
+    "death": ["death_sortval", "surname_key"],
+}
+
+
+def get_person_summaries(
+    db_handle, columns: List[str]
+) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Get some columns of the materialized person summaries, if available.
+
+    Summaries are only used for unfiltered databases since they are computed
+    without taking privacy into account. People missing from the table fall
+    back to computing their sort keys on the fly.
+    """
+    if isinstance(db_handle, ProxyDbBase):
+        return None
+    person_summary = getattr(getattr(db_handle, "undodb", None), "person_summary", None)
+    if not isinstance(person_summary, PersonSummaryTable):
+        return None
+    return person_summary.get_sort_values(columns)
+
+
+def get_person_sort_ranks(
+    db_handle, sort_key: str, tree_id: str, locale=glocale
+) -> Optional[Dict[str, int]]:
+    """Get the cached ranks of all people by a summary-based sort key.
+
+    Like the summaries themselves, ranks are only used for unfiltered
+    databases.
+    """
+    if isinstance(db_handle, ProxyDbBase):
+        return None
+    if sort_key == "name" and locale.lang != glocale.lang:
+        # the stored name uses the default locale's name separators
+        return None
+    sort = Sort(db_handle, locale=locale)
+    return get_person_summary_ranks(
+        db_handle,
+        sort_key,
+        columns=PERSON_SORT_COLUMNS[sort_key],
+        get_sort_key=lambda summary: sort.by_person_summary_key(sort_key, summary),
+        tree_id=tree_id,
+        locale=locale,
+    )
+
+
 def sort_objects(
-    db_handle, gramps_class_name: str, objects: List[GrampsObject], args, locale=glocale
+    db_handle,
+    gramps_class_name: str,
+    objects: List[GrampsObject],
+    args,
+    locale=glocale,
+    tree_id: Optional[str] = None,
 ) -> List[GrampsObject]:
-    """Sort a given set of object handles."""
-    sort = Sort(db_handle, locale=locale)
+    """Sort a given set of object handles.
+
+    If `tree_id` is given, people are sorted by cached ranks where possible.
+    """
+    person_summaries = None
+    ranks: Dict[str, Dict[str, int]] = {}
+    if gramps_class_name == "Person":
+        columns = []
+        for sort_key in args:
+            sort_key = sort_key.strip().lstrip("-")
+            if sort_key not in PERSON_SORT_COLUMNS:
+                continue
+            if tree_id is not None:
+                person_ranks = get_person_sort_ranks(
+                    db_handle, sort_key, tree_id=tree_id, locale=locale
+                )
+                # people missing from a stale table need their keys computed
+                if person_ranks is not None and all(
+                    obj.handle in person_ranks for obj in objects
+                ):
+                    ranks[sort_key] = person_ranks
+                    continue
+            for column in PERSON_SORT_COLUMNS[sort_key]:
+                if column not in columns:
+                    columns.append(column)
+        if columns:
+            person_summaries = get_person_summaries(db_handle, columns)
+    sort = Sort(db_handle, locale=locale, person_summaries=person_summaries)
     lookup = {
         "gramps_id": sort.by_id_key,
         "change": sort.by_change_key,
@@ -294,6 +424,10 @@ def sort_objects(
         if sort_key[:1] == "-":
             reverse = True
             sort_key = sort_key[1:]
+        if sort_key in ranks:
+            person_ranks = ranks[sort_key]
+            objects.sort(key=lambda obj: person_ranks[obj.handle], reverse=reverse)
+            continue
         if sort_key not in lookup:
             abort(422)
         objects.sort(key=lookup[sort_key], reverse=reverse)
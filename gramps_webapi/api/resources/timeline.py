@@ -27,7 +27,6 @@ from gramps.gen.db.base import DbReadBase
 from gramps.gen.display.place import PlaceDisplay
 from gramps.gen.errors import HandleError
 from gramps.gen.lib import Date, Event, EventType, Person, Span
-from gramps.gen.relationship import get_relationship_calculator
 from gramps.gen.utils.alive import probably_alive_range
 from gramps.gen.utils.db import (
     get_birth_or_fallback,
@@ -39,7 +38,13 @@ from gramps.gen.utils.grampslocale import GrampsLocale
 from webargs import fields, validate
 
 from ...types import Handle
-from ..util import get_db_handle, get_locale_for_language, use_args
+from ..locales import get_gramps_locale, get_relationship_calculator_for_locale
+from ..util import (
+    get_db_handle,
+    get_identity_map,
+    get_locale_for_language,
+    use_args,
+)
 from . import ProtectedResource
 from .emit import GrampsJSONEncoder
 from .filters import apply_filter
@@ -50,7 +55,7 @@ from .util import (
 )
 
 pd = PlaceDisplay()
-default_locale = GrampsLocale(lang="en")
+default_locale = get_gramps_locale("en")
 event_type = EventType()
 
 DEATH_INDICATORS = [
@@ -328,7 +333,7 @@ class Timeline:
     def add_relative(self, handle: Handle, ancestors: int = 1, offspring: int = 1):
         """Add events for a relative of the anchor person."""
         person = self.db_handle.get_person_from_handle(handle)
-        calculator = get_relationship_calculator(reinit=True, clocale=self.locale)
+        calculator = get_relationship_calculator_for_locale(self.locale)
         calculator.set_depth(self.depth)
         relationship = calculator.get_one_relationship(
             self.db_handle, self.anchor_person, person
@@ -576,7 +581,7 @@ class PersonTimelineResource(ProtectedResource, GrampsJSONEncoder):
             relative_events = relative_events + args["relative_event_classes"]
         try:
             timeline = Timeline(
-                get_db_handle(),
+                get_identity_map(),
                 dates=args["dates"],
                 events=events,
                 ratings=args["ratings"],
@@ -642,7 +647,7 @@ class FamilyTimelineResource(ProtectedResource, GrampsJSONEncoder):
         events = prepare_events(args)
         try:
             timeline = Timeline(
-                get_db_handle(),
+                get_identity_map(),
                 dates=args["dates"],
                 events=events,
                 ratings=args["ratings"],
@@ -712,7 +717,7 @@ class TimelinePeopleResource(ProtectedResource, GrampsJSONEncoder):
         events = prepare_events(args)
         try:
             timeline = Timeline(
-                db_handle,
+                get_identity_map(),
                 dates=args["dates"],
                 events=events,
                 ratings=args["ratings"],
@@ -795,7 +800,7 @@ class TimelineFamiliesResource(ProtectedResource, GrampsJSONEncoder):
         events = prepare_events(args)
         try:
             timeline = Timeline(
-                db_handle,
+                get_identity_map(),
                 dates=args["dates"],
                 events=events,
                 ratings=args["ratings"],
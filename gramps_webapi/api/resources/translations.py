@@ -25,9 +25,9 @@ from typing import Dict, List, Union
 
 from flask import Response, abort
 from gramps.gen.const import GRAMPS_LOCALE
-from gramps.gen.utils.grampslocale import GrampsLocale
 from webargs import fields, validate
 
+from ..locales import get_gramps_locale, get_language_codes
 from ..util import abort_with_message, get_locale_for_language, use_args
 from . import ProtectedResource
 from .emit import GrampsJSONEncoder
@@ -55,7 +55,7 @@ class Sort:
 
     def get_native_key(self, data):
         """Return sort key for native locale."""
-        native_locale = GrampsLocale(lang=data["language"])
+        native_locale = get_gramps_locale(data["language"])
         return native_locale.sort_key(data["native"])
 
 
@@ -84,21 +84,19 @@ class TranslationResource(ProtectedResource, GrampsJSONEncoder):
 
     def _get_or_post(self, strings: List[str], language: str) -> Response:
         """Get translation."""
-        catalog = GRAMPS_LOCALE.get_language_dict()
-        for entry in catalog:
-            if catalog[entry] == language:
-                gramps_locale = GrampsLocale(lang=language)
-                return self.response(
-                    200,
-                    [
-                        {
-                            "original": s,
-                            "translation": gramps_locale.translation.sgettext(s),
-                        }
-                        for s in strings
-                    ],
-                )
-        abort(404)
+        if language not in get_language_codes():
+            abort(404)
+        gramps_locale = get_gramps_locale(language)
+        return self.response(
+            200,
+            [
+                {
+                    "original": s,
+                    "translation": gramps_locale.translation.sgettext(s),
+                }
+                for s in strings
+            ],
+        )
 
 
 class TranslationsResource(ProtectedResource, GrampsJSONEncoder):
@@ -115,12 +113,12 @@ class TranslationsResource(ProtectedResource, GrampsJSONEncoder):
     )
     def get(self, args: dict) -> Response:
         """Get available translations."""
-        default_locale = GrampsLocale(lang="en")
+        default_locale = get_gramps_locale("en")
         current_locale = get_locale_for_language(args["locale"], default=True)
         catalog = default_locale.get_language_dict()
         translations = []
         for entry in catalog:
-            native_locale = GrampsLocale(lang=catalog[entry])
+            native_locale = get_gramps_locale(catalog[entry])
             translations.append(
                 {
                     "default": entry,
@@ -25,7 +25,7 @@ from __future__ import annotations
 import os
 from hashlib import sha256
 from http import HTTPStatus
-from typing import Any, Literal, Optional, Union, cast
+from typing import Any, Callable, Literal, Optional, Union, cast
 
 import gramps
 import gramps.gen.lib
@@ -37,7 +37,6 @@ from gramps.gen.db import KEY_TO_CLASS_MAP, DbTxn
 from gramps.gen.db.base import DbReadBase, DbWriteBase
 from gramps.gen.db.dbconst import TXNADD, TXNDEL, TXNUPD
 from gramps.gen.db.utils import import_as_dict
-from gramps.gen.display.name import NameDisplay
 from gramps.gen.display.place import PlaceDisplay
 from gramps.gen.errors import HandleError
 from gramps.gen.lib import (
@@ -57,7 +56,6 @@ from gramps.gen.lib import (
 from gramps.gen.lib.json_utils import object_to_dict, object_to_string, remove_object
 from gramps.gen.lib.primaryobj import BasicPrimaryObject as GrampsObject
 from gramps.gen.plug import BasePluginManager
-from gramps.gen.relationship import get_relationship_calculator
 from gramps.gen.soundex import soundex
 from gramps.gen.user import User
 from gramps.gen.utils.db import (
@@ -73,6 +71,7 @@ from gramps.gen.utils.place import conv_lat_lon
 
 from ...const import DISABLED_IMPORTERS, SEX_FEMALE, SEX_MALE, SEX_UNKNOWN
 from ...types import FilenameOrPath, Handle, TransactionJson
+from ..locales import get_name_displayer, get_relationship_calculator_for_locale
 from ..media import get_media_handler
 from ..util import (
     UserTaskProgress,
@@ -441,7 +440,7 @@ def get_person_profile_for_object(
     options = []
     if "all" in args or "ratings" in args:
         options.append("ratings")
-    name_display = NameDisplay(xlocale=locale)
+    name_display = get_name_displayer(locale)
     birth, birth_event = get_birth_profile(
         db_handle, person, args=options, locale=locale
     )
@@ -740,6 +739,137 @@ def get_extended_attributes(
     return result
 
 
+# extend options with the referenced class, the attribute holding the
+# references and a function returning the referenced handles of an object
+EXTEND_REFERENCES: dict[str, tuple[str, str, Callable[[Any], list[Handle]]]] = {
+    "child_ref_list": (
+        "Person",
+        "child_ref_list",
+        lambda obj: [ref.ref for ref in obj.child_ref_list],
+    ),
+    "citation_list": ("Citation", "citation_list", lambda obj: obj.citation_list),
+    "event_ref_list": (
+        "Event",
+        "event_ref_list",
+        lambda obj: [ref.ref for ref in obj.event_ref_list],
+    ),
+    "media_list": (
+        "Media",
+        "media_list",
+        lambda obj: [ref.ref for ref in obj.media_list],
+    ),
+    "note_list": ("Note", "note_list", lambda obj: obj.note_list),
+    "person_ref_list": (
+        "Person",
+        "person_ref_list",
+        lambda obj: [ref.ref for ref in obj.person_ref_list],
+    ),
+    "reporef_list": (
+        "Repository",
+        "reporef_list",
+        lambda obj: [ref.ref for ref in obj.reporef_list],
+    ),
+    "tag_list": ("Tag", "tag_list", lambda obj: obj.tag_list),
+    "family_list": ("Family", "family_list", lambda obj: obj.family_list),
+    "parent_family_list": (
+        "Family",
+        "parent_family_list",
+        lambda obj: obj.parent_family_list,
+    ),
+    "primary_parent_family": (
+        "Family",
+        "parent_family_list",
+        lambda obj: [obj.get_main_parents_family_handle()],
+    ),
+    "father_handle": ("Person", "father_handle", lambda obj: [obj.father_handle]),
+    "mother_handle": ("Person", "mother_handle", lambda obj: [obj.mother_handle]),
+    "place": ("Place", "place", lambda obj: [obj.place]),
+    "source_handle": ("Source", "source_handle", lambda obj: [obj.source_handle]),
+}
+
+
+def prefetch_extended_attributes(
+    db_handle: DbReadBase, objects: list[GrampsObject], args: dict
+) -> None:
+    """Load the objects referenced by the extend option for a list of objects.
+
+    All referenced handles are collected first and then fetched with one
+    query per object class, so that `get_extended_attributes` can be served
+    from the identity map. Does nothing if the database instance does not
+    support prefetching.
+    """
+    prefetch = getattr(db_handle, "prefetch", None)
+    if prefetch is None or not args.get("extend"):
+        return
+    do_all = "all" in args["extend"]
+    handles: dict[str, list[Handle]] = {}
+    for key, (class_name, attribute, get_handles) in EXTEND_REFERENCES.items():
+        if not do_all and key not in args["extend"]:
+            continue
+        for obj in objects:
+            if hasattr(obj, attribute):
+                handles.setdefault(class_name, []).extend(get_handles(obj))
+    for class_name, class_handles in handles.items():
+        prefetch(class_name, class_handles)
+
+
+def prefetch_profiles(
+    db_handle: DbReadBase,
+    objects: list[GrampsObject],
+    gramps_class_name: str,
+    args: list[str],
+) -> None:
+    """Load the objects needed for person or family profiles of a list of objects.
+
+    The related families, family members, events, places and (if ratings
+    are requested) citations are fetched level by level with one query per
+    object class and level. Does nothing if the database instance does not
+    support prefetching.
+    """
+    prefetch = getattr(db_handle, "prefetch", None)
+    if prefetch is None:
+        return
+    if gramps_class_name == "Person":
+        people: list[Person] = list(objects)
+        families: list[Family] = []
+        if "all" in args or "families" in args:
+            families = prefetch(
+                "Family",
+                [
+                    handle
+                    for person in people
+                    for handle in person.parent_family_list + person.family_list
+                ],
+            )
+    elif gramps_class_name == "Family":
+        people = []
+        families = list(objects)
+    else:
+        return
+    people += prefetch(
+        "Person",
+        [
+            handle
+            for family in families
+            for handle in [family.father_handle, family.mother_handle]
+            + [child_ref.ref for child_ref in family.child_ref_list]
+        ],
+    )
+    events: list[Event] = prefetch(
+        "Event",
+        [
+            event_ref.ref
+            for obj in people + families
+            for event_ref in obj.event_ref_list
+        ],
+    )
+    prefetch("Place", [event.place for event in events])
+    if "all" in args or "ratings" in args:
+        prefetch(
+            "Citation", [handle for event in events for handle in event.citation_list]
+        )
+
+
 def get_backlinks(db_handle: DbReadBase, handle: Handle) -> dict[str, list[Handle]]:
     """Get backlinks to a handle.
 
@@ -1210,7 +1340,7 @@ def get_one_relationship(
     locale: GrampsLocale = glocale,
 ) -> tuple[str, int, int]:
     """Get a relationship string and the number of generations between the people."""
-    calc = get_relationship_calculator(reinit=True, clocale=locale)
+    calc = get_relationship_calculator_for_locale(locale)
     # the relationship calculation can be slow when depth is set to a large value
     # even when the relationship path is short. To avoid this, we are iterating
     # trying once with depth = 5
@@ -19,28 +19,111 @@
 
 """Object storage (e.g. S3) handling utilities."""
 
-from typing import BinaryIO, Dict, Optional
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Optional, Tuple
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
-from flask import current_app, redirect, send_file
+from flask import current_app, redirect
 from gramps.gen.db.base import DbReadBase
 
-from ..const import MIME_JPEG
 from .file import FileHandler
-from .image import ThumbnailHandler
+from .image import ThumbnailHandler, ThumbnailHandlerBase
+from .original_cache import get_original_cache
 from .util import abort_with_message
 
+# maximum number of pooled HTTP connections of each S3 client
+MAX_POOL_CONNECTIONS = 50
+
+# maximum number of cached presigned URLs
+PRESIGNED_URL_CACHE_SIZE = 10000
+
+# fraction of their lifetime during which presigned URLs are reused
+PRESIGNED_URL_REUSE_FRACTION = 0.5
+
+# uploads larger than the chunk size are split into a multipart upload,
+# which bounds the memory needed per upload
+UPLOAD_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=16 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=4,
+)
+
+_lock = threading.Lock()
+_clients: Dict[Tuple[Optional[str], int], Any] = {}
+_presigned_urls: OrderedDict[Tuple, Tuple[str, float]] = OrderedDict()
+
 
 def get_client(endpoint_url: Optional[str] = None):
-    """Return an S3 client."""
-    return boto3.client(
-        "s3",
-        endpoint_url=endpoint_url,
-        config=boto3.session.Config(
-            s3={"addressing_style": "path"}, signature_version="s3v4"
-        ),
-    )
+    """Return the shared S3 client for an endpoint.
+
+    Clients are thread-safe, so a single client with a connection pool is
+    created per endpoint and process and then reused.
+    """
+    # clients must not be shared with forked worker processes
+    key = (endpoint_url, os.getpid())
+    try:
+        return _clients[key]
+    except KeyError:
+        pass
+    with _lock:
+        if key not in _clients:
+            _clients[key] = boto3.client(
+                "s3",
+                endpoint_url=endpoint_url,
+                config=boto3.session.Config(
+                    s3={"addressing_style": "path"},
+                    signature_version="s3v4",
+                    max_pool_connections=MAX_POOL_CONNECTIONS,
+                    tcp_keepalive=True,
+                ),
+            )
+        return _clients[key]
+
+
+def clear_s3_cache() -> None:
+    """Clear the shared S3 clients and cached presigned URLs."""
+    with _lock:
+        _clients.clear()
+        _presigned_urls.clear()
+
+
+def get_presigned_url_cached(
+    client, params: Dict[str, str], expires_in: float
+) -> Optional[str]:
+    """Get a presigned URL to download an object, reusing a recent one.
+
+    A URL is reused during a fraction of its lifetime, so that it remains
+    valid for a while after it was handed out.
+    """
+    key = (client.meta.endpoint_url, expires_in, tuple(sorted(params.items())))
+    now = time.monotonic()
+    with _lock:
+        cached = _presigned_urls.get(key)
+        if cached is not None and cached[1] > now:
+            _presigned_urls.move_to_end(key)
+            return cached[0]
+    try:
+        url = client.generate_presigned_url(
+            "get_object",
+            Params=params,
+            ExpiresIn=expires_in,
+        )
+    except ClientError as err:
+        current_app.logger.error(err)
+        return None
+    with _lock:
+        _presigned_urls[key] = (url, now + expires_in * PRESIGNED_URL_REUSE_FRACTION)
+        _presigned_urls.move_to_end(key)
+        while len(_presigned_urls) > PRESIGNED_URL_CACHE_SIZE:
+            _presigned_urls.popitem(last=False)
+    return url
 
 
 def get_object_name(checksum: str, prefix: Optional[str] = None):
@@ -62,12 +145,14 @@ class ObjectStorageFileHandler(FileHandler):
         db_handle: DbReadBase,
         prefix: Optional[str] = None,
         endpoint_url: Optional[str] = None,
+        tree: Optional[str] = None,
     ):
         """Initialize self given a handle and media base directory."""
-        super().__init__(handle, db_handle=db_handle)
+        super().__init__(handle, db_handle=db_handle, tree=tree)
         self.client = get_client(endpoint_url)
         self.bucket_name = bucket_name
         self.object_name = get_object_name(checksum=self.checksum, prefix=prefix)
+        self.original_cache = get_original_cache()
 
     def _get_presigned_url(
         self, expires_in: float, download: bool = False, filename: str = ""
@@ -80,16 +165,7 @@ class ObjectStorageFileHandler(FileHandler):
         }
         if download:
             params["ResponseContentDisposition"] = f"attachment; filename={filename}"
-        try:
-            response = self.client.generate_presigned_url(
-                "get_object",
-                Params=params,
-                ExpiresIn=expires_in,
-            )
-        except ClientError as err:
-            current_app.logger.error(err)
-            return None
-        return response
+        return get_presigned_url_cached(self.client, params, expires_in=expires_in)
 
     def _download_fileobj(self) -> BinaryIO:
         """Download a binary file object."""
@@ -107,9 +183,22 @@ class ObjectStorageFileHandler(FileHandler):
                 )
             raise  # will never trigger - just to make mypy happy
 
+    def _get_cached_fileobj(self) -> BinaryIO:
+        """Return a binary file object from the local cache of originals.
+
+        If the cache is disabled, the file is downloaded.
+        """
+        if self.original_cache is None or not self.checksum:
+            return self._download_fileobj()
+        # keyed by the object, not only the checksum, which can be edited
+        return self.original_cache.get(
+            f"{self.bucket_name}/{self.object_name}",
+            lambda f: shutil.copyfileobj(self._download_fileobj(), f),
+        )
+
     def get_file_object(self) -> BinaryIO:
         """Return a binary file object."""
-        return self._download_fileobj()
+        return self._get_cached_fileobj()
 
     def file_exists(self) -> bool:
         """Check if the file exists."""
@@ -136,30 +225,9 @@ class ObjectStorageFileHandler(FileHandler):
         )
         return redirect(url, 307)
 
-    def send_cropped(self, x1: int, y1: int, x2: int, y2: int, square: bool = False):
-        """Send cropped image."""
-        fileobj = self._download_fileobj()
-        thumb = ThumbnailHandler(fileobj, self.mime)
-        buffer = thumb.get_cropped(x1=x1, y1=y1, x2=x2, y2=y2, square=square)
-        return send_file(buffer, mimetype=MIME_JPEG)
-
-    def send_thumbnail(self, size: int, square: bool = False):
-        """Send thumbnail of image."""
-        fileobj = self._download_fileobj()
-        thumb = ThumbnailHandler(fileobj, self.mime)
-        buffer = thumb.get_thumbnail(size=size, square=square)
-        return send_file(buffer, mimetype=MIME_JPEG)
-
-    def send_thumbnail_cropped(
-        self, size: int, x1: int, y1: int, x2: int, y2: int, square: bool = False
-    ):
-        """Send thumbnail of cropped image."""
-        fileobj = self._download_fileobj()
-        thumb = ThumbnailHandler(fileobj, self.mime)
-        buffer = thumb.get_thumbnail_cropped(
-            size=size, x1=x1, y1=y1, x2=x2, y2=y2, square=square
-        )
-        return send_file(buffer, mimetype=MIME_JPEG)
+    def get_thumbnail_handler(self) -> ThumbnailHandlerBase:
+        """Return a thumbnail handler for the file."""
+        return ThumbnailHandler(self._get_cached_fileobj(), self.mime)
 
 
 def upload_file_s3(
@@ -176,10 +244,37 @@ def upload_file_s3(
     client = get_client(endpoint_url)
     object_name = get_object_name(checksum=checksum, prefix=prefix)
     client.upload_fileobj(
-        stream, bucket_name, object_name, ExtraArgs={"ContentType": mime}
+        stream,
+        bucket_name,
+        object_name,
+        ExtraArgs={"ContentType": mime},
+        Config=UPLOAD_TRANSFER_CONFIG,
     )
 
 
+def download_file_s3(
+    bucket_name: str,
+    checksum: str,
+    prefix: Optional[str] = None,
+    endpoint_url: Optional[str] = None,
+    max_memory_size: int = 0,
+) -> BinaryIO:
+    """Download a file into a temporary file, bypassing the cache of originals.
+
+    Files larger than `max_memory_size` bytes are spooled to disk.
+    """
+    client = get_client(endpoint_url)
+    object_name = get_object_name(checksum=checksum, prefix=prefix)
+    fobj = tempfile.SpooledTemporaryFile(max_size=max_memory_size)
+    try:
+        client.download_fileobj(bucket_name, object_name, fobj)
+    except Exception:
+        fobj.close()
+        raise
+    fobj.seek(0)
+    return fobj  # type: ignore[return-value]
+
+
 def get_object_keys_size(
     bucket_name: str,
     prefix: Optional[str] = None,
@@ -27,6 +27,7 @@ import sifts
 from gramps.gen.db.base import DbReadBase
 
 from .text import iter_obj_strings, obj_strings_from_handle
+from ...util.metrics import SEARCH_DURATION
 from ..util import get_total_number_of_objects, get_object_timestamps
 
 
@@ -308,22 +309,24 @@ class SearchIndexerBase:
             ops = {">": "$gt", "<": "$lt", ">=": "$gte", "<=": "$lte"}
             where["change"] = {ops[change_op]: change_value}
         offset = (page - 1) * pagesize
-        if not query or query.strip() == "*":
-            results = search.get(
-                limit=pagesize,
-                offset=offset,
-                order_by=sort,
-                where=where or None,
-            )
-        else:
-            results = search.query(
-                query,
-                limit=pagesize,
-                offset=offset,
-                order_by=sort,
-                where=where or None,
-                vector_search=self.use_semantic_text,
-            )
+        kind = "semantic" if self.use_semantic_text else "fulltext"
+        with SEARCH_DURATION.time(kind=kind):
+            if not query or query.strip() == "*":
+                results = search.get(
+                    limit=pagesize,
+                    offset=offset,
+                    order_by=sort,
+                    where=where or None,
+                )
+            else:
+                results = search.query(
+                    query,
+                    limit=pagesize,
+                    offset=offset,
+                    order_by=sort,
+                    where=where or None,
+                    vector_search=self.use_semantic_text,
+                )
         total = results["total"]
         hits = [
             self._format_hit(hit, rank=offset + i, include_content=include_content)
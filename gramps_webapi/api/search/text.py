@@ -38,6 +38,7 @@ from gramps.gen.lib.primaryobj import BasicPrimaryObject as GrampsObject
 from unidecode import unidecode
 
 from ...const import GRAMPS_OBJECT_PLURAL, PRIMARY_GRAMPS_OBJECTS
+from ..cache import get_cached_ocr_text
 from ..resources.util import get_event_participants_for_handle
 from .text_semantic import (
     person_to_text,
@@ -84,6 +85,11 @@ def object_to_strings(obj: GrampsObject, db_handle: DbReadBase) -> Tuple[str, st
                     if parent_handle:
                         parent_obj = db_handle.get_person_from_handle(parent_handle)
                         text_data_child_list.append(parent_obj.get_primary_name())
+    # media: add text recognized in the file, like a note
+    if isinstance(obj, Media):
+        ocr_text = get_cached_ocr_text(obj.checksum)
+        if ocr_text:
+            strings.append(ocr_text.strip())
     for child_obj in text_data_child_list:
         if hasattr(child_obj, "get_text_data_list"):
             if hasattr(child_obj, "private") and child_obj.private:
@@ -0,0 +1,173 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025       David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Process-wide cache of the sort order of object handles."""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+from flask import current_app, has_app_context
+from gramps.gen.const import GRAMPS_LOCALE as glocale
+from gramps.gen.db.base import DbReadBase
+from gramps.gen.utils.grampslocale import GrampsLocale
+
+from ..undodb import PERSON_SUMMARY_GENERATION, DbUndoSQLWeb
+
+# classes without a database-backed default sort order
+UNSORTED_CLASSES = ["Event", "Repository", "Note"]
+
+# default maximum total number of handles in the cached indices
+SORTED_HANDLES_CACHE_MAX_HANDLES = 200_000
+
+_lock = threading.Lock()
+_cache: OrderedDict[tuple, dict[str, int]] = OrderedDict()
+_size = 0
+
+
+def _get_max_handles() -> int:
+    """Get the maximum total number of cached handles."""
+    if not has_app_context():
+        return SORTED_HANDLES_CACHE_MAX_HANDLES
+    return current_app.config.get(
+        "SORTED_HANDLES_CACHE_MAX_HANDLES", SORTED_HANDLES_CACHE_MAX_HANDLES
+    )
+
+
+def _get_handle_index(
+    db_handle: DbReadBase, gramps_class_name: str, locale: GrampsLocale
+) -> dict[str, int]:
+    """Query the sorted handles and return a handle to position mapping."""
+    query_method = db_handle.method("get_%s_handles", gramps_class_name)
+    assert query_method is not None  # type checker
+    if gramps_class_name in UNSORTED_CLASSES:
+        handles = query_method()
+    else:
+        handles = query_method(sort_handles=True, locale=locale)
+    return {handle: index for index, handle in enumerate(handles)}
+
+
+def get_sorted_handle_index(
+    db_handle: DbReadBase,
+    gramps_class_name: str,
+    tree_id: str,
+    locale: GrampsLocale = glocale,
+) -> dict[str, int]:
+    """Get a mapping of handles to their position in the default sort order.
+
+    The mapping is cached per tree, class, locale, and sort generation, so it
+    is only recomputed after a commit affecting the sort order of the class.
+    The cache holds at most `SORTED_HANDLES_CACHE_MAX_HANDLES` handles in
+    total; least recently used indices are dropped first.
+    If the database does not track sort generations, it is always recomputed.
+
+    The mapping is computed from the unfiltered database (via a proxy's
+    underlying database), so it may contain handles of private objects.
+    The returned dictionary must not be modified.
+    """
+    base_db = getattr(db_handle, "basedb", db_handle)
+    undodb = getattr(base_db, "undodb", None)
+    if not isinstance(undodb, DbUndoSQLWeb):
+        return _get_handle_index(db_handle, gramps_class_name, locale)
+    # the generation must be determined before querying the handles
+    generation = undodb.get_sort_generation(gramps_class_name)
+    key = (tree_id, gramps_class_name, locale.lang, generation)
+    return _get_cached(
+        key, lambda: _get_handle_index(base_db, gramps_class_name, locale)
+    )
+
+
+def get_person_summary_ranks(
+    db_handle: DbReadBase,
+    name: str,
+    columns: list[str],
+    get_sort_key: Callable[[dict[str, Any]], Any],
+    tree_id: str,
+    locale: GrampsLocale = glocale,
+) -> dict[str, int] | None:
+    """Get a mapping of person handles to their rank by a summary sort key.
+
+    `get_sort_key` computes the sort key from the `columns` of a person
+    summary. People with equal sort keys have the same rank. The mapping is
+    cached like the default sort order, per sort generation of the person
+    summaries. Returns None if the database has no person summary table.
+    The returned dictionary must not be modified.
+    """
+    undodb = getattr(db_handle, "undodb", None)
+    if not isinstance(undodb, DbUndoSQLWeb):
+        return None
+    generation = undodb.get_sort_generation(PERSON_SUMMARY_GENERATION)
+    key = (tree_id, f"Person.{name}", locale.lang, generation)
+
+    def get_ranks() -> dict[str, int]:
+        sort_keys = {
+            handle: get_sort_key(summary)
+            for handle, summary in undodb.person_summary.get_sort_values(
+                columns
+            ).items()
+        }
+        ranks: dict[str, int] = {}
+        rank = -1
+        previous = None
+        for handle in sorted(sort_keys, key=sort_keys.__getitem__):
+            if rank < 0 or sort_keys[handle] != previous:
+                rank += 1
+                previous = sort_keys[handle]
+            ranks[handle] = rank
+        return ranks
+
+    return _get_cached(key, get_ranks)
+
+
+def _get_cached(key: tuple, compute: Callable[[], dict[str, int]]) -> dict[str, int]:
+    """Get a handle mapping from the cache or compute and cache it.
+
+    The first three items of the key identify the mapping, the last one is
+    its generation.
+    """
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    handle_index = compute()
+    max_handles = _get_max_handles()
+    global _size
+    with _lock:
+        # drop indices of previous generations
+        for old_key in [k for k in _cache if k[:3] == key[:3]]:
+            _size -= len(_cache.pop(old_key))
+        if len(handle_index) > max_handles:
+            # too large to be cached
+            return handle_index
+        _cache[key] = handle_index
+        _size += len(handle_index)
+        while _size > max_handles:
+            _, evicted = _cache.popitem(last=False)
+            _size -= len(evicted)
+    return handle_index
+
+
+def clear_sorted_handles_cache() -> None:
+    """Clear all cached handle indices."""
+    global _size
+    with _lock:
+        _cache.clear()
+        _size = 0
@@ -22,6 +22,7 @@ from __future__ import annotations
 import json
 import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from gettext import gettext as _
 from http import HTTPStatus
 from typing import Any, Callable, Dict, List, Optional, Union
@@ -34,16 +35,25 @@ from gramps.gen.db.base import DbReadBase
 from gramps.gen.errors import HandleError
 from gramps.gen.lib.json_utils import object_to_dict
 from gramps.gen.merge.diff import diff_items
+from werkzeug.exceptions import HTTPException
 
 from gramps_webapi.api.search.indexer import SearchIndexer, SemanticSearchIndexer
 
 from ..auth import get_owner_emails
+from ..undodb import DbUndoSQLWeb
 from ..undodb import migrate as migrate_undodb
+from .capabilities import get_ocr_capabilities
 from .check import check_database
 from .emails import email_confirm_email, email_new_user, email_reset_pw
 from .export import prepare_options, run_export
-from .media import get_media_handler
+from .image import detect_faces
+from .media import (
+    get_media_handler,
+    update_usage_media,
+    update_usage_media_from_transaction,
+)
 from .media_importer import MediaImporter
+from .profiler import is_request_profiled
 from .report import run_report
 from .resources.delete import delete_all_objects
 from .resources.util import (
@@ -69,8 +79,11 @@ from .util import (
 def run_task(task: Task, **kwargs) -> Union[AsyncResult, Any]:
     """Send a task to the task queue or run immediately if no queue set up."""
     if not current_app.config["CELERY_CONFIG"]:
+        # a task run immediately is part of the request's profile, if any
         with current_app.app_context():
             return task(**kwargs)
+    if is_request_profiled():
+        kwargs["profile"] = True
     return task.delay(**kwargs)
 
 
@@ -238,6 +251,8 @@ def import_file(
     finally:
         close_db(db_handle)
     update_usage_people(tree=tree, user_id=user_id)
+    set_progress_title(self, title="Updating person summaries...")
+    update_person_summary(tree=tree, user_id=user_id)
     _search_reindex_incremental(
         tree=tree,
         user_id=user_id,
@@ -313,9 +328,9 @@ def generate_report(
 
 @shared_task(bind=True)
 def export_media(
-    self, tree: str, user_id: str, view_private: bool
+    self, tree: str, user_id: str, view_private: bool, since: Optional[int] = None
 ) -> Dict[str, Union[str, int]]:
-    """Export media files."""
+    """Export media files, optionally only the ones changed since a timestamp."""
     db_handle = get_db_outside_request(
         tree=tree, view_private=view_private, readonly=True, user_id=user_id
     )
@@ -330,6 +345,7 @@ def export_media(
             zip_filename=zip_filename,
             include_private=view_private,
             progress_cb=progress_callback_count(self),
+            since=since,
         )
     finally:
         close_db(db_handle)
@@ -361,9 +377,120 @@ def import_media_archive(
         result = importer(progress_cb=progress_callback_count(self))
     finally:
         close_db(db_handle)
+    if result["uploaded"]:
+        pregenerate_thumbnails(tree=tree, user_id=user_id)
     return result
 
 
+@shared_task(bind=True)
+def generate_thumbnails(
+    self, tree: str, user_id: str, handles: Optional[List[str]] = None
+) -> Dict[str, int]:
+    """Render the standard thumbnail sizes of media objects into the store.
+
+    If no handles are given, all media objects are processed. Thumbnails that
+    are already stored are skipped.
+    """
+    db_handle = get_db_outside_request(
+        tree=tree, view_private=True, readonly=True, user_id=user_id
+    )
+    try:
+        media_handler = get_media_handler(db_handle, tree=tree)
+        if handles is None:
+            handles = db_handle.get_media_handles()
+        sizes = get_config("THUMBNAIL_PREGENERATE_SIZES") or []
+        progress_cb = progress_callback_count(self, title="Generating thumbnails...")
+        rendered = 0
+        failures = 0
+        for i, handle in enumerate(handles):
+            progress_cb(current=i, total=len(handles))
+            try:
+                file_handler = media_handler.get_file_handler(
+                    handle, db_handle=db_handle
+                )
+                if not file_handler.file_exists():
+                    continue
+                for size in sizes:
+                    for square in [False, True]:
+                        if file_handler.store_thumbnail(size=size, square=square):
+                            rendered += 1
+            except (HTTPException, ValueError, OSError):
+                failures += 1
+    finally:
+        close_db(db_handle)
+    return {"rendered": rendered, "failures": failures}
+
+
+def pregenerate_thumbnails(
+    tree: str, user_id: str, handles: Optional[List[str]] = None
+) -> None:
+    """Pre-render thumbnails in the background if a task queue is set up."""
+    if not current_app.config["CELERY_CONFIG"]:
+        # don't delay the request by rendering thumbnails synchronously
+        return
+    run_task(generate_thumbnails, tree=tree, user_id=user_id, handles=handles)
+
+
+def _detect_faces(file_handler) -> list:
+    """Detect the faces in a media file without using the cache."""
+    return [list(region) for region in detect_faces(file_handler.get_file_object())]
+
+
+@shared_task(bind=True)
+def detect_faces_all(
+    self, tree: str, user_id: str, handles: Optional[List[str]] = None
+) -> Dict[str, int]:
+    """Run face detection on media objects and cache the regions.
+
+    If no handles are given, all media objects are processed. Media files
+    with cached results are skipped. The files are processed concurrently
+    by a thread pool; database access is confined to the calling thread.
+    """
+    try:
+        import cv2  # noqa: F401
+    except ImportError as exc:
+        raise RuntimeError("OpenCV is not installed") from exc
+    db_handle = get_db_outside_request(
+        tree=tree, view_private=True, readonly=True, user_id=user_id
+    )
+    try:
+        media_handler = get_media_handler(db_handle, tree=tree)
+        if handles is None:
+            handles = db_handle.get_media_handles()
+        file_handlers = []
+        for handle in handles:
+            try:
+                file_handler = media_handler.get_file_handler(
+                    handle, db_handle=db_handle
+                )
+            except HTTPException:
+                continue
+            if file_handler.get_cached_faces() is None:
+                file_handlers.append(file_handler)
+    finally:
+        close_db(db_handle)
+    progress_cb = progress_callback_count(self, title="Detecting faces...")
+    detected = 0
+    failures = 0
+    with ThreadPoolExecutor(
+        max_workers=get_config("MEDIA_ANALYSIS_WORKERS") or None
+    ) as executor:
+        futures = {
+            executor.submit(_detect_faces, file_handler): file_handler
+            for file_handler in file_handlers
+        }
+        for i, future in enumerate(as_completed(futures)):
+            progress_cb(current=i, total=len(futures))
+            try:
+                regions = future.result()
+            except (HTTPException, ValueError, OSError):
+                failures += 1
+                continue
+            futures[future].set_cached_faces(regions)
+            detected += 1
+    return {"detected": detected, "failures": failures}
+
+
 @shared_task()
 def media_ocr(
     tree: str,
@@ -386,6 +513,90 @@ def media_ocr(
         close_db(db_handle)
 
 
+@shared_task(bind=True)
+def media_ocr_all(
+    self,
+    tree: str,
+    user_id: str,
+    lang: str,
+    handles: Optional[List[str]] = None,
+) -> Dict[str, int]:
+    """Run text recognition on image and PDF media objects.
+
+    If no handles are given, all media objects are processed. Media files
+    with a cached result for the language are skipped, so an interrupted run
+    resumes where it stopped. The recognized text is added to the search
+    index of the media objects.
+    """
+    import pytesseract
+
+    has_ocr, _ = get_ocr_capabilities()
+    if not has_ocr:
+        abort_with_message(501, "Tesseract is not installed")
+    db_handle = get_db_outside_request(
+        tree=tree, view_private=True, readonly=True, user_id=user_id
+    )
+    try:
+        media_handler = get_media_handler(db_handle, tree=tree)
+        if handles is None:
+            handles = db_handle.get_media_handles()
+        file_handlers = []
+        for handle in handles:
+            try:
+                file_handler = media_handler.get_file_handler(
+                    handle, db_handle=db_handle
+                )
+            except HTTPException:
+                continue
+            if (
+                file_handler.supports_ocr()
+                and file_handler.get_cached_ocr(lang) is None
+            ):
+                file_handlers.append(file_handler)
+    finally:
+        close_db(db_handle)
+    progress_cb = progress_callback_count(self, title="Recognizing text...")
+    recognized_handles = []
+    failures = 0
+    max_pdf_pages = get_config("OCR_MAX_PDF_PAGES")
+    # tesseract runs in a subprocess, so threads are sufficient for parallelism
+    with ThreadPoolExecutor(
+        max_workers=get_config("MEDIA_ANALYSIS_WORKERS") or None
+    ) as executor:
+        futures = {
+            executor.submit(
+                file_handler.run_ocr, lang, max_pdf_pages=max_pdf_pages
+            ): file_handler
+            for file_handler in file_handlers
+        }
+        for i, future in enumerate(as_completed(futures)):
+            progress_cb(current=i, total=len(futures))
+            try:
+                data = future.result()
+            except (
+                HTTPException,
+                ValueError,
+                OSError,
+                RuntimeError,
+                pytesseract.TesseractError,
+            ):
+                failures += 1
+                continue
+            futures[future].set_cached_ocr(lang, "string", data)
+            recognized_handles.append(futures[future].handle)
+    if recognized_handles:
+        db_handle = get_db_outside_request(
+            tree=tree, view_private=True, readonly=True, user_id=user_id
+        )
+        try:
+            indexer = get_search_indexer(tree)
+            for handle in recognized_handles:
+                indexer.add_or_update_object(handle, db_handle, "Media")
+        finally:
+            close_db(db_handle)
+    return {"recognized": len(recognized_handles), "failures": failures}
+
+
 @shared_task(bind=True)
 def check_repair_database(self, tree: str, user_id: str):
     """Check and repair a Gramps database (tree)"""
@@ -393,9 +604,31 @@ def check_repair_database(self, tree: str, user_id: str):
         tree=tree, view_private=True, readonly=False, user_id=user_id
     )
     try:
-        return check_database(db_handle, progress_cb=progress_callback_count(self))
+        result = check_database(db_handle, progress_cb=progress_callback_count(self))
     finally:
         close_db(db_handle)
+    # also reconcile the incrementally tracked media usage
+    update_usage_media(tree=tree, user_id=user_id)
+    update_person_summary(tree=tree, user_id=user_id)
+    return result
+
+
+def update_person_summary(tree: str, user_id: str) -> None:
+    """Rebuild the person summary table if a batch transaction made it stale."""
+    db_handle = get_db_outside_request(
+        tree=tree, view_private=True, readonly=False, user_id=user_id
+    )
+    try:
+        if isinstance(db_handle.undodb, DbUndoSQLWeb):
+            db_handle.undodb.ensure_person_summary()
+    finally:
+        close_db(db_handle)
+
+
+@shared_task(bind=True)
+def reconcile_usage_media(self, tree: str, user_id: str) -> int:
+    """Recompute the media usage of a tree by scanning all media files."""
+    return update_usage_media(tree=tree, user_id=user_id)
 
 
 @shared_task(bind=True)
@@ -443,6 +676,8 @@ def delete_objects(
         close_db(db_handle)
 
     update_usage_people(tree=tree, user_id=user_id)
+    if namespaces is None or "media" in namespaces:
+        update_usage_media(tree=tree, user_id=user_id)
     _search_reindex_incremental(
         tree=tree,
         user_id=user_id,
@@ -518,6 +753,7 @@ def process_transactions(
     finally:
         # close the *writeable* db handle regardless of errors
         close_db(db_handle)
+    update_usage_media_from_transaction(trans_dict, tree=tree, user_id=user_id)
     # reopen a *readonly* db handle for seach index update
     db_handle = get_db_outside_request(
         tree=tree, view_private=True, readonly=True, user_id=user_id
@@ -0,0 +1,74 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025       David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""On-disk store for rendered thumbnails."""
+
+from __future__ import annotations
+
+import json
+from typing import Optional
+
+from flask import current_app
+
+from .disk_store import DiskStore
+
+
+class ThumbnailStore(DiskStore):
+    """Thumbnail store keyed by media file and rendering options.
+
+    The store is bounded by its total size in bytes; when it is exceeded,
+    the least recently used thumbnails are deleted.
+    """
+
+    SUFFIX = ".jpg"
+
+    @staticmethod
+    def make_key(
+        checksum: str,
+        size: Optional[int] = None,
+        square: bool = False,
+        crop: Optional[tuple[int, int, int, int]] = None,
+        tree: str = "",
+        path: str = "",
+    ) -> str:
+        """Make the key of a thumbnail.
+
+        Since the checksum of a media object can be edited, the key also
+        contains the tree and the path of the file, so that thumbnails are
+        never shared between trees or files.
+        """
+        options = [str(size) if size else "full"]
+        if crop:
+            options.append("crop-" + "-".join(str(coordinate) for coordinate in crop))
+        if square:
+            options.append("square")
+        return json.dumps([tree, path, checksum, "_".join(options)])
+
+
+def get_thumbnail_store() -> Optional[ThumbnailStore]:
+    """Get the thumbnail store or None if it is disabled.
+
+    Requires the flask app context.
+    """
+    base_dir = current_app.config.get("THUMBNAIL_STORE_DIR")
+    if not base_dir:
+        return None
+    return ThumbnailStore(
+        base_dir=base_dir, max_bytes=current_app.config["THUMBNAIL_STORE_MAX_BYTES"]
+    )
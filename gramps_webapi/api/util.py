@@ -87,7 +87,11 @@ from ..const import (
     TREE_MULTI,
 )
 from ..dbmanager import WebDbManager
+from ..util.metrics import DB_CLOSE_DURATION, DB_OPEN_DURATION
 from .auth import has_permissions
+from .identity_map import IdentityMapProxy
+from .locales import get_gramps_locale, get_language_codes
+from .request_stats import instrument_db
 
 
 class Parser(FlaskParser):
@@ -403,7 +407,8 @@ def get_db_outside_request(
     """
     dbmgr = get_db_manager(tree)
     try:
-        dbstate = dbmgr.get_db(user_id=user_id, readonly=readonly)
+        with DB_OPEN_DURATION.time(mode="read" if readonly else "write"):
+            dbstate = dbmgr.get_db(user_id=user_id, readonly=readonly)
     except DbUpgradeRequiredError:
         abort_with_message(
             HTTPStatus.INTERNAL_SERVER_ERROR,
@@ -423,11 +428,12 @@ def get_db_outside_request(
 
 def close_db(db_handle: DbReadBase) -> None:
     """Close the connection to the database including the undo log."""
-    db_handle.close()
-    if isinstance(db_handle, ProxyDbBase):
-        db_handle.basedb.undodb.close()
-    else:
-        db_handle.undodb.close()
+    with DB_CLOSE_DURATION.time():
+        db_handle.close()
+        if isinstance(db_handle, ProxyDbBase):
+            db_handle.basedb.undodb.close()
+        else:
+            db_handle.undodb.close()
 
 
 def get_db_handle(readonly: bool = True) -> DbReadBase:
@@ -453,6 +459,7 @@ def get_db_handle(readonly: bool = True) -> DbReadBase:
             readonly=True,
             user_id=user_id,
         )
+        instrument_db(db)
         g.db = db
 
     if not view_private:
@@ -474,23 +481,33 @@ def get_db_handle(readonly: bool = True) -> DbReadBase:
             readonly=False,
             user_id=user_id,
         )
+        instrument_db(db_write)
         g.db_write = db_write
     if not readonly:
         return g.db_write
     return g.db
 
 
+def get_identity_map() -> IdentityMapProxy:
+    """Get the read-only database instance wrapped in an identity map.
+
+    The identity map is cached for the duration of the request, so
+    repeated lookups of the same object by handle are only fetched from
+    the database once.
+    """
+    if "identity_map" not in g:
+        g.identity_map = IdentityMapProxy(get_db_handle(readonly=True))
+    return g.identity_map
+
+
 def get_locale_for_language(language: str, default: bool = False) -> GrampsLocale:
     """Get GrampsLocale set to specified language."""
-    if language is not None:
-        catalog = GRAMPS_LOCALE.get_language_dict()
-        for entry in catalog:
-            if catalog[entry] == language:
-                # translate language code (e.g. "da") to locale code (e.g. "da_DK")
-                locale_code = LOCALE_MAP.get(language, language)
-                if "UTF" not in locale_code.upper():
-                    locale_code = f"{locale_code}.UTF-8"
-                return GrampsLocale(lang=locale_code)
+    if language is not None and language in get_language_codes():
+        # translate language code (e.g. "da") to locale code (e.g. "da_DK")
+        locale_code = LOCALE_MAP.get(language, language)
+        if "UTF" not in locale_code.upper():
+            locale_code = f"{locale_code}.UTF-8"
+        return get_gramps_locale(locale_code)
     if default:
         return GRAMPS_LOCALE
     return None
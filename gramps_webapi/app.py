@@ -21,10 +21,11 @@
 
 import logging
 import os
+import time
 import warnings
 from typing import Any, Dict, Optional
 
-from flask import Flask, abort, g, send_from_directory
+from flask import Flask, abort, g, request, send_from_directory
 from flask_compress import Compress
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
@@ -32,15 +33,30 @@ from gramps.gen.config import config as gramps_config
 from gramps.gen.config import set as setconfig
 
 from .api import api_blueprint
-from .api.cache import request_cache, thumbnail_cache
+from .api.access_log import init_access_log
+from .api.cache import media_result_cache, request_cache
+from .api.profiler import init_request_profiler
 from .api.ratelimiter import limiter
+from .api.request_stats import init_request_stats
 from .api.search.embeddings import load_model
 from .api.util import close_db
 from .auth import user_db
 from .config import DefaultConfig, DefaultConfigJWT
-from .const import API_PREFIX, ENV_CONFIG_FILE, TREE_MULTI
+from .const import (
+    API_PREFIX,
+    ENV_CONFIG_FILE,
+    SENDFILE_X_ACCEL_REDIRECT,
+    SENDFILE_X_SENDFILE,
+    TREE_MULTI,
+)
 from .dbmanager import WebDbManager
 from .util.celery import create_celery
+from .util.metrics import (
+    CONTENT_TYPE_METRICS,
+    REQUEST_DURATION,
+    enable_metrics,
+    render_metrics,
+)
 
 
 def deprecated_config_from_env(app):
@@ -99,12 +115,30 @@ def create_app(config: Optional[Dict[str, Any]] = None):
     if config:
         app.config.update(**config)
 
+    thumbnail_cache_config = app.config.get("THUMBNAIL_CACHE_CONFIG")
+    if thumbnail_cache_config and thumbnail_cache_config.get("CACHE_DIR"):
+        warnings.warn(
+            "The `THUMBNAIL_CACHE_CONFIG` config option is deprecated and will"
+            " stop working in the future. Please use `THUMBNAIL_STORE_DIR` instead."
+        )
+        if app.config["THUMBNAIL_STORE_DIR"] == DefaultConfig.THUMBNAIL_STORE_DIR:
+            app.config["THUMBNAIL_STORE_DIR"] = os.path.join(
+                thumbnail_cache_config["CACHE_DIR"], "store"
+            )
+
     # fail if required config option is missing
     required_options = ["TREE", "SECRET_KEY", "USER_DB_URI"]
     for option in required_options:
         if not app.config.get(option):
             raise ValueError(f"{option} must be specified")
 
+    sendfile_mode = app.config.get("MEDIA_SENDFILE_MODE")
+    if sendfile_mode and sendfile_mode not in {
+        SENDFILE_X_ACCEL_REDIRECT,
+        SENDFILE_X_SENDFILE,
+    }:
+        raise ValueError(f"Unknown MEDIA_SENDFILE_MODE: {sendfile_mode}")
+
     # environment variable to set the Gramps database path.
     # Needed for backwards compatibility from Gramps 6.0 onwards
     if db_path := os.getenv("GRAMPS_DATABASE_PATH"):
@@ -143,7 +177,7 @@ def create_app(config: Optional[Dict[str, Any]] = None):
     user_db.init_app(app)
 
     request_cache.init_app(app, config=app.config["REQUEST_CACHE_CONFIG"])
-    thumbnail_cache.init_app(app, config=app.config["THUMBNAIL_CACHE_CONFIG"])
+    media_result_cache.init_app(app, config=app.config["MEDIA_RESULT_CACHE_CONFIG"])
 
     # enable CORS for /api/... resources
     if app.config.get("CORS_ORIGINS"):
@@ -176,12 +210,49 @@ def create_app(config: Optional[Dict[str, Any]] = None):
     app.register_blueprint(api_blueprint)
     limiter.init_app(app)
 
+    # collect metrics
+    enable_metrics(app.config["METRICS_ENABLED"])
+    if app.config["METRICS_ENABLED"]:
+
+        @app.before_request
+        def start_request_timer() -> None:
+            g.request_start_time = time.perf_counter()
+
+        @app.after_request
+        def observe_request_duration(response):
+            start = g.pop("request_start_time", None)
+            if start is not None:
+                REQUEST_DURATION.observe(
+                    time.perf_counter() - start,
+                    endpoint=request.endpoint or "",
+                    method=request.method,
+                    status=str(response.status_code),
+                )
+            return response
+
+        @app.route("/metrics", methods=["GET"])
+        def metrics():
+            # not authenticated, so it must not be exposed publicly
+            return render_metrics(), 200, {"Content-Type": CONTENT_TYPE_METRICS}
+
+    # collect the database calls and timings of requests
+    init_request_stats(app)
+    # profile requests if asked to by authorized users
+    init_request_profiler(app)
+    # log requests in JSON format; registered after the request statistics,
+    # whose cache lookups it includes
+    if app.config["ACCESS_LOG"]:
+        init_access_log(app)
+
     # instantiate celery
     create_celery(app)
 
     @app.teardown_appcontext
     def close_db_connection(exception) -> None:
         """Close the Gramps database after every request."""
+        identity_map = g.pop("identity_map", None)
+        if identity_map:
+            app.logger.debug("Identity map statistics: %s", identity_map.get_stats())
         db = g.pop("db", None)
         if db:
             close_db(db)
@@ -373,6 +373,82 @@ def set_tree_usage(
     user_db.session.commit()  # pylint: disable=no-member
 
 
+def has_media_usage(tree: str) -> bool:
+    """Check whether the sizes of the media files of a tree are recorded."""
+    query = user_db.session.query(MediaUsage)  # pylint: disable=no-member
+    return query.filter_by(tree=tree).first() is not None
+
+
+def set_media_usage(tree: str, sizes: Dict[str, int]) -> None:
+    """Replace the recorded sizes of the media files of a tree.
+
+    `sizes` maps file checksums to file sizes. Also sets the media usage of
+    the tree to the total size.
+    """
+    query = user_db.session.query(MediaUsage)  # pylint: disable=no-member
+    query.filter_by(tree=tree).delete()
+    user_db.session.add_all(  # pylint: disable=no-member
+        [
+            MediaUsage(tree=tree, checksum=checksum, size=size)
+            for checksum, size in sizes.items()
+        ]
+    )
+    query = user_db.session.query(Tree)  # pylint: disable=no-member
+    tree_obj: Tree = query.filter_by(id=tree).scalar()
+    if not tree_obj:
+        tree_obj = Tree(id=tree)
+    tree_obj.usage_media = sum(sizes.values())
+    user_db.session.add(tree_obj)  # pylint: disable=no-member
+    user_db.session.commit()  # pylint: disable=no-member
+
+
+def add_media_usage(tree: str, checksum: str, size: int) -> bool:
+    """Record the size of a media file and add it to the media usage.
+
+    Files that are already recorded are not counted again. Returns True if
+    the file was added.
+    """
+    try:
+        # roll back only the insert, not other changes pending in the session
+        with user_db.session.begin_nested():  # pylint: disable=no-member
+            user_db.session.add(  # pylint: disable=no-member
+                MediaUsage(tree=tree, checksum=checksum, size=size)
+            )
+    except IntegrityError:
+        return False
+    _increment_usage_media(tree, size)
+    user_db.session.commit()  # pylint: disable=no-member
+    return True
+
+
+def remove_media_usage(tree: str, checksums: Sequence[str]) -> int:
+    """Remove recorded media files and subtract their sizes from the usage.
+
+    Returns the number of bytes removed.
+    """
+    if not checksums:
+        return 0
+    query = user_db.session.query(MediaUsage)  # pylint: disable=no-member
+    query = query.filter(
+        MediaUsage.tree == tree, MediaUsage.checksum.in_(list(checksums))
+    )
+    size = sum(media_usage.size for media_usage in query)
+    query.delete(synchronize_session=False)
+    if size:
+        _increment_usage_media(tree, -size)
+    user_db.session.commit()  # pylint: disable=no-member
+    return size
+
+
+def _increment_usage_media(tree: str, size: int) -> None:
+    """Add a number of bytes to the media usage within the current session."""
+    query = user_db.session.query(Tree)  # pylint: disable=no-member
+    query.filter_by(id=tree).update(
+        {Tree.usage_media: coalesce(Tree.usage_media, 0) + size},
+        synchronize_session=False,
+    )
+
+
 def set_tree_details(
     tree: str,
     quota_media: Optional[int] = None,
@@ -466,3 +542,19 @@ class Tree(user_db.Model):  # type: ignore
     def __repr__(self):
         """Return string representation of instance."""
         return f"<Tree(id='{self.id}')>"
+
+
+class MediaUsage(user_db.Model):  # type: ignore
+    """Media file size table class for sqlalchemy."""
+
+    __tablename__ = "media_usage"
+    __table_args__ = (sa.UniqueConstraint("tree", "checksum"),)
+
+    id = mapped_column(sa.Integer, primary_key=True)
+    tree = mapped_column(sa.String, index=True, nullable=False)
+    checksum = mapped_column(sa.String, nullable=False)
+    size = mapped_column(sa.BigInteger, nullable=False)
+
+    def __repr__(self):
+        """Return string representation of instance."""
+        return f"<MediaUsage(tree='{self.tree}', checksum='{self.checksum}')>"
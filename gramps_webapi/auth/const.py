@@ -60,6 +60,8 @@ PERM_DEL_OBJ_BATCH = "BatchDeleteObjects"
 PERM_IMPORT_FILE = "ImportFile"
 PERM_VIEW_SETTINGS = "ViewSettings"
 PERM_EDIT_SETTINGS = "EditSettings"
+PERM_VIEW_DIAGNOSTICS = "ViewDiagnostics"
+PERM_PROFILE_REQUESTS = "ProfileRequests"
 PERM_TRIGGER_REINDEX = "TriggerReindex"
 PERM_EDIT_NAME_GROUP = "EditNameGroup"
 PERM_EDIT_TREE = "EditTree"
@@ -108,6 +110,7 @@ PERMISSIONS[ROLE_OWNER] = PERMISSIONS[ROLE_EDITOR] | {
     PERM_UPGRADE_TREE_SCHEMA,
     PERM_EDIT_TREE_MIN_ROLE_AI,
     PERM_DEL_OBJ_BATCH,
+    PERM_PROFILE_REQUESTS,
 }
 
 PERMISSIONS[ROLE_ADMIN] = PERMISSIONS[ROLE_OWNER] | {
@@ -120,6 +123,7 @@ PERMISSIONS[ROLE_ADMIN] = PERMISSIONS[ROLE_OWNER] | {
     PERM_DEL_OTHER_TREE_USER,
     PERM_VIEW_SETTINGS,
     PERM_EDIT_SETTINGS,
+    PERM_VIEW_DIAGNOSTICS,
     PERM_VIEW_OTHER_TREE,
     PERM_EDIT_OTHER_TREE,
     PERM_EDIT_TREE_QUOTA,
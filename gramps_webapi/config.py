@@ -45,12 +45,23 @@ class DefaultConfig(object):
         "CACHE_THRESHOLD": 1000,
         "CACHE_DEFAULT_TIMEOUT": 0,
     }
-    THUMBNAIL_CACHE_CONFIG = {
+    # face regions and OCR results are kept for good (no threshold), so the
+    # directory grows by a few kilobytes per analyzed media file
+    MEDIA_RESULT_CACHE_CONFIG = {
         "CACHE_TYPE": "FileSystemCache",
-        "CACHE_DIR": str(Path.cwd() / "thumbnail_cache"),
-        "CACHE_THRESHOLD": 1000,
+        "CACHE_DIR": str(Path.cwd() / "media_result_cache"),
+        "CACHE_THRESHOLD": 0,
         "CACHE_DEFAULT_TIMEOUT": 0,
     }
+    MEDIA_ANALYSIS_WORKERS = 4
+    MEDIA_IMPORT_WORKERS = 8
+    OCR_MAX_PDF_PAGES = 50
+    SORTED_HANDLES_CACHE_MAX_HANDLES = 200_000
+    THUMBNAIL_STORE_DIR = str(Path.cwd() / "thumbnail_store")
+    THUMBNAIL_STORE_MAX_BYTES = 1024**3
+    THUMBNAIL_PREGENERATE_SIZES = [100, 200, 500]
+    S3_ORIGINAL_CACHE_DIR = str(Path.cwd() / "s3_original_cache")
+    S3_ORIGINAL_CACHE_MAX_BYTES = 5 * 1024**3
     POSTGRES_USER = None
     POSTGRES_PASSWORD = None
     POSTGRES_HOST = "localhost"
@@ -59,12 +70,24 @@ class DefaultConfig(object):
     CELERY_CONFIG: Dict[str, str] = {}
     MEDIA_BASE_DIR = ""
     MEDIA_PREFIX_TREE = False
+    MEDIA_SENDFILE_MODE = ""  # "x-accel-redirect" (nginx) or "x-sendfile"
+    MEDIA_SENDFILE_PREFIX = "/internal-media/"
     REPORT_DIR = str(Path.cwd() / "report_cache")
     EXPORT_DIR = str(Path.cwd() / "export_cache")
+    PROFILE_DIR = str(Path.cwd() / "profile_cache")
     NEW_DB_BACKEND = "sqlite"
     RATE_LIMIT_MEDIA_ARCHIVE = "1 per day"
     REGISTRATION_DISABLED = False
     LOG_LEVEL = "INFO"
+    # the /metrics route has no authentication: block it at the reverse proxy
+    # unless the app is only reachable from the monitoring network
+    METRICS_ENABLED = False
+    METRICS_WORKER_PORT = 0  # serve task queue worker metrics if nonzero
+    SLOW_REQUEST_THRESHOLD = 0  # log requests slower than this (seconds) if nonzero
+    ACCESS_LOG = False  # log every request as a JSON line
+    ACCESS_LOG_FILE = ""  # write the access log to a file instead of stderr
+    # fraction of successful requests logged, by endpoint name
+    ACCESS_LOG_SAMPLE_RATES: Dict[str, float] = {}
     LLM_BASE_URL = None
     LLM_MODEL = ""
     LLM_MAX_CONTEXT_LENGTH = 50000
@@ -30,6 +30,10 @@ from ._version import __version__ as VERSION
 # the value of the TREE config option that enables multi-tree support
 TREE_MULTI = "*"
 
+# values of the MEDIA_SENDFILE_MODE config option
+SENDFILE_X_ACCEL_REDIRECT = "x-accel-redirect"
+SENDFILE_X_SENDFILE = "x-sendfile"
+
 # files
 TEST_CONFIG = resource_filename("gramps_webapi", "data/test.cfg")
 TEST_AUTH_CONFIG = resource_filename("gramps_webapi", "data/test_auth.cfg")
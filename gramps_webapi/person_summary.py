@@ -0,0 +1,190 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025       David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Materialized per-tree summary of people for sorting and list views."""
+
+from __future__ import annotations
+
+from typing import Any, Iterable
+
+from gramps.gen.const import GRAMPS_LOCALE as glocale
+from gramps.gen.db.base import DbReadBase
+from gramps.gen.display.name import NameDisplay
+from gramps.gen.errors import HandleError
+from gramps.gen.lib import Person
+from gramps.gen.soundex import soundex
+from gramps.gen.utils.db import get_birth_or_fallback, get_death_or_fallback
+from sqlalchemy import Integer, Text, delete, func, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import DeclarativeBase, mapped_column, sessionmaker
+
+# number of rows inserted per statement when rebuilding the table
+REBUILD_CHUNK_SIZE = 1000
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class PersonSummary(Base):
+    """Precomputed sort keys and display values of a person."""
+
+    __tablename__ = "person_summary"
+
+    id = mapped_column(Integer, primary_key=True)
+    tree_id = mapped_column(Integer, index=True)
+    handle = mapped_column(Text, index=True)
+    gramps_id = mapped_column(Text)
+    sorted_name = mapped_column(Text)
+    surname = mapped_column(Text)
+    surname_key = mapped_column(Text)
+    soundex = mapped_column(Text)
+    birth_sortval = mapped_column(Integer)
+    death_sortval = mapped_column(Integer)
+    birth_date = mapped_column(Text)
+    death_date = mapped_column(Text)
+    gender = mapped_column(Integer)
+    private = mapped_column(Integer)
+
+
+def summarize_person(db_handle: DbReadBase, person: Person) -> dict[str, Any]:
+    """Compute the summary of a person."""
+    name = person.get_primary_name()
+    birth = get_birth_or_fallback(db_handle, person)
+    death = get_death_or_fallback(db_handle, person)
+    return {
+        "handle": person.handle,
+        "gramps_id": person.gramps_id,
+        "sorted_name": NameDisplay().sorted(person),
+        "surname": name.get_surname(),
+        "surname_key": name.get_surname() + name.get_first_name() + name.get_suffix(),
+        "soundex": soundex(name.get_surname()),
+        "birth_sortval": birth.get_date_object().get_sort_value() if birth else 0,
+        "death_sortval": death.get_date_object().get_sort_value() if death else 0,
+        "birth_date": (
+            glocale.date_displayer.display(birth.get_date_object()) if birth else ""
+        ),
+        "death_date": (
+            glocale.date_displayer.display(death.get_date_object()) if death else ""
+        ),
+        "gender": person.gender,
+        "private": int(person.private),
+    }
+
+
+class PersonSummaryTable:
+    """Person summary table of a single tree."""
+
+    def __init__(self, engine: Engine, tree_id: int | None = None) -> None:
+        """Initialize given an SQLAlchemy engine and optional tree ID."""
+        self.engine = engine
+        self.tree_id = tree_id
+        self.SQLSession = sessionmaker(self.engine)
+
+    def create(self) -> None:
+        """Create the table if it does not exist yet."""
+        Base.metadata.create_all(self.engine)
+
+    def _where_tree(self, statement):
+        """Restrict a statement to the current tree."""
+        if self.tree_id is None:
+            return statement.where(PersonSummary.tree_id.is_(None))
+        return statement.where(PersonSummary.tree_id == self.tree_id)
+
+    def count(self) -> int:
+        """Return the number of summarized people."""
+        with self.SQLSession() as session:
+            statement = self._where_tree(select(func.count(PersonSummary.id)))
+            return session.execute(statement).scalar() or 0
+
+    def get_sort_values(self, columns: list[str]) -> dict[str, dict[str, Any]]:
+        """Return the values of some columns for all people, keyed by handle."""
+        selected = [getattr(PersonSummary, column) for column in columns]
+        with self.SQLSession() as session:
+            statement = self._where_tree(select(PersonSummary.handle, *selected))
+            return {
+                handle: dict(zip(columns, values))
+                for handle, *values in session.execute(statement)
+            }
+
+    def update(self, db_handle: DbReadBase, handles: Iterable[str]) -> None:
+        """Recompute the summaries of the people with the given handles.
+
+        People that do not exist anymore are removed from the table.
+        """
+        handles = list(set(handles))
+        if not handles:
+            return
+        rows = []
+        for handle in handles:
+            try:
+                person = db_handle.get_person_from_handle(handle)
+            except HandleError:
+                continue
+            if person is not None:
+                rows.append(self._make_row(db_handle, person))
+        with self.SQLSession() as session:
+            session.execute(
+                self._where_tree(delete(PersonSummary)).where(
+                    PersonSummary.handle.in_(handles)
+                )
+            )
+            if rows:
+                session.execute(insert(PersonSummary), rows)
+            session.commit()
+
+    def rebuild(self, db_handle: DbReadBase) -> None:
+        """Recompute the summaries of all people in the tree."""
+        with self.SQLSession() as session:
+            session.execute(self._where_tree(delete(PersonSummary)))
+            rows = []
+            for person in db_handle.iter_people():
+                rows.append(self._make_row(db_handle, person))
+                if len(rows) >= REBUILD_CHUNK_SIZE:
+                    session.execute(insert(PersonSummary), rows)
+                    rows = []
+            if rows:
+                session.execute(insert(PersonSummary), rows)
+            session.commit()
+
+    def clear(self) -> None:
+        """Remove the summaries of all people in the tree.
+
+        This marks the table as stale; people missing from the table have
+        their sort keys computed on the fly until it is rebuilt.
+        """
+        with self.SQLSession() as session:
+            session.execute(self._where_tree(delete(PersonSummary)))
+            session.commit()
+
+    def ensure_complete(self, db_handle: DbReadBase) -> bool:
+        """Rebuild the table if the number of people does not match.
+
+        Returns True if the table was rebuilt.
+        """
+        if self.count() == db_handle.get_number_of_people():
+            return False
+        self.rebuild(db_handle)
+        return True
+
+    def _make_row(self, db_handle: DbReadBase, person: Person) -> dict[str, Any]:
+        """Make a table row for a person."""
+        row = summarize_person(db_handle, person)
+        row["tree_id"] = self.tree_id
+        return row
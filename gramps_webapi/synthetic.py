@@ -0,0 +1,375 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Generator of synthetic family trees for benchmarks."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import random
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from gramps.gen.db import DbTxn
+from gramps.gen.db.base import DbWriteBase
+from gramps.gen.lib import (
+    ChildRef,
+    Citation,
+    Date,
+    Event,
+    EventRef,
+    EventRoleType,
+    EventType,
+    Family,
+    Media,
+    MediaRef,
+    Name,
+    Note,
+    NoteType,
+    Person,
+    Place,
+    PlaceName,
+    PlaceRef,
+    PlaceType,
+    RepoRef,
+    Repository,
+    Source,
+    Surname,
+)
+from PIL import Image
+
+FIRST_NAMES = {
+    Person.MALE: """Adam Albert Anton Carl Daniel Edward Emil Frank Friedrich George
+    Hans Henry Jacob James Johann John Joseph Karl Louis Martin Michael Paul Peter
+    Richard Robert Thomas Walter William""".split(),
+    Person.FEMALE: """Agnes Alice Anna Barbara Caroline Catherine Clara Dorothea
+    Elisabeth Emma Frieda Helen Ida Johanna Louise Margaret Maria Martha Mary Rosa
+    Sarah Sophie Theresa Wilhelmina""".split(),
+}
+SYLLABLES = """ba ber bran dal den dorf el en feld ford gar han hart holm kam ker
+lan ley lin man mer mor ner ol ren ric ros sen son stein ter ton wal wick
+win""".split()
+OCCUPATIONS = """Baker Blacksmith Carpenter Clerk Farmer Fisher Merchant Miller
+Miner Tailor Teacher Weaver""".split()
+
+# number of children per family and their relative frequency
+CHILDREN_WEIGHTS = [(0, 2), (1, 3), (2, 4), (3, 4), (4, 3), (5, 2), (6, 1), (8, 1)]
+# maximum number of unmarried people waiting for a partner
+MAX_SINGLES = 10000
+# probability that a partner is taken from the unmarried people
+PARTNER_FROM_TREE = 0.85
+CITATION_PROBABILITY = 0.3
+NOTE_PROBABILITY = 0.15
+OCCUPATION_PROBABILITY = 0.3
+MEDIA_PROBABILITY = 0.05
+MEDIA_IMAGE_SIZE = (160, 120)
+
+
+class SyntheticTreeGenerator:
+    """Deterministic generator of a synthetic family tree.
+
+    People are created family by family. Their children become candidates
+    for the parents of later families, so that the tree spans several
+    generations. Events, places, sources, citations, notes and media
+    objects are added along the way. Media objects only point to files if
+    a media directory is given.
+    """
+
+    def __init__(
+        self,
+        db_handle: DbWriteBase,
+        seed: int = 0,
+        media_dir: Optional[str] = None,
+    ) -> None:
+        """Initialize the generator."""
+        self.db_handle = db_handle
+        self.rng = random.Random(seed)
+        self.media_dir = media_dir
+        self.counts: Dict[str, int] = {}
+        self.singles: Dict[int, deque] = {Person.MALE: deque(), Person.FEMALE: deque()}
+        self.surnames: List[str] = []
+        self.place_handles: List[str] = []
+        self.source_handles: List[str] = []
+        self.trans: DbTxn
+
+    def _make_handle(self) -> str:
+        """Make a handle that is reproducible for a given seed."""
+        return f"{self.rng.getrandbits(64):016x}"
+
+    def _make_id(self, prefix: str, obj_class: str) -> str:
+        """Make the next Gramps ID for an object class."""
+        count = self.counts.get(obj_class, 0)
+        self.counts[obj_class] = count + 1
+        return f"{prefix}{count:07d}"
+
+    def _make_word(self, min_syllables: int = 2, max_syllables: int = 3) -> str:
+        """Make a random name from syllables."""
+        count = self.rng.randint(min_syllables, max_syllables)
+        return "".join(self.rng.choice(SYLLABLES) for _ in range(count)).title()
+
+    def _make_date(self, year: int) -> Date:
+        """Make a date with a random day in a year."""
+        date = Date()
+        date.set_yr_mon_day(year, self.rng.randint(1, 12), self.rng.randint(1, 28))
+        return date
+
+    def _add_places(self, num_people: int) -> None:
+        """Add a hierarchy of countries, regions and cities."""
+        countries = [
+            self._add_place(PlaceType.COUNTRY, None)
+            for _ in range(max(3, num_people // 100000))
+        ]
+        regions = [
+            self._add_place(PlaceType.COUNTY, self.rng.choice(countries))
+            for _ in range(max(5, num_people // 2000))
+        ]
+        self.place_handles = [
+            self._add_place(PlaceType.CITY, self.rng.choice(regions))
+            for _ in range(max(10, num_people // 50))
+        ]
+
+    def _add_place(self, place_type: int, parent_handle: Optional[str]) -> str:
+        """Add a place and return its handle."""
+        place = Place()
+        place.set_handle(self._make_handle())
+        place.set_gramps_id(self._make_id("P", "Place"))
+        place.set_name(PlaceName(value=self._make_word()))
+        place.set_type(place_type)
+        if parent_handle:
+            placeref = PlaceRef()
+            placeref.set_reference_handle(parent_handle)
+            place.add_placeref(placeref)
+        return self.db_handle.add_place(place, self.trans)
+
+    def _add_sources(self, num_people: int) -> None:
+        """Add repositories and sources."""
+        repository_handles = []
+        for _ in range(max(2, num_people // 5000)):
+            repository = Repository()
+            repository.set_handle(self._make_handle())
+            repository.set_gramps_id(self._make_id("R", "Repository"))
+            repository.set_name(f"{self._make_word()} Archive")
+            repository_handles.append(
+                self.db_handle.add_repository(repository, self.trans)
+            )
+        for _ in range(max(5, num_people // 200)):
+            source = Source()
+            source.set_handle(self._make_handle())
+            source.set_gramps_id(self._make_id("S", "Source"))
+            source.set_title(f"Parish register of {self._make_word()}")
+            source.set_author(f"{self._make_word()} Parish")
+            reporef = RepoRef()
+            reporef.set_reference_handle(self.rng.choice(repository_handles))
+            source.add_repo_reference(reporef)
+            self.source_handles.append(self.db_handle.add_source(source, self.trans))
+        self.surnames = [self._make_word() for _ in range(max(50, num_people // 50))]
+
+    def _add_citation(self) -> str:
+        """Add a citation of a random source and return its handle."""
+        citation = Citation()
+        citation.set_handle(self._make_handle())
+        citation.set_gramps_id(self._make_id("C", "Citation"))
+        citation.set_reference_handle(self.rng.choice(self.source_handles))
+        citation.set_page(f"p. {self.rng.randint(1, 500)}")
+        return self.db_handle.add_citation(citation, self.trans)
+
+    def _add_note(self, text: str, note_type: int) -> str:
+        """Add a note and return its handle."""
+        note = Note()
+        note.set_handle(self._make_handle())
+        note.set_gramps_id(self._make_id("N", "Note"))
+        note.set(text)
+        note.set_type(note_type)
+        return self.db_handle.add_note(note, self.trans)
+
+    def _add_event(self, event_type: int, year: int, description: str = "") -> EventRef:
+        """Add an event and return a reference to it."""
+        event = Event()
+        event.set_handle(self._make_handle())
+        event.set_gramps_id(self._make_id("E", "Event"))
+        event.set_type(event_type)
+        event.set_date_object(self._make_date(year))
+        event.set_place_handle(self.rng.choice(self.place_handles))
+        event.set_description(description)
+        if self.rng.random() < CITATION_PROBABILITY:
+            event.add_citation(self._add_citation())
+        event_ref = EventRef()
+        event_ref.set_reference_handle(self.db_handle.add_event(event, self.trans))
+        return event_ref
+
+    def _add_media(self, person: Person, year: int) -> str:
+        """Add a media object showing a person and return its handle."""
+        gramps_id = self._make_id("O", "Media")
+        path = f"synthetic/{gramps_id}.jpg"
+        if self.media_dir:
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            buffer = io.BytesIO()
+            Image.new("RGB", MEDIA_IMAGE_SIZE, color).save(buffer, format="JPEG")
+            data = buffer.getvalue()
+            file_path = os.path.join(self.media_dir, path)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, "wb") as f:
+                f.write(data)
+        else:
+            data = path.encode()
+        media = Media()
+        media.set_handle(self._make_handle())
+        media.set_gramps_id(gramps_id)
+        media.set_path(path)
+        media.set_mime_type("image/jpeg")
+        media.set_checksum(hashlib.md5(data).hexdigest())
+        media.set_description(f"Portrait of {person.get_primary_name().first_name}")
+        media.set_date_object(self._make_date(year))
+        return self.db_handle.add_media(media, self.trans)
+
+    def _make_person(
+        self, gender: int, surname: str, birth_year: int
+    ) -> Tuple[Person, int]:
+        """Make a person with events, but do not add it yet."""
+        person = Person()
+        person.set_handle(self._make_handle())
+        person.set_gramps_id(self._make_id("I", "Person"))
+        person.set_gender(gender)
+        name = Name()
+        name.set_first_name(self.rng.choice(FIRST_NAMES[gender]))
+        primary_surname = Surname()
+        primary_surname.set_surname(surname)
+        primary_surname.set_primary(True)
+        name.add_surname(primary_surname)
+        person.set_primary_name(name)
+        person.set_birth_ref(self._add_event(EventType.BIRTH, birth_year))
+        if self.rng.random() < OCCUPATION_PROBABILITY:
+            person.add_event_ref(
+                self._add_event(
+                    EventType.OCCUPATION,
+                    birth_year + self.rng.randint(18, 40),
+                    self.rng.choice(OCCUPATIONS),
+                )
+            )
+        death_year = birth_year + self.rng.randint(1, 95)
+        if death_year < 2000:
+            person.set_death_ref(self._add_event(EventType.DEATH, death_year))
+        if self.rng.random() < NOTE_PROBABILITY:
+            person.add_note(
+                self._add_note(
+                    f"{name.first_name} {surname} was born in {birth_year}.",
+                    NoteType.PERSON,
+                )
+            )
+        if self.rng.random() < MEDIA_PROBABILITY:
+            media_ref = MediaRef()
+            media_ref.set_reference_handle(self._add_media(person, birth_year + 20))
+            person.add_media_reference(media_ref)
+        return person, birth_year
+
+    def _get_partner(self, gender: int, allow_new: bool) -> Tuple[Person, int, bool]:
+        """Get an unmarried person or make a new one.
+
+        Returns the person, the birth year and whether the person has been
+        added to the database already.
+        """
+        singles = self.singles[gender]
+        if singles and (not allow_new or self.rng.random() < PARTNER_FROM_TREE):
+            person, birth_year = singles.popleft()
+            return person, birth_year, True
+        person, birth_year = self._make_person(
+            gender, self.rng.choice(self.surnames), self.rng.randint(1600, 1750)
+        )
+        return person, birth_year, False
+
+    def _add_family(self, remaining: int) -> int:
+        """Add a family with its members and return the number of new people."""
+        family = Family()
+        family.set_handle(self._make_handle())
+        family.set_gramps_id(self._make_id("F", "Family"))
+        count = 0
+        parents = []
+        for gender in Person.MALE, Person.FEMALE:
+            person, birth_year, exists = self._get_partner(
+                gender, allow_new=count < remaining
+            )
+            person.add_family_handle(family.handle)
+            if exists:
+                self.db_handle.commit_person(person, self.trans)
+            else:
+                self.db_handle.add_person(person, self.trans)
+                count += 1
+            parents.append((person, birth_year))
+        (father, father_birth), (mother, mother_birth) = parents
+        family.set_father_handle(father.handle)
+        family.set_mother_handle(mother.handle)
+        marriage_year = max(father_birth, mother_birth) + self.rng.randint(18, 35)
+        event_ref = self._add_event(EventType.MARRIAGE, marriage_year)
+        event_ref.set_role(EventRoleType.FAMILY)
+        family.add_event_ref(event_ref)
+        surname = father.get_primary_name().get_surname()
+        values, weights = zip(*CHILDREN_WEIGHTS)
+        num_children = self.rng.choices(values, weights)[0]
+        for _ in range(min(num_children, remaining - count)):
+            gender = self.rng.choice([Person.MALE, Person.FEMALE])
+            child, birth_year = self._make_person(
+                gender, surname, marriage_year + self.rng.randint(1, 20)
+            )
+            child.add_parent_family_handle(family.handle)
+            self.db_handle.add_person(child, self.trans)
+            child_ref = ChildRef()
+            child_ref.set_reference_handle(child.handle)
+            family.add_child_ref(child_ref)
+            self.singles[gender].append((child, birth_year))
+            if len(self.singles[gender]) > MAX_SINGLES:
+                # the oldest candidates remain unmarried
+                self.singles[gender].popleft()
+            count += 1
+        self.db_handle.add_family(family, self.trans)
+        return count
+
+    def generate(
+        self, num_people: int, progress_cb: Optional[Callable] = None
+    ) -> Dict[str, int]:
+        """Add the objects of a tree to the database.
+
+        Returns the number of objects added per class.
+        """
+        with DbTxn("Generate synthetic tree", self.db_handle, batch=True) as trans:
+            self.trans = trans
+            self._add_places(num_people)
+            self._add_sources(num_people)
+            count = 0
+            while count < num_people:
+                count += self._add_family(num_people - count)
+                if progress_cb:
+                    progress_cb(current=min(count, num_people), total=num_people)
+        return dict(self.counts)
+
+
+def generate_tree(
+    db_handle: DbWriteBase,
+    num_people: int,
+    seed: int = 0,
+    media_dir: Optional[str] = None,
+    progress_cb: Optional[Callable] = None,
+) -> Dict[str, int]:
+    """Fill a database with a synthetic family tree.
+
+    The same seed always results in the same tree.
+    """
+    generator = SyntheticTreeGenerator(db_handle, seed=seed, media_dir=media_dir)
+    return generator.generate(num_people, progress_cb=progress_cb)
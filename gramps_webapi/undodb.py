@@ -23,6 +23,7 @@
 
 from __future__ import annotations
 
+import logging
 import pickle
 from contextlib import contextmanager
 from time import time_ns
@@ -32,10 +33,17 @@ import gramps
 import orjson
 from gramps.gen.const import GRAMPS_LOCALE as glocale
 from gramps.gen.db import REFERENCE_KEY, TXNADD, TXNDEL, TXNUPD, DbUndo, DbWriteBase
-from gramps.gen.db.dbconst import CLASS_TO_KEY_MAP, KEY_TO_CLASS_MAP, KEY_TO_NAME_MAP
+from gramps.gen.db.dbconst import (
+    CLASS_TO_KEY_MAP,
+    EVENT_KEY,
+    KEY_TO_CLASS_MAP,
+    KEY_TO_NAME_MAP,
+    PERSON_KEY,
+)
 from gramps.gen.db.txn import DbTxn
 from gramps.gen.lib.json_utils import (
     DataDict,
+    data_to_object,
     data_to_string,
     object_to_string,
     string_to_dict,
@@ -51,12 +59,34 @@ from sqlalchemy import (
     inspect,
     text,
 )
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
 from sqlalchemy.orm import DeclarativeBase, mapped_column, relationship, sessionmaker
 from sqlalchemy.sql import func
 
+from .person_summary import PersonSummaryTable
+from .util.metrics import UNDO_APPEND_DURATION
+
 _ = glocale.translation.gettext
 
+LOG = logging.getLogger(__name__)
+
+# functions returning the values the default sort order of a class depends on
+SORT_FIELDS = {
+    "Person": lambda obj: (
+        obj.get_primary_name().get_surname(),
+        obj.get_primary_name().get_first_name(),
+    ),
+    "Family": lambda obj: (obj.father_handle, obj.mother_handle),
+    "Citation": lambda obj: obj.page,
+    "Source": lambda obj: obj.title,
+    "Place": lambda obj: obj.title,
+    "Media": lambda obj: obj.desc,
+    "Tag": lambda obj: obj.name,
+}
+
+# pseudo class whose generation is incremented when the person summaries change
+PERSON_SUMMARY_GENERATION = "PersonSummary"
+
 
 def string_to_data_or_list(string: str):
     unserialized = orjson.loads(string)
@@ -176,6 +206,17 @@ class Transaction(Base):
         }
 
 
+class SortGeneration(Base):
+    """Counter for changes affecting the default sort order of a class."""
+
+    __tablename__ = "sort_generations"
+
+    id = mapped_column(Integer, primary_key=True)
+    tree_id = mapped_column(Integer, index=True)
+    obj_class = mapped_column(Text)
+    generation = mapped_column(Integer, default=0)
+
+
 class DbUndoSQL(DbUndo):
     """SQL-based undo database."""
 
@@ -263,24 +304,25 @@ class DbUndoSQL(DbUndo):
             obj_handle, ref_handle = handle
         else:
             obj_handle, ref_handle = (handle, None)
-        length = len(self)
-        connection_id = self.connection_id  # outside session to prevent lock error
-        with self.session_scope() as session:
-            old_json = None if old_data is None else data_to_string(old_data)
-            new_json = None if new_data is None else data_to_string(new_data)
-            new_change = Change(
-                connection_id=connection_id,
-                id=length + 1,
-                obj_class=KEY_TO_CLASS_MAP.get(obj_type, str(obj_type)),
-                trans_type=trans_type,
-                obj_handle=obj_handle,
-                ref_handle=ref_handle,
-                old_json=old_json,
-                new_json=new_json,
-                timestamp=time_ns(),
-            )
-            session.add(new_change)
-            session.commit()
+        with UNDO_APPEND_DURATION.time():
+            length = len(self)
+            connection_id = self.connection_id  # outside session to prevent lock error
+            with self.session_scope() as session:
+                old_json = None if old_data is None else data_to_string(old_data)
+                new_json = None if new_data is None else data_to_string(new_data)
+                new_change = Change(
+                    connection_id=connection_id,
+                    id=length + 1,
+                    obj_class=KEY_TO_CLASS_MAP.get(obj_type, str(obj_type)),
+                    trans_type=trans_type,
+                    obj_handle=obj_handle,
+                    ref_handle=ref_handle,
+                    old_json=old_json,
+                    new_json=new_json,
+                    timestamp=time_ns(),
+                )
+                session.add(new_change)
+                session.commit()
 
     def _after_commit(
         self, transaction: DbTxn, undo: bool = False, redo: bool = False
@@ -543,6 +585,182 @@ class DbUndoSQL(DbUndo):
 class DbUndoSQLWeb(DbUndoSQL):
     """SQL-based undo database with additional methods for Web API."""
 
+    def __init__(self, *args, **kwargs) -> None:
+        DbUndoSQL.__init__(self, *args, **kwargs)
+        self.person_summary = PersonSummaryTable(
+            engine=self.engine, tree_id=self.tree_id
+        )
+
+    def open(self, value=None) -> None:
+        """Open the backing storage."""
+        super().open(value)
+        try:
+            self.person_summary.create()
+        except OperationalError as e:
+            if "already exists" not in str(e):
+                raise
+
+    def _after_commit(
+        self, transaction: DbTxn, undo: bool = False, redo: bool = False
+    ) -> None:
+        """Post-transaction commit processing."""
+        super()._after_commit(transaction, undo=undo, redo=redo)
+        # the undo records are read once and shared by the updates below
+        try:
+            records = self._get_records(transaction)
+        except SQLAlchemyError:
+            LOG.exception("Error while reading the undo records")
+            return
+        try:
+            self._update_person_summary(transaction, records)
+        except SQLAlchemyError:
+            LOG.exception("Error while updating the person summary table")
+        try:
+            self._update_sort_generations(transaction, records)
+        except SQLAlchemyError:
+            LOG.exception("Error while updating the sort generations")
+
+    def _update_person_summary(self, transaction: DbTxn, records: list[tuple]) -> None:
+        """Update the person summary table for the people affected by a commit.
+
+        Batch transactions do not record their changes, so the table is
+        marked as stale instead. It is rebuilt by `ensure_person_summary`.
+        """
+        if transaction.batch:
+            self.person_summary.clear()
+            self._increment_sort_generations({PERSON_SUMMARY_GENERATION})
+            return
+        changed = self._get_changed_handles(records)
+        handles = set(changed.get(PERSON_KEY, set()))
+        # birth and death dates of people referencing changed events
+        for event_handle in changed.get(EVENT_KEY, set()):
+            for _, handle in self.db.find_backlink_handles(
+                event_handle, include_classes=["Person"]
+            ):
+                handles.add(handle)
+        if handles:
+            self.person_summary.update(self.db, handles)
+            self._increment_sort_generations({PERSON_SUMMARY_GENERATION})
+
+    def ensure_person_summary(self) -> None:
+        """Rebuild the person summary table if it is stale or incomplete."""
+        if self.person_summary.ensure_complete(self.db):
+            self._increment_sort_generations({PERSON_SUMMARY_GENERATION})
+
+    def _get_changed_handles(self, records: list[tuple]) -> dict[int, set[str]]:
+        """Get the handles of the objects changed in a transaction by type."""
+        changed: dict[int, set[str]] = {}
+        for obj_type, _, handle, _, _ in records:
+            if obj_type == REFERENCE_KEY:
+                continue
+            changed.setdefault(obj_type, set()).add(handle)
+        return changed
+
+    def _get_records(self, transaction: DbTxn) -> list[tuple]:
+        """Get the undo records of a transaction with a single query.
+
+        The object data is only decoded for modifications of classes with
+        sort fields, as it is not needed otherwise.
+        """
+        if transaction.batch or transaction.first is None or transaction.last is None:
+            return []
+        connection_id = self.connection_id  # outside session to prevent lock error
+        with self.session_scope() as session:
+            changes = (
+                session.query(Change)
+                .filter(
+                    Change.connection_id == connection_id,
+                    Change.id >= transaction.first + 1,
+                    Change.id <= transaction.last + 1,
+                )
+                .all()
+            )
+            records = []
+            for change in changes:
+                old_data = new_data = None
+                if (
+                    change.trans_type == TXNUPD
+                    and change.obj_class in SORT_FIELDS
+                    and change.old_json is not None
+                    and change.new_json is not None
+                ):
+                    old_data = string_to_data_or_list(change.old_json)
+                    new_data = string_to_data_or_list(change.new_json)
+                records.append(
+                    (
+                        int(CLASS_TO_KEY_MAP.get(change.obj_class, change.obj_class)),
+                        change.trans_type,
+                        change.obj_handle,
+                        old_data,
+                        new_data,
+                    )
+                )
+            return records
+
+    def _update_sort_generations(
+        self, transaction: DbTxn, records: list[tuple]
+    ) -> None:
+        """Increment the sort generations of classes affected by a commit.
+
+        Additions and deletions always affect the sort order. Modifications
+        only do if one of the class's sort fields has changed.
+        """
+        if transaction.batch:
+            # batch transactions do not record their changes
+            obj_classes = set(KEY_TO_CLASS_MAP.values())
+        else:
+            obj_classes = set()
+            for obj_type, trans_type, _, old_data, new_data in records:
+                if obj_type == REFERENCE_KEY:
+                    continue
+                obj_class = KEY_TO_CLASS_MAP[obj_type]
+                if obj_class in obj_classes:
+                    continue
+                if trans_type != TXNUPD:
+                    obj_classes.add(obj_class)
+                elif old_data is not None and new_data is not None:
+                    get_sort_fields = SORT_FIELDS[obj_class]
+                    if get_sort_fields(data_to_object(old_data)) != get_sort_fields(
+                        data_to_object(new_data)
+                    ):
+                        obj_classes.add(obj_class)
+        if "Person" in obj_classes:
+            # families are sorted by the names of their parents
+            obj_classes.add("Family")
+        self._increment_sort_generations(obj_classes)
+
+    def _increment_sort_generations(self, obj_classes: set[str]) -> None:
+        """Increment the sort generations of some classes."""
+        if not obj_classes:
+            return
+        with self.session_scope() as session:
+            for obj_class in obj_classes:
+                updated = (
+                    session.query(SortGeneration)
+                    .filter_by(tree_id=self.tree_id, obj_class=obj_class)
+                    .update({SortGeneration.generation: SortGeneration.generation + 1})
+                )
+                if not updated:
+                    session.add(
+                        SortGeneration(
+                            tree_id=self.tree_id, obj_class=obj_class, generation=1
+                        )
+                    )
+
+    def get_sort_generation(self, obj_class: str) -> int:
+        """Return the sort generation of a class.
+
+        The number is incremented by every commit affecting the default sort
+        order of the class.
+        """
+        with self.session_scope() as session:
+            generation = (
+                session.query(func.max(SortGeneration.generation))
+                .filter_by(tree_id=self.tree_id, obj_class=obj_class)
+                .scalar()
+            )
+        return generation or 0
+
     def get_transactions(
         self,
         page: int = 1,
@@ -604,6 +822,9 @@ class DbUndoSQLWeb(DbUndoSQL):
 
 def migrate(undodb: DbUndoSQL) -> None:
     """Migrate the undo db to a new schema if needed."""
+    if isinstance(undodb, DbUndoSQLWeb):
+        # fill the person summary table of trees created before it existed
+        undodb.ensure_person_summary()
     with undodb.session_scope() as session:
         # return all rows where old_json AND new_json are NULL
         rows = (
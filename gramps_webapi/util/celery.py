@@ -1,7 +1,14 @@
 """Utility functions for celery."""
 
+import uuid
+
 from celery import Task
 from celery import current_app as current_celery_app
+from celery.signals import worker_init, worker_process_init
+from celery.utils.log import current_process_index
+
+from .metrics import TASK_DURATION, start_metrics_server
+from .profiler import profiled
 
 
 def create_celery(app):
@@ -14,10 +21,39 @@ def create_celery(app):
         """Celery task which is aware of the flask app context."""
 
         def __call__(self, *args, **kwargs):
-            if self.request.called_directly:
-                return self.run(*args, **kwargs)
-            with app.app_context():
-                return self.run(*args, **kwargs)
+            # any task can be profiled by passing `profile=True`
+            if kwargs.pop("profile", False):
+                profile_id = self.request.id or uuid.uuid4().hex
+                with profiled(
+                    app.config["PROFILE_DIR"], kwargs.get("tree", ""), profile_id
+                ):
+                    return self._run(*args, **kwargs)
+            return self._run(*args, **kwargs)
+
+        def _run(self, *args, **kwargs):
+            with TASK_DURATION.time(task=self.name):
+                if self.request.called_directly:
+                    return self.run(*args, **kwargs)
+                with app.app_context():
+                    return self.run(*args, **kwargs)
 
     celery.Task = ContextTask
+    if app.config["METRICS_ENABLED"] and app.config["METRICS_WORKER_PORT"]:
+        connect_worker_metrics(app.config["METRICS_WORKER_PORT"])
     return celery
+
+
+def connect_worker_metrics(port: int) -> None:
+    """Serve the metrics of the task queue workers once they are started.
+
+    The main worker process serves on `port`. With the prefork pool, tasks
+    run in child processes, which serve on the subsequent ports.
+    """
+
+    def start(**kwargs):
+        start_metrics_server(port + (current_process_index() or 0))
+
+    # the app factory may be called more than once per process
+    uid = "gramps_webapi_metrics"
+    worker_init.connect(start, weak=False, dispatch_uid=uid)
+    worker_process_init.connect(start, weak=False, dispatch_uid=uid)
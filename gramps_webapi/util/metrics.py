@@ -0,0 +1,300 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Lightweight metrics in the Prometheus text exposition format.
+
+Metrics are collected per process and only while enabled. When disabled,
+recording a value costs a single global lookup.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import ContextManager, Dict, Iterator, List, Sequence, Tuple
+
+CONTENT_TYPE_METRICS = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+_enabled = False
+_registry: List[_Metric] = []
+_NULL_TIMER = nullcontext()
+
+
+def enable_metrics(enabled: bool = True) -> None:
+    """Enable or disable the collection of metrics in this process."""
+    global _enabled  # pylint: disable=global-statement
+    _enabled = enabled
+
+
+def metrics_enabled() -> bool:
+    """Return whether metrics are collected in this process."""
+    return _enabled
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    """Format label pairs as used in the exposition format."""
+    if not pairs:
+        return ""
+    labels = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return "{" + labels + "}"
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class of metrics with a fixed set of label names."""
+
+    TYPE = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Return the label values in the order of the label names."""
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def reset(self) -> None:
+        """Remove all recorded values."""
+        raise NotImplementedError
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[Tuple[str, str]], float]]:
+        """Yield the samples as tuples of name suffix, labels and value."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Render the metric in the text exposition format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.TYPE}",
+        ]
+        for suffix, labels, value in self.samples():
+            lines.append(
+                f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    TYPE = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Increment the counter for a set of labels."""
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        """Return the value for a set of labels."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield "_total", list(zip(self.labelnames, key)), value
+
+
+class Histogram(_Metric):
+    """Histogram of observed values with cumulative buckets."""
+
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # bucket counts (the last one for +Inf) and sum per set of labels
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+            self._sums.clear()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record a value for a set of labels."""
+        if not _enabled:
+            return
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def time(self, **labels: str) -> ContextManager:
+        """Return a context manager observing the seconds spent in it."""
+        if not _enabled:
+            return _NULL_TIMER
+        return self._time(labels)
+
+    @contextmanager
+    def _time(self, labels: Dict[str, str]):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get_count(self, **labels: str) -> int:
+        """Return the number of observed values for a set of labels."""
+        with self._lock:
+            return sum(self._counts.get(self._key(labels), []))
+
+    def samples(self):
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), self._sums[key]))
+                for key, counts in self._counts.items()
+            )
+        for key, (counts, total) in values:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", pairs + [("le", _format_value(bound))], cumulative
+            yield "_sum", pairs, total
+            yield "_count", pairs, cumulative
+
+
+def render_metrics() -> str:
+    """Render all metrics in the text exposition format."""
+    return "".join(metric.render() for metric in _registry)
+
+
+def reset_metrics() -> None:
+    """Remove the values of all metrics."""
+    for metric in _registry:
+        metric.reset()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Request handler serving the metrics on any path."""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE_METRICS)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+def start_metrics_server(port: int, addr: str = "") -> ThreadingHTTPServer:
+    """Serve the metrics of this process on a separate port.
+
+    Used by processes without a web app, like task queue workers.
+    """
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+REQUEST_DURATION = Histogram(
+    "gramps_webapi_request_duration_seconds",
+    "Time spent handling API requests.",
+    ["endpoint", "method", "status"],
+)
+DB_OPEN_DURATION = Histogram(
+    "gramps_webapi_db_open_duration_seconds",
+    "Time spent opening a Gramps database.",
+    ["mode"],
+)
+DB_CLOSE_DURATION = Histogram(
+    "gramps_webapi_db_close_duration_seconds",
+    "Time spent closing a Gramps database.",
+)
+CACHE_LOOKUPS = Counter(
+    "gramps_webapi_cache_lookups",
+    "Lookups in the caches by result (hit or miss).",
+    ["cache", "result"],
+)
+SEARCH_DURATION = Histogram(
+    "gramps_webapi_search_duration_seconds",
+    "Time spent querying the search index.",
+    ["kind"],
+)
+TASK_DURATION = Histogram(
+    "gramps_webapi_task_duration_seconds",
+    "Time spent running background tasks.",
+    ["task"],
+    buckets=DEFAULT_BUCKETS + (120.0, 300.0, 600.0, 1800.0, 3600.0),
+)
+UNDO_APPEND_DURATION = Histogram(
+    "gramps_webapi_undo_append_duration_seconds",
+    "Time spent writing an entry to the undo log.",
+)
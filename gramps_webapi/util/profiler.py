@@ -0,0 +1,84 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Profiling of single requests and tasks with cProfile."""
+
+from __future__ import annotations
+
+import cProfile
+import logging
+import os
+import re
+from contextlib import contextmanager
+from typing import Optional
+
+# allowed profile IDs, e.g. request IDs or task IDs
+PROFILE_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}$")
+
+PROFILE_SUFFIX = ".prof"
+
+
+def get_profile_path(base_dir: str, tree: str, profile_id: str) -> str:
+    """Get the path of a stored profile.
+
+    Raises ValueError if the profile ID is not valid.
+    """
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        raise ValueError(f"Invalid profile ID: {profile_id}")
+    return os.path.join(base_dir, tree or "_", f"{profile_id}{PROFILE_SUFFIX}")
+
+
+def start_profiler() -> Optional[cProfile.Profile]:
+    """Start profiling the current thread.
+
+    Returns None if another profiler is active already, which
+    Python does not allow from version 3.12 on.
+    """
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        logging.getLogger(__name__).warning("Another profiler is active")
+        return None
+    return profiler
+
+
+def save_profile(
+    profiler: cProfile.Profile, base_dir: str, tree: str, profile_id: str
+) -> str:
+    """Stop a profiler and store its statistics in pstats format.
+
+    Returns the path of the stored profile.
+    """
+    profiler.disable()
+    path = get_profile_path(base_dir, tree, profile_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    profiler.dump_stats(path)
+    return path
+
+
+@contextmanager
+def profiled(base_dir: str, tree: str, profile_id: str):
+    """Profile the code run in the context and store the profile."""
+    profiler = start_profiler()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            save_profile(profiler, base_dir, tree, profile_id)
@@ -0,0 +1,44 @@
+#! /usr/bin/env python3
+
+"""Script to compare uncached and cached construction of locale-dependent objects.
+
+This measures the per-request overhead of a non-default `locale=` query argument.
+"""
+
+import argparse
+import timeit
+
+from gramps.gen.display.name import NameDisplay
+from gramps.gen.relationship import get_relationship_calculator
+from gramps.gen.utils.grampslocale import GrampsLocale
+
+from gramps_webapi.api.locales import (
+    get_gramps_locale,
+    get_name_displayer,
+    get_relationship_calculator_for_locale,
+)
+
+
+def uncached(lang: str) -> None:
+    """Construct the objects like an uncached request does."""
+    locale = GrampsLocale(lang=lang)
+    NameDisplay(xlocale=locale)
+    get_relationship_calculator(reinit=True, clocale=locale)
+
+
+def cached(lang: str) -> None:
+    """Get the objects from the process-wide cache."""
+    locale = get_gramps_locale(lang)
+    get_name_displayer(locale)
+    get_relationship_calculator_for_locale(locale)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the locale cache")
+    parser.add_argument("--lang", default="de_DE.UTF-8", help="Locale code")
+    parser.add_argument("--number", type=int, default=50, help="Repetitions")
+    args = parser.parse_args()
+
+    for name, func in [("uncached", uncached), ("cached", cached)]:
+        seconds = timeit.timeit(lambda: func(args.lang), number=args.number)
+        print(f"{name}: {1000 * seconds / args.number:.3f} ms per request")
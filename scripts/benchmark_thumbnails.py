@@ -0,0 +1,62 @@
+#! /usr/bin/env python3
+
+"""Script to compare full-resolution and draft-mode thumbnail decoding.
+
+For JPEG images of increasing size, prints the time per thumbnail and the
+size of the decoded image data, which dominates the peak memory per request.
+"""
+
+import argparse
+import io
+import timeit
+
+from PIL import Image, ImageOps
+
+from gramps_webapi.api.image import image_draft, image_thumbnail
+
+MEGAPIXELS = [2, 12, 40]
+
+
+def make_jpeg(megapixels: int) -> bytes:
+    """Create a JPEG image with a 4:3 aspect ratio."""
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    image = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def thumbnail_full(data: bytes, size: int) -> int:
+    """Create a thumbnail decoding the full image and return the decoded bytes."""
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    decoded = image.width * image.height * len(image.getbands())
+    image.thumbnail((size, size))
+    return decoded
+
+
+def thumbnail_draft(data: bytes, size: int) -> int:
+    """Create a thumbnail in draft mode and return the decoded bytes."""
+    image = image_draft(Image.open(io.BytesIO(data)), (size, size))
+    image.load()
+    decoded = image.width * image.height * len(image.getbands())
+    image_thumbnail(image, size=size)
+    return decoded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark thumbnail decoding")
+    parser.add_argument("--size", type=int, default=256, help="Thumbnail size")
+    parser.add_argument("--number", type=int, default=5, help="Repetitions")
+    args = parser.parse_args()
+
+    for megapixels in MEGAPIXELS:
+        data = make_jpeg(megapixels)
+        for name, func in [("full", thumbnail_full), ("draft", thumbnail_draft)]:
+            decoded = func(data, args.size)
+            seconds = timeit.timeit(lambda: func(data, args.size), number=args.number)
+            print(
+                f"{megapixels:3d} MP {name:5s}: "
+                f"{1000 * seconds / args.number:8.1f} ms, "
+                f"{decoded / 1e6:8.1f} MB decoded"
+            )
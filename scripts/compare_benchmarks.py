@@ -0,0 +1,61 @@
+#! /usr/bin/env python3
+
+"""Script to compare two benchmark results of pytest-benchmark.
+
+Prints the median time of each benchmark in the baseline and the current
+results and exits with a non-zero status if any benchmark became slower
+than allowed by the threshold.
+"""
+
+import argparse
+import json
+import sys
+
+
+def load_medians(path: str) -> dict[str, float]:
+    """Load the median time of each benchmark from a JSON file."""
+    with open(path, encoding="utf-8") as f:
+        results = json.load(f)
+    return {
+        benchmark["name"]: benchmark["stats"]["median"]
+        for benchmark in results["benchmarks"]
+    }
+
+
+def compare(baseline: dict[str, float], current: dict[str, float], threshold: float):
+    """Print the comparison and return the names of regressed benchmarks."""
+    regressions = []
+    print(f"{'Benchmark':<30} {'Baseline':>12} {'Current':>12} {'Ratio':>8}")
+    for name, median in sorted(current.items()):
+        if name not in baseline:
+            print(f"{name:<30} {'-':>12} {median * 1000:>10.2f}ms {'-':>8}")
+            continue
+        ratio = median / baseline[name]
+        flag = ""
+        if ratio > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<30} {baseline[name] * 1000:>10.2f}ms "
+            f"{median * 1000:>10.2f}ms {ratio:>8.2f}{flag}"
+        )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare benchmark results")
+    parser.add_argument("baseline", help="JSON file with the baseline results")
+    parser.add_argument("current", help="JSON file with the current results")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.3,
+        help="Maximum allowed ratio of current and baseline median time",
+    )
+    args = parser.parse_args()
+    regressions = compare(
+        load_medians(args.baseline), load_medians(args.current), args.threshold
+    )
+    if regressions:
+        print(f"Benchmarks slower than {args.threshold:.2f}x: {', '.join(regressions)}")
+        sys.exit(1)
@@ -0,0 +1,454 @@
+#! /usr/bin/env python3
+
+"""Script to load test the API with sessions modelled on the frontend.
+
+By default, the API is started with waitress on a synthetic tree in a
+temporary directory, using SQLite and local media files. Tasks run in the
+request unless `--celery` is given, which starts an in-process worker with
+an in-memory broker. With `--s3`, media files are stored in an S3 bucket
+mocked with moto. Alternatively, `--url` runs the scenarios against a
+running server, e.g. to compare numbers of gunicorn workers.
+
+Virtual users repeatedly pick a scenario (home page, person view, search,
+person edit, media upload) by weight, while all requests together are
+paced to the target rate. Prints the latency percentiles and errors per
+request.
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from PIL import Image
+
+TREE_NAME = "Load test"
+USERNAME = "loadtest"
+PASSWORD = "loadtest"
+S3_BUCKET = "gramps-load-test"
+PERCENTILES = [50, 90, 95, 99]
+
+
+class Stats:
+    """Thread-safe collection of latencies and errors per request name."""
+
+    def __init__(self) -> None:
+        """Initialize empty statistics."""
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add(self, name: str, latency: float, error: bool) -> None:
+        """Record a request."""
+        with self._lock:
+            self.latencies.setdefault(name, []).append(latency)
+            if error:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    @staticmethod
+    def summary(name: str, latencies: List[float], errors: int) -> Dict[str, Any]:
+        """Summarize the latencies in milliseconds and the errors."""
+        latencies = sorted(latencies)
+        result: Dict[str, Any] = {
+            "name": name,
+            "count": len(latencies),
+            "errors": errors,
+        }
+        for percentile in PERCENTILES:
+            index = max(0, round(percentile / 100 * len(latencies)) - 1)
+            result[f"p{percentile}"] = latencies[index] * 1000
+        result["max"] = latencies[-1] * 1000
+        return result
+
+    def report(self, duration: float) -> List[Dict[str, Any]]:
+        """Print the statistics and return them."""
+        rows = [
+            self.summary(name, latencies, self.errors.get(name, 0))
+            for name, latencies in sorted(self.latencies.items())
+        ]
+        all_latencies = [
+            lat for latencies in self.latencies.values() for lat in latencies
+        ]
+        if not all_latencies:
+            print("No requests were made.")
+            return rows
+        total = self.summary("Total", all_latencies, sum(self.errors.values()))
+        rows.append(total)
+        columns = "".join(f"{'p' + str(p):>9}" for p in PERCENTILES)
+        print(f"{'Request':<32}{'Count':>7}{'Errors':>8}{columns}{'max':>9}")
+        for row in rows:
+            values = "".join(f"{row[f'p{p}']:>9.1f}" for p in PERCENTILES)
+            print(
+                f"{row['name']:<32}{row['count']:>7}{row['errors']:>8}"
+                f"{values}{row['max']:>9.1f}"
+            )
+        print(
+            f"{total['count'] / duration:.1f} requests/s, "
+            f"error rate {100 * total['errors'] / total['count']:.2f}%"
+        )
+        return rows
+
+
+class Pacer:
+    """Spread the requests of all users evenly at a target rate."""
+
+    def __init__(self, rate: float) -> None:
+        """Initialize given the target rate in requests per second."""
+        self.interval = 1 / rate if rate > 0 else 0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self) -> None:
+        """Wait for the next free slot."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            # do not catch up on slots missed while all users were busy
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        time.sleep(max(0, slot - now))
+
+
+class User:
+    """A virtual user running scenarios of frontend sessions."""
+
+    def __init__(
+        self, url: str, stats: Stats, pacer: Pacer, samples: Dict, seed: int
+    ) -> None:
+        """Initialize the user."""
+        parts = urlsplit(url)
+        connection_class = (
+            HTTPSConnection if parts.scheme == "https" else HTTPConnection
+        )
+        self.connection = connection_class(parts.netloc, timeout=60)
+        self.prefix = parts.path.rstrip("/")
+        self.stats = stats
+        self.pacer = pacer
+        self.samples = samples
+        self.rng = random.Random(seed)
+        self.headers: Dict[str, str] = {}
+        self.scenarios = [
+            (self.home, 4),
+            (self.person_view, 12),
+            (self.search, 6),
+            (self.edit_person, 2),
+            (self.upload_media, 1),
+        ]
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        name: str,
+        body: Optional[bytes] = None,
+        content_type: str = "application/json",
+    ) -> Any:
+        """Make a paced request, record it and return the JSON response."""
+        self.pacer.wait()
+        headers = dict(self.headers)
+        if body is not None:
+            headers["Content-Type"] = content_type
+        start = time.perf_counter()
+        try:
+            self.connection.request(
+                method, f"{self.prefix}/api{path}", body=body, headers=headers
+            )
+            response = self.connection.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, HTTPException):
+            self.connection.close()
+            self.stats.add(name, time.perf_counter() - start, error=True)
+            return None
+        self.stats.add(name, time.perf_counter() - start, error=status >= 400)
+        if status >= 400 or not data:
+            return None
+        if response.getheader("Content-Type", "").startswith("application/json"):
+            return json.loads(data)
+        return None
+
+    def login(self, username: str, password: str) -> None:
+        """Get an access token."""
+        body = json.dumps({"username": username, "password": password}).encode()
+        result = self.request("POST", "/token/", "POST /token/", body=body)
+        if not result:
+            raise RuntimeError("Login failed")
+        self.headers = {"Authorization": f"Bearer {result['access_token']}"}
+
+    def run(self, deadline: float) -> None:
+        """Run random scenarios until the deadline."""
+        functions, weights = zip(*self.scenarios)
+        while time.monotonic() < deadline:
+            self.rng.choices(functions, weights)[0]()
+        self.connection.close()
+
+    def home(self) -> None:
+        """Open the home page."""
+        self.request("GET", "/metadata/", "GET /metadata/")
+        handle = self.samples["home_person"]
+        self.request(
+            "GET",
+            f"/people/{handle}?profile=all&locale=en",
+            "GET /people/<h>?profile=all",
+        )
+        self.request(
+            "GET",
+            "/transactions/history/?pagesize=10&page=1&sort=-id",
+            "GET /transactions/history/",
+        )
+
+    def person_view(self) -> None:
+        """Open the page of a person."""
+        handle = self.rng.choice(self.samples["people"])
+        person = self.request(
+            "GET",
+            f"/people/{handle}?backlinks=true&extend=all&profile=all&locale=en",
+            "GET /people/<h>?extend",
+        )
+        self.request(
+            "GET",
+            f"/people/{handle}/timeline?ratings=true&locale=en",
+            "GET /people/<h>/timeline",
+        )
+        if person and person["media_list"]:
+            media_handle = person["media_list"][0]["ref"]
+            self.request(
+                "GET",
+                f"/media/{media_handle}/thumbnail/200?square=true",
+                "GET /media/<h>/thumbnail",
+            )
+
+    def search(self) -> None:
+        """Search for a surname and open a result."""
+        query = self.rng.choice(self.samples["surnames"])
+        result = self.request(
+            "GET",
+            f"/search/?query={query}&locale=en&profile=all&page=1&pagesize=20",
+            "GET /search/",
+        )
+        people = [hit for hit in result or [] if hit["object_type"] == "person"]
+        if people:
+            self.request(
+                "GET",
+                f"/people/{people[0]['handle']}?profile=self&locale=en",
+                "GET /people/<h>?profile=self",
+            )
+
+    def edit_person(self) -> None:
+        """Change the call name of a person."""
+        handle = self.rng.choice(self.samples["people"])
+        person = self.request("GET", f"/people/{handle}", "GET /people/<h>")
+        if not person:
+            return
+        person["primary_name"]["call"] = f"Call{self.rng.randrange(1000)}"
+        self.request(
+            "PUT",
+            f"/people/{handle}",
+            "PUT /people/<h>",
+            body=json.dumps(person).encode(),
+        )
+
+    def upload_media(self) -> None:
+        """Upload a new image."""
+        color = tuple(self.rng.randrange(256) for _ in range(3))
+        buffer = io.BytesIO()
+        Image.new("RGB", (640, 480), color).save(buffer, format="JPEG")
+        result = self.request(
+            "POST",
+            "/media/",
+            "POST /media/",
+            body=buffer.getvalue(),
+            content_type="image/jpeg",
+        )
+        if result:
+            self.request(
+                "GET",
+                f"/media/{result[0]['handle']}/thumbnail/200?square=true",
+                "GET /media/<h>/thumbnail",
+            )
+
+
+def get_samples(url: str, username: str, password: str) -> Dict:
+    """Get the handles and surnames used by the scenarios."""
+    user = User(url, Stats(), Pacer(0), {}, seed=0)
+    user.login(username, password)
+    people = user.request(
+        "GET", "/people/?keys=handle,primary_name&pagesize=1000", "samples"
+    )
+    if not people:
+        raise RuntimeError("The tree does not contain any people")
+    surnames = {
+        surname["surname"]
+        for person in people
+        for surname in person["primary_name"]["surname_list"]
+        if surname["surname"]
+    }
+    return {
+        "home_person": people[0]["handle"],
+        "people": [person["handle"] for person in people],
+        "surnames": sorted(surnames),
+    }
+
+
+def start_local_server(args, stack: ExitStack) -> str:
+    """Start the API on a synthetic tree and return its URL."""
+    base_dir = stack.enter_context(tempfile.TemporaryDirectory())
+    # must be set before Gramps is imported
+    os.environ["GRAMPSHOME"] = base_dir
+
+    import waitress
+
+    from gramps_webapi.api.media import MediaHandler
+    from gramps_webapi.app import create_app
+    from gramps_webapi.auth import add_user, user_db
+    from gramps_webapi.auth.const import ROLE_OWNER
+    from gramps_webapi.dbmanager import WebDbManager
+    from gramps_webapi.synthetic import generate_tree
+
+    media_dir = os.path.join(base_dir, "media")
+    if args.s3:
+        import boto3
+        from moto import mock_s3
+
+        stack.enter_context(mock_s3())
+        boto3.resource("s3", region_name="us-east-1").create_bucket(Bucket=S3_BUCKET)
+        media_base_dir = f"s3://{S3_BUCKET}"
+    else:
+        media_base_dir = media_dir
+    cache_type = "NullCache" if args.no_cache else "FileSystemCache"
+    config = {
+        "TREE": TREE_NAME,
+        "SECRET_KEY": "load-test",
+        "USER_DB_URI": f"sqlite:///{base_dir}/users.sqlite",
+        "RATELIMIT_ENABLED": False,
+        "MEDIA_BASE_DIR": media_base_dir,
+        "THUMBNAIL_STORE_DIR": os.path.join(base_dir, "thumbnail_store"),
+        "S3_ORIGINAL_CACHE_DIR": os.path.join(base_dir, "s3_original_cache"),
+        "REPORT_DIR": os.path.join(base_dir, "report_cache"),
+        "EXPORT_DIR": os.path.join(base_dir, "export_cache"),
+        "REQUEST_CACHE_CONFIG": {
+            "CACHE_TYPE": cache_type,
+            "CACHE_DIR": os.path.join(base_dir, "request_cache"),
+        },
+        "MEDIA_RESULT_CACHE_CONFIG": {
+            "CACHE_TYPE": cache_type,
+            "CACHE_DIR": os.path.join(base_dir, "media_result_cache"),
+        },
+    }
+    if args.celery:
+        config["CELERY_CONFIG"] = {
+            "broker_url": "memory://",
+            "result_backend": "cache+memory://",
+        }
+    app = create_app(config=config)
+    db_manager = WebDbManager(name=TREE_NAME)
+    with app.app_context():
+        user_db.create_all()
+        add_user(
+            name=USERNAME, password=PASSWORD, role=ROLE_OWNER, tree=db_manager.dirname
+        )
+    print(f"Generating a tree with {args.people} people ...")
+    db_handle = db_manager.get_db(readonly=False).db
+    try:
+        generate_tree(db_handle, args.people, seed=args.seed, media_dir=media_dir)
+        if args.s3:
+            media_handler = MediaHandler(media_base_dir)
+            for media in db_handle.iter_media():
+                with open(os.path.join(media_dir, media.get_path()), "rb") as f:
+                    media_handler.upload_file(f, media.checksum, media.mime)
+    finally:
+        db_handle.close()
+    with app.app_context():
+        from gramps_webapi.api.search import get_search_indexer
+
+        db_handle = db_manager.get_db().db
+        try:
+            get_search_indexer(db_manager.dirname).reindex_full(db_handle)
+        finally:
+            db_handle.close()
+    if args.celery:
+        from celery import current_app as current_celery_app
+        from celery.contrib.testing.worker import start_worker
+
+        stack.enter_context(
+            start_worker(
+                current_celery_app,
+                pool="threads",
+                concurrency=2,
+                perform_ping_check=False,
+                loglevel="WARNING",
+            )
+        )
+    server = waitress.create_server(app, host="127.0.0.1", port=0, threads=args.threads)
+    threading.Thread(target=server.run, daemon=True).start()
+    stack.callback(server.close)
+    return f"http://127.0.0.1:{server.effective_port}"
+
+
+def run_load_test(url: str, args) -> List[Dict[str, Any]]:
+    """Run the scenarios with all users and report the statistics."""
+    samples = get_samples(url, args.username, args.password)
+    users = [
+        User(url, Stats(), Pacer(0), samples, seed=args.seed + i)
+        for i in range(args.users)
+    ]
+    # logging in is not part of the measurement
+    stats = Stats()
+    pacer = Pacer(args.rps)
+    for user in users:
+        user.login(args.username, args.password)
+        user.stats = stats
+        user.pacer = pacer
+    print(
+        f"Running {args.users} users at {args.rps or 'unlimited'} requests/s "
+        f"for {args.duration} s ..."
+    )
+    start = time.monotonic()
+    deadline = start + args.duration
+    threads = [threading.Thread(target=user.run, args=(deadline,)) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats.report(time.monotonic() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the API")
+    parser.add_argument("--url", help="URL of a running server to test")
+    parser.add_argument("--username", default=USERNAME, help="User with --url")
+    parser.add_argument("--password", default=PASSWORD, help="Password with --url")
+    parser.add_argument(
+        "--people", type=int, default=10000, help="People in the synthetic tree"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--threads", type=int, default=8, help="Threads of the local server"
+    )
+    parser.add_argument("--celery", action="store_true", help="Run tasks in a worker")
+    parser.add_argument("--s3", action="store_true", help="Store media in mocked S3")
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Disable the request caches"
+    )
+    parser.add_argument("--users", type=int, default=10, help="Concurrent users")
+    parser.add_argument(
+        "--rps", type=float, default=20, help="Target requests/s (0: unlimited)"
+    )
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to run")
+    parser.add_argument("--json", help="File to write the statistics to")
+    args = parser.parse_args()
+    with ExitStack() as stack:
+        url = args.url or start_local_server(args, stack)
+        rows = run_load_test(url, args)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
@@ -0,0 +1,115 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Tests for the JSON access log."""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from gramps.cli.clidbman import CLIDbManager
+from gramps.gen.dbstate import DbState
+
+from gramps_webapi.api.access_log import stop_access_log
+from gramps_webapi.app import create_app
+from gramps_webapi.auth import add_user, user_db
+from gramps_webapi.auth.const import ROLE_OWNER
+from gramps_webapi.const import ENV_CONFIG_FILE, TEST_AUTH_CONFIG
+
+
+class TestAccessLog(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.name = "Test Web API"
+        cls.dbman = CLIDbManager(DbState())
+        dbpath, _name = cls.dbman.create_new_db_cli(cls.name, dbid="sqlite")
+        cls.tree = os.path.basename(dbpath)
+        cls.log_file = tempfile.NamedTemporaryFile(delete=False)
+        with patch.dict("os.environ", {ENV_CONFIG_FILE: TEST_AUTH_CONFIG}):
+            cls.app = create_app(
+                config={
+                    "TESTING": True,
+                    "RATELIMIT_ENABLED": False,
+                    "ACCESS_LOG": True,
+                    "ACCESS_LOG_FILE": cls.log_file.name,
+                    "ACCESS_LOG_SAMPLE_RATES": {},
+                }
+            )
+            cls.client = cls.app.test_client()
+        with cls.app.app_context():
+            user_db.create_all()
+            add_user(name="owner", password="123", role=ROLE_OWNER, tree=cls.tree)
+        rv = cls.client.post(
+            "/api/token/", json={"username": "owner", "password": "123"}
+        )
+        cls.headers = {"Authorization": f"Bearer {rv.json['access_token']}"}
+
+    @classmethod
+    def tearDownClass(cls):
+        stop_access_log()
+        cls.dbman.remove_database(cls.name)
+        os.remove(cls.log_file.name)
+
+    def get_entries(self):
+        """Write the pending records and return all entries."""
+        stop_access_log()
+        with open(self.log_file.name, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def get(self, url, headers=None):
+        """Make a request and close the response."""
+        rv = self.client.get(url, headers=headers)
+        rv.close()
+        return rv
+
+    def test_entry(self):
+        rv = self.get("/api/metadata/?locale=de", headers=self.headers)
+        assert rv.status_code == 200
+        entry = self.get_entries()[-1]
+        assert entry["method"] == "GET"
+        assert entry["path"] == "/api/metadata/"
+        assert entry["endpoint"] == "api.metadata"
+        assert entry["status"] == 200
+        assert entry["tree"] == self.tree
+        assert entry["user"]
+        assert entry["duration_ms"] > 0
+        assert isinstance(entry["cache"], dict)
+        assert "sample_rate" not in entry
+        assert "time" in entry
+
+    def test_sampling(self):
+        sample_rates = self.app.config["ACCESS_LOG_SAMPLE_RATES"]
+        sample_rates["api.metadata"] = 0
+        try:
+            count = len(self.get_entries())
+            rv = self.get("/api/metadata/", headers=self.headers)
+            assert rv.status_code == 200
+            assert len(self.get_entries()) == count
+            # errors are always logged
+            rv = self.get("/api/metadata/")
+            assert rv.status_code == 401
+            entries = self.get_entries()
+            assert len(entries) == count + 1
+            assert entries[-1]["status"] == 401
+            assert entries[-1]["sample_rate"] == 0
+            assert entries[-1]["user"] is None
+        finally:
+            del sample_rates["api.metadata"]
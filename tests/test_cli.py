@@ -195,3 +195,32 @@ USER_DB_URI="sqlite:///{cls.user_db.name}"
             ],
         )
         assert result.exit_code == 0
+
+    def test_grampsdb_generate(self):
+        tree = WebDbManager(name=self.name).dirname
+        with tempfile.TemporaryDirectory() as media_dir:
+            result = self.runner.invoke(
+                cli,
+                [
+                    "--config",
+                    self.config_file.name,
+                    "grampsdb",
+                    "--tree",
+                    tree,
+                    "generate",
+                    "--people",
+                    "200",
+                    "--media-dir",
+                    media_dir,
+                ],
+            )
+            assert result.exit_code == 0
+            dbstate = WebDbManager(name=self.name).get_db()
+            try:
+                db_handle = dbstate.db
+                assert db_handle.get_number_of_people() == 200
+                assert db_handle.get_number_of_families() > 0
+                for media in db_handle.iter_media():
+                    assert os.path.isfile(os.path.join(media_dir, media.get_path()))
+            finally:
+                dbstate.db.close()
@@ -20,14 +20,21 @@
 """Tests for the file and thumbnail endpoints using example_gramps."""
 
 import unittest
+from base64 import b64decode
 from io import BytesIO
+from unittest.mock import patch
+from urllib.parse import quote
 
 from PIL import Image
 
-from gramps_webapi.const import MIME_JPEG
+from gramps_webapi.api.cache import make_cache_key_faces, media_result_cache
+from gramps_webapi.app import create_app
+from gramps_webapi.auth.const import ROLE_GUEST
+from gramps_webapi.const import ENV_CONFIG_FILE, MIME_JPEG, TEST_AUTH_CONFIG
 
 from . import BASE_URL, get_test_client
 from .checks import check_requires_token, check_success
+from .util import fetch_header
 
 TEST_URL = BASE_URL + "/media/"
 
@@ -54,6 +61,57 @@ class TestFile(unittest.TestCase):
             )
             assert rv.mimetype == obj["mime"]
 
+    def test_get_file_range(self):
+        """Test range and conditional requests for files."""
+        media_objects = check_success(self, TEST_URL)
+        obj = media_objects[0]
+        url = "{}{}/file".format(TEST_URL, obj["handle"])
+        headers = fetch_header(self.client)
+        rv = self.client.get(url, headers=headers)
+        assert rv.status_code == 200
+        assert rv.headers["Accept-Ranges"] == "bytes"
+        assert rv.headers["ETag"] == f'"{obj["checksum"]}"'
+        content = rv.data
+        rv = self.client.get(url, headers={**headers, "Range": "bytes=10-19"})
+        assert rv.status_code == 206
+        assert rv.data == content[10:20]
+        assert rv.headers["Content-Range"] == f"bytes 10-19/{len(content)}"
+        rv = self.client.get(
+            url, headers={**headers, "If-None-Match": f'"{obj["checksum"]}"'}
+        )
+        assert rv.status_code == 304
+
+    def test_get_file_sendfile(self):
+        """Test offloading sending files to the web server."""
+        media_objects = check_success(self, TEST_URL)
+        obj = media_objects[0]
+        url = "{}{}/file".format(TEST_URL, obj["handle"])
+        headers = fetch_header(self.client)
+        config = self.client.application.config
+        try:
+            config["MEDIA_SENDFILE_MODE"] = "x-accel-redirect"
+            rv = self.client.get(url, headers=headers)
+            assert rv.status_code == 200
+            assert rv.data == b""
+            assert rv.mimetype == obj["mime"]
+            assert rv.headers["X-Accel-Redirect"] == quote(
+                "/internal-media/" + obj["path"]
+            )
+            config["MEDIA_SENDFILE_MODE"] = "x-sendfile"
+            rv = self.client.get(url + "?download=1", headers=headers)
+            assert rv.status_code == 200
+            assert rv.data == b""
+            assert rv.headers["X-Sendfile"].endswith(obj["path"])
+            assert rv.headers["Content-Disposition"].startswith("attachment")
+        finally:
+            config["MEDIA_SENDFILE_MODE"] = ""
+
+    def test_invalid_sendfile_mode(self):
+        """Test that an unknown sendfile mode is rejected at startup."""
+        with patch.dict("os.environ", {ENV_CONFIG_FILE: TEST_AUTH_CONFIG}):
+            with self.assertRaises(ValueError):
+                create_app(config={"MEDIA_SENDFILE_MODE": "nginx"})
+
 
 class TestThumbnail(unittest.TestCase):
     """Test cases for the /api/media/{}/thumbnail endpoint."""
@@ -269,3 +327,105 @@ class TestFaceDetection(unittest.TestCase):
         assert 20 < y2 < 60
         assert x2 > x1
         assert y2 > y1
+
+    def test_detect_faces_all(self):
+        """Test face detection on all media files."""
+        header = fetch_header(self.client, role=ROLE_GUEST)
+        rv = self.client.post(TEST_URL + "face_detection/", headers=header)
+        assert rv.status_code == 403
+        header = fetch_header(self.client)
+        rv = self.client.post(TEST_URL + "face_detection/", headers=header)
+        assert rv.status_code == 201
+        rv = check_success(self, f"{TEST_URL}F8JYGQFL2PKLSYH79X", full=True)
+        key = make_cache_key_faces(rv.json["checksum"])
+        with self.client.application.app_context():
+            faces = media_result_cache.get(key)
+        assert len(faces) == 1
+
+
+class TestRegions(unittest.TestCase):
+    """Test cases for the /api/media/regions/ endpoint."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Test class setup."""
+        cls.client = get_test_client()
+
+    def _get_payload(self, fmt):
+        media_objects = check_success(self, TEST_URL)
+        regions = []
+        for obj in media_objects:
+            regions.append(
+                {"handle": obj["handle"], "x1": 10, "y1": 10, "x2": 90, "y2": 90}
+            )
+            regions.append(
+                {
+                    "handle": obj["handle"],
+                    "x1": 0,
+                    "y1": 0,
+                    "x2": 50,
+                    "y2": 50,
+                    "size": 20,
+                    "square": True,
+                }
+            )
+        return {"regions": regions, "format": fmt}
+
+    def test_regions_requires_token(self):
+        """Test authorization required."""
+        payload = self._get_payload("sprite")
+        rv = self.client.post(TEST_URL + "regions/", json=payload)
+        assert rv.status_code == 401
+
+    def test_regions_not_found(self):
+        """Test unknown media handle."""
+        header = fetch_header(self.client)
+        payload = {"regions": [{"handle": "nope", "x1": 0, "y1": 0, "x2": 9, "y2": 9}]}
+        rv = self.client.post(TEST_URL + "regions/", json=payload, headers=header)
+        assert rv.status_code == 404
+
+    def test_regions_invalid(self):
+        """Test inverted boxes and too large sizes."""
+        header = fetch_header(self.client)
+        handle = check_success(self, TEST_URL)[0]["handle"]
+        for region in [
+            {"x1": 50, "y1": 0, "x2": 10, "y2": 50},
+            {"x1": 0, "y1": 50, "x2": 50, "y2": 50},
+            {"x1": 0, "y1": 0, "x2": 50, "y2": 50, "size": 10000},
+        ]:
+            payload = {"regions": [{"handle": handle, **region}]}
+            rv = self.client.post(TEST_URL + "regions/", json=payload, headers=header)
+            assert rv.status_code == 422
+
+    def test_regions_sprite(self):
+        """Test sprite sheet response."""
+        header = fetch_header(self.client)
+        payload = self._get_payload("sprite")
+        rv = self.client.post(TEST_URL + "regions/", json=payload, headers=header)
+        assert rv.status_code == 200
+        assert len(rv.json["regions"]) == len(payload["regions"])
+        prefix = "data:image/jpeg;base64,"
+        assert rv.json["image"].startswith(prefix)
+        sprite = Image.open(BytesIO(b64decode(rv.json["image"][len(prefix) :])))
+        for region in rv.json["regions"]:
+            assert region["left"] + region["width"] <= sprite.width
+            assert region["top"] + region["height"] <= sprite.height
+            if region["square"]:
+                assert region["width"] == region["height"] == 20
+            else:
+                assert max(region["width"], region["height"]) <= 200
+
+    def test_regions_multipart(self):
+        """Test multipart response."""
+        header = fetch_header(self.client)
+        payload = self._get_payload("multipart")
+        rv = self.client.post(TEST_URL + "regions/", json=payload, headers=header)
+        assert rv.status_code == 200
+        assert rv.mimetype == "multipart/mixed"
+        boundary = rv.mimetype_params["boundary"].encode()
+        parts = rv.data.split(b"--" + boundary)[1:-1]
+        assert len(parts) == len(payload["regions"])
+        for part in parts:
+            _, body = part.split(b"\r\n\r\n", 1)
+            img = Image.open(BytesIO(body[:-2]))
+            assert img.format == "JPEG"
@@ -20,6 +20,8 @@
 """Tests for the file and thumbnail endpoints using example_gramps."""
 
 import unittest
+import zipfile
+from io import BytesIO
 
 from gramps_webapi.auth.const import ROLE_EDITOR, ROLE_OWNER
 
@@ -50,3 +52,35 @@ class TestMediaArchiv(unittest.TestCase):
         assert "url" in rv.json
         rv = self.client.get(rv.json["url"], headers=headers)
         assert rv.status_code == 200
+
+    def test_stream_archive(self):
+        """Stream a media file archive."""
+        headers = fetch_header(self.client, role=ROLE_EDITOR)
+        rv = self.client.post(TEST_URL, headers=headers)
+        assert rv.status_code == 201
+        rv = self.client.get(rv.json["url"], headers=headers)
+        assert rv.status_code == 200
+        with zipfile.ZipFile(BytesIO(rv.data)) as zip_file:
+            names = zip_file.namelist()
+        assert len(names) > 0
+        rv = self.client.post(f"{TEST_URL}?stream=1", headers=headers)
+        assert rv.status_code == 200
+        assert rv.mimetype == "application/zip"
+        with zipfile.ZipFile(BytesIO(rv.data)) as zip_file:
+            assert zip_file.testzip() is None
+            assert sorted(zip_file.namelist()) == sorted(names)
+            for info in zip_file.infolist():
+                if info.filename.lower().endswith(".jpg"):
+                    assert info.compress_type == zipfile.ZIP_STORED
+
+    def test_archive_since(self):
+        """Create a media file archive with changed files only."""
+        headers = fetch_header(self.client, role=ROLE_EDITOR)
+        rv = self.client.post(f"{TEST_URL}?stream=1&since=4102444800", headers=headers)
+        assert rv.status_code == 200
+        with zipfile.ZipFile(BytesIO(rv.data)) as zip_file:
+            assert zip_file.namelist() == []
+        rv = self.client.post(f"{TEST_URL}?stream=1&since=0", headers=headers)
+        assert rv.status_code == 200
+        with zipfile.ZipFile(BytesIO(rv.data)) as zip_file:
+            assert len(zip_file.namelist()) > 0
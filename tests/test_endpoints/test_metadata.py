@@ -20,9 +20,12 @@
 """Tests for the /api/metadata endpoint using example_gramps."""
 
 import unittest
+from unittest.mock import patch
+
+from gramps_webapi.api.capabilities import clear_capabilities_cache
 
 from . import BASE_URL, get_test_client
-from .checks import check_conforms_to_schema, check_requires_token
+from .checks import check_conforms_to_schema, check_requires_token, check_success
 
 TEST_URL = BASE_URL + "/metadata/"
 
@@ -48,3 +51,24 @@ class TestMetadata(unittest.TestCase):
         assert "version" in res["search"]["sifts"]
         assert "count" in res["search"]["sifts"]
         assert res["search"]["sifts"]["count"] > 1
+
+    def test_get_metadata_cached_capabilities(self):
+        """Test that the OCR capabilities are only probed once."""
+        clear_capabilities_cache()
+        with patch(
+            "pytesseract.get_tesseract_version", return_value="5.0.0"
+        ) as get_version:
+            with patch(
+                "pytesseract.get_languages", return_value=["eng", "osd"]
+            ) as get_languages:
+                for _ in range(3):
+                    res = check_success(self, TEST_URL)
+                    assert res["server"]["ocr"]
+                    assert res["server"]["ocr_languages"] == ["eng"]
+        assert get_version.call_count == 1
+        assert get_languages.call_count == 1
+        clear_capabilities_cache()
+        first = check_success(self, TEST_URL)
+        second = check_success(self, TEST_URL)
+        assert first["object_counts"] == second["object_counts"]
+        assert first["object_counts"]["people"] > 0
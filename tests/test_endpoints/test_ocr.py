@@ -136,3 +136,21 @@ class TestOcr(unittest.TestCase):
         )
         assert rv.status_code == 201
         assert "<?xml" in rv.text
+
+        # run OCR again - cached
+        rv = self.client.post(f"{TEST_URL}{handle}/ocr?lang=eng", headers=headers)
+        assert rv.status_code == 201
+        assert "OCR Demo" in rv.text
+
+        # run OCR on all media - guest not allowed
+        rv = self.client.post(
+            "/api/token/", json={"username": "user", "password": "123"}
+        )
+        headers_guest = {"Authorization": f"Bearer {rv.json['access_token']}"}
+        rv = self.client.post(f"{TEST_URL}ocr/?lang=eng", headers=headers_guest)
+        assert rv.status_code == 403
+
+        # run OCR on all media - already recognized
+        rv = self.client.post(f"{TEST_URL}ocr/?lang=eng", headers=headers)
+        assert rv.status_code == 201
+        assert rv.json == {"recognized": 0, "failures": 0}
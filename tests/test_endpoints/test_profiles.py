@@ -0,0 +1,98 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Tests for profiling requests on demand."""
+
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from gramps_webapi.auth.const import ROLE_MEMBER, ROLE_OWNER
+
+from . import BASE_URL, get_test_client
+from .util import fetch_header
+
+TEST_URL = BASE_URL + "/people/?extend=all&pagesize=5"
+
+
+class TestProfiles(unittest.TestCase):
+    """Test cases for the /api/profiles/ endpoint."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Test class setup."""
+        cls.client = get_test_client()
+        cls.profile_dir = tempfile.mkdtemp()
+        cls.client.application.config["PROFILE_DIR"] = cls.profile_dir
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.profile_dir)
+
+    def test_profile_download(self):
+        """Test profiling a request and downloading the profile."""
+        headers = fetch_header(self.client, ROLE_OWNER)
+        rv = self.client.get(TEST_URL, headers={**headers, "X-Profile": "1"})
+        assert rv.status_code == 200
+        profile_id = rv.headers["X-Profile-Id"]
+        rv = self.client.get(f"{BASE_URL}/profiles/{profile_id}", headers=headers)
+        assert rv.status_code == 200
+        path = os.path.join(self.profile_dir, "stats.prof")
+        with open(path, "wb") as f:
+            f.write(rv.data)
+        stats = pstats.Stats(path)
+        assert stats.total_calls > 0
+
+    def test_profile_header(self):
+        """Test profiling a request with the header and a request ID."""
+        headers = fetch_header(self.client, ROLE_OWNER)
+        rv = self.client.get(
+            TEST_URL, headers={**headers, "X-Profile": "1", "X-Request-Id": "abc-123"}
+        )
+        assert rv.status_code == 200
+        assert rv.headers["X-Profile-Id"] == "abc-123"
+        rv = self.client.get(f"{BASE_URL}/profiles/abc-123", headers=headers)
+        assert rv.status_code == 200
+
+    def test_profile_requires_permission(self):
+        """Test that requests of users without permission are not profiled."""
+        headers = fetch_header(self.client, ROLE_MEMBER)
+        rv = self.client.get(TEST_URL, headers={**headers, "X-Profile": "1"})
+        assert rv.status_code == 200
+        assert "X-Profile-Id" not in rv.headers
+        rv = self.client.get(f"{BASE_URL}/profiles/abc-123", headers=headers)
+        assert rv.status_code == 403
+
+    def test_profile_query_arg_unchanged(self):
+        """Test that the profile query argument still returns profiles."""
+        headers = fetch_header(self.client, ROLE_OWNER)
+        rv = self.client.get(TEST_URL + "&profile=all", headers=headers)
+        assert rv.status_code == 200
+        assert "X-Profile-Id" not in rv.headers
+        assert all("profile" in person for person in rv.json)
+
+    def test_profile_not_found(self):
+        """Test invalid and missing profiles."""
+        headers = fetch_header(self.client, ROLE_OWNER)
+        rv = self.client.get(f"{BASE_URL}/profiles/missing", headers=headers)
+        assert rv.status_code == 404
+        rv = self.client.get(f"{BASE_URL}/profiles/in.valid", headers=headers)
+        assert rv.status_code == 422
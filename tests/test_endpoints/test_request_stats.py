@@ -0,0 +1,75 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Tests for the statistics of database calls per request."""
+
+import json
+import unittest
+
+from gramps_webapi.auth.const import ROLE_ADMIN, ROLE_OWNER
+
+from . import BASE_URL, get_test_client
+from .util import fetch_header
+
+TEST_URL = BASE_URL + "/people/?extend=all&pagesize=5"
+
+
+class TestRequestStats(unittest.TestCase):
+    """Test cases for the request statistics."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Test class setup."""
+        cls.client = get_test_client()
+
+    def tearDown(self):
+        self.client.application.config["SLOW_REQUEST_THRESHOLD"] = 0
+
+    def test_server_timing_admin(self):
+        """Test the Server-Timing header for admins."""
+        rv = self.client.get(TEST_URL, headers=fetch_header(self.client, ROLE_ADMIN))
+        assert rv.status_code == 200
+        server_timing = rv.headers["Server-Timing"]
+        assert server_timing.startswith("db;dur=")
+        assert "serialize;dur=" in server_timing
+        assert "total;dur=" in server_timing
+        calls = int(server_timing.split('desc="')[1].split(" ")[0])
+        assert calls > 0
+
+    def test_server_timing_owner(self):
+        """Test that the Server-Timing header is only sent to admins."""
+        rv = self.client.get(TEST_URL, headers=fetch_header(self.client, ROLE_OWNER))
+        assert rv.status_code == 200
+        assert "Server-Timing" not in rv.headers
+
+    def test_slow_request_log(self):
+        """Test the breakdown logged for slow requests."""
+        self.client.application.config["SLOW_REQUEST_THRESHOLD"] = 1e-9
+        headers = fetch_header(self.client, ROLE_OWNER)
+        with self.assertLogs(self.client.application.logger, "WARNING") as logs:
+            rv = self.client.get(TEST_URL, headers=headers)
+        assert rv.status_code == 200
+        message = logs.records[-1].getMessage()
+        assert message.startswith("Slow request: ")
+        breakdown = json.loads(message[len("Slow request: ") :])
+        assert breakdown["endpoint"] == "api.people"
+        assert breakdown["status"] == 200
+        assert breakdown["db"]["calls"] > 0
+        assert "get_person_from_handle" in breakdown["db"]["methods"]
+        assert "serialize" in breakdown["timings_ms"]
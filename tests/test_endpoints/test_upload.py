@@ -246,12 +246,19 @@ class TestUploadWithQuota(unittest.TestCase):
             "/api/media/", data=img.read(), headers=headers, content_type="image/jpeg"
         )
         self.assertEqual(rv.status_code, 201)
+        handle2 = rv.json[0]["handle"]
         rv = self.client.get("/api/trees/-", headers=headers)
         self.assertEqual(rv.status_code, 200)
         assert rv.json["usage_media"] == size + size2
         assert rv.json["quota_media"] == size + size2
-        img, checksum, size = get_image(2)
+        img, checksum, size3 = get_image(2)
         rv = self.client.post(
             "/api/media/", data=img.read(), headers=headers, content_type="image/jpeg"
         )
         assert rv.status_code == 405
+        # deleting a media object frees its space
+        rv = self.client.delete(f"/api/media/{handle2}", headers=headers)
+        self.assertEqual(rv.status_code, 200)
+        rv = self.client.get("/api/trees/-", headers=headers)
+        self.assertEqual(rv.status_code, 200)
+        assert rv.json["usage_media"] == size
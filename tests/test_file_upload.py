@@ -0,0 +1,84 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Tests for processing and storing uploaded files."""
+
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+
+import pytest
+
+from gramps_webapi.api.file import (
+    UPLOAD_SPOOL_SIZE,
+    process_file,
+    upload_file_local,
+)
+
+
+class FailingStream(BytesIO):
+    """Stream that fails after returning some data."""
+
+    def read(self, size=-1):
+        if self.tell() > 0:
+            raise IOError("Connection lost")
+        return super().read(10)
+
+
+def test_process_file_small():
+    data = os.urandom(1000)
+    checksum, size, fp = process_file(BytesIO(data))
+    assert checksum == hashlib.md5(data).hexdigest()
+    assert size == 1000
+    assert fp.read() == data
+    # small files stay in memory
+    assert not fp._rolled
+
+
+def test_process_file_large():
+    data = os.urandom(UPLOAD_SPOOL_SIZE + 1000)
+    checksum, size, fp = process_file(BytesIO(data))
+    assert checksum == hashlib.md5(data).hexdigest()
+    assert size == len(data)
+    # large files are spooled to disk
+    assert fp._rolled
+    assert fp.read() == data
+
+
+def test_upload_file_local():
+    with tempfile.TemporaryDirectory() as base_dir:
+        upload_file_local(base_dir, "sub/file.jpg", BytesIO(b"content"))
+        with open(os.path.join(base_dir, "sub", "file.jpg"), "rb") as f:
+            assert f.read() == b"content"
+        upload_file_local(base_dir, "sub/file.jpg", BytesIO(b"new content"))
+        with open(os.path.join(base_dir, "sub", "file.jpg"), "rb") as f:
+            assert f.read() == b"new content"
+        assert os.listdir(os.path.join(base_dir, "sub")) == ["file.jpg"]
+
+
+def test_upload_file_local_failure():
+    with tempfile.TemporaryDirectory() as base_dir:
+        upload_file_local(base_dir, "file.jpg", BytesIO(b"content"))
+        with pytest.raises(IOError):
+            upload_file_local(base_dir, "file.jpg", FailingStream(b"x" * 100))
+        # the existing file is left untouched and no temporary file remains
+        assert os.listdir(base_dir) == ["file.jpg"]
+        with open(os.path.join(base_dir, "file.jpg"), "rb") as f:
+            assert f.read() == b"content"
@@ -0,0 +1,91 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+"""Tests for the `gramps_webapi.api.identity_map` module."""
+
+import unittest
+
+from gramps.gen.db import DbTxn
+from gramps.gen.db.utils import make_database
+from gramps.gen.errors import HandleError
+from gramps.gen.lib import Event, Person
+
+from gramps_webapi.api.identity_map import IdentityMapProxy
+
+
+class TestIdentityMapProxy(unittest.TestCase):
+    """Test the identity map proxy database."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = make_database("sqlite")
+        cls.db.load(":memory:")
+        with DbTxn("Add test objects", cls.db) as trans:
+            cls.person_handle = cls.db.add_person(Person(), trans)
+            cls.event_handle = cls.db.add_event(Event(), trans)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+
+    def test_same_instance(self):
+        db_handle = IdentityMapProxy(self.db)
+        person = db_handle.get_person_from_handle(self.person_handle)
+        assert person.handle == self.person_handle
+        assert db_handle.get_person_from_handle(self.person_handle) is person
+        event = db_handle.method("get_%s_from_handle", "Event")(self.event_handle)
+        assert event is db_handle.get_event_from_handle(self.event_handle)
+
+    def test_stats(self):
+        db_handle = IdentityMapProxy(self.db)
+        assert db_handle.get_stats() == {}
+        for _ in range(3):
+            db_handle.get_person_from_handle(self.person_handle)
+        db_handle.get_event_from_handle(self.event_handle)
+        assert db_handle.get_stats() == {
+            "Event": {"hits": 0, "misses": 1},
+            "Person": {"hits": 2, "misses": 1},
+        }
+
+    def test_missing_handle(self):
+        db_handle = IdentityMapProxy(self.db)
+        with self.assertRaises(HandleError):
+            db_handle.get_person_from_handle("does_not_exist")
+        with self.assertRaises(HandleError):
+            db_handle.get_person_from_handle("does_not_exist")
+        assert db_handle.get_stats()["Person"] == {"hits": 0, "misses": 2}
+
+    def test_prefetch(self):
+        db_handle = IdentityMapProxy(self.db)
+        people = db_handle.prefetch(
+            "Person", [self.person_handle, "does_not_exist", self.person_handle, None]
+        )
+        assert len(people) == 1
+        assert people[0].handle == self.person_handle
+        assert db_handle.get_person_from_handle(self.person_handle) is people[0]
+        assert db_handle.get_stats()["Person"] == {"hits": 1, "misses": 2}
+        with self.assertRaises(HandleError):
+            db_handle.get_person_from_handle("does_not_exist")
+
+    def test_prefetch_cached(self):
+        db_handle = IdentityMapProxy(self.db)
+        event = db_handle.get_event_from_handle(self.event_handle)
+        assert db_handle.prefetch("Event", [self.event_handle]) == [event]
+        assert db_handle.get_stats()["Event"] == {"hits": 0, "misses": 1}
@@ -0,0 +1,114 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Tests for the `gramps_webapi.api.image` module."""
+
+import io
+import unittest
+
+from PIL import Image
+
+from gramps_webapi.api.image import (
+    CropRegion,
+    ThumbnailHandler,
+    image_draft,
+    image_sprite,
+)
+
+
+def make_image_buffer(size, fmt, orientation=None) -> io.BytesIO:
+    """Make an image buffer, optionally with EXIF orientation."""
+    image = Image.new("RGB", size, (200, 10, 10))
+    exif = image.getexif()
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, exif=exif.tobytes())
+    buffer.seek(0)
+    return buffer
+
+
+class TestImageDraft(unittest.TestCase):
+    """Test reduced-resolution decoding."""
+
+    def test_jpeg(self):
+        image = Image.open(make_image_buffer((4000, 3000), "JPEG"))
+        image = image_draft(image, (256, 256))
+        assert image.size == (500, 375)
+
+    def test_mpo(self):
+        image = Image.new("RGB", (4000, 3000), (200, 10, 10))
+        buffer = io.BytesIO()
+        image.save(buffer, format="MPO", save_all=True, append_images=[image])
+        buffer.seek(0)
+        image = image_draft(Image.open(buffer), (256, 256))
+        assert image.size == (500, 375)
+
+    def test_png(self):
+        image = Image.open(make_image_buffer((4000, 3000), "PNG"))
+        image = image_draft(image, (256, 256))
+        assert image.size == (364, 273)
+
+    def test_small(self):
+        image = Image.open(make_image_buffer((300, 200), "PNG"))
+        assert image_draft(image, (256, 256)).size == (300, 200)
+
+    def test_thumbnail_orientation(self):
+        buffer = make_image_buffer((4000, 3000), "JPEG", orientation=6)
+        thumb = ThumbnailHandler(buffer, "image/jpeg")
+        image = Image.open(thumb.get_thumbnail(size=200))
+        assert image.size == (150, 200)
+        buffer.seek(0)
+        thumb = ThumbnailHandler(buffer, "image/jpeg")
+        image = Image.open(thumb.get_thumbnail(size=200, square=True))
+        assert image.size == (200, 200)
+
+    def test_thumbnail_cropped(self):
+        buffer = make_image_buffer((4000, 3000), "JPEG")
+        thumb = ThumbnailHandler(buffer, "image/jpeg")
+        image = Image.open(thumb.get_thumbnail_cropped(200, 0, 0, 10, 10))
+        assert image.size == (200, 150)
+
+
+class TestRegions(unittest.TestCase):
+    """Test cropping several regions from a single decode."""
+
+    def test_get_regions(self):
+        buffer = make_image_buffer((4000, 3000), "JPEG")
+        thumb = ThumbnailHandler(buffer, "image/jpeg")
+        images = thumb.get_regions(
+            [
+                CropRegion(0, 0, 10, 10, size=200),
+                CropRegion(50, 50, 60, 60, size=100, square=True),
+                CropRegion(0, 0, 50, 50),
+            ]
+        )
+        assert images[0].size == (200, 150)
+        assert images[1].size == (100, 100)
+        # full resolution if no size is given
+        assert images[2].size == (2000, 1500)
+
+    def test_sprite(self):
+        images = [Image.new("RGB", (20, 10)) for _ in range(4)]
+        images.append(Image.new("L", (10, 20)))
+        sprite, boxes = image_sprite(images)
+        assert sprite.size == (60, 40)
+        assert boxes[0] == (0, 0, 20, 10)
+        assert boxes[3] == (0, 20, 20, 10)
+        assert boxes[4] == (20, 20, 10, 20)
@@ -0,0 +1,76 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Tests for the time needed to import the app factory."""
+
+import subprocess
+import sys
+
+# maximum cumulative time in seconds to import the app factory module
+IMPORT_TIME_BUDGET = 5.0
+
+# optional dependencies that must only be imported when they are used
+LAZY_MODULES = [
+    "cv2",
+    "ffmpeg",
+    "openai",
+    "pdf2image",
+    "pytesseract",
+    "sentence_transformers",
+]
+
+
+def get_import_times(module: str) -> dict[str, tuple[int, int]]:
+    """Import a module in a fresh interpreter and return the import times.
+
+    Returns a dictionary of module names to the self and cumulative import
+    times in microseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # header line
+            continue
+        name = fields[2].strip()
+        times[name] = (int(fields[0]), int(fields[1]))
+    return times
+
+
+def test_import_time():
+    times = get_import_times("gramps_webapi.app")
+    slowest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)
+    report = "\n".join(
+        f"{self_us / 1e6:8.3f} s  {name}" for name, (self_us, _) in slowest[:20]
+    )
+    print(f"Slowest imports (self time):\n{report}")
+    eager = [name for name in LAZY_MODULES if name in times]
+    assert not eager, f"Imported at startup: {', '.join(eager)}"
+    cumulative = times["gramps_webapi.app"][1] / 1e6
+    assert (
+        cumulative < IMPORT_TIME_BUDGET
+    ), f"Importing the app took {cumulative:.2f} s\n{report}"
@@ -0,0 +1,72 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Tests for the `gramps_webapi.api.locales` module."""
+
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from gramps_webapi.api.locales import (
+    clear_locale_cache,
+    get_gramps_locale,
+    get_language_codes,
+    get_name_displayer,
+    get_relationship_calculator_for_locale,
+)
+from gramps_webapi.api.util import get_locale_for_language
+
+
+class TestLocaleCache(unittest.TestCase):
+    """Test the process-wide locale cache."""
+
+    def setUp(self):
+        clear_locale_cache()
+
+    def test_locale(self):
+        locale = get_gramps_locale("de_DE.UTF-8")
+        assert get_gramps_locale("de_DE.UTF-8") is locale
+        assert get_gramps_locale("fr_FR.UTF-8") is not locale
+        assert locale.translation.sgettext("Person") == "Person"
+        assert get_locale_for_language("de") is locale
+        assert get_locale_for_language("xx") is None
+        assert "de" in get_language_codes()
+
+    def test_threads(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            locales = list(
+                executor.map(lambda _: get_gramps_locale("da_DK.UTF-8"), range(32))
+            )
+        assert all(locale is locales[0] for locale in locales)
+
+    def test_name_displayer(self):
+        locale = get_gramps_locale("de_DE.UTF-8")
+        name_displayer = get_name_displayer(locale)
+        assert get_name_displayer(locale) is name_displayer
+        assert get_name_displayer() is not name_displayer
+
+    def test_relationship_calculator(self):
+        locale = get_gramps_locale("de_DE.UTF-8")
+        calc = get_relationship_calculator_for_locale(locale)
+        other_calc = get_relationship_calculator_for_locale(locale)
+        assert type(other_calc) is type(calc)
+        assert other_calc is not calc
+        english_calc = get_relationship_calculator_for_locale(
+            get_gramps_locale("en_GB.UTF-8")
+        )
+        assert type(english_calc) is not type(calc)
@@ -0,0 +1,60 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Unit tests for `gramps_webapi.api.media`."""
+
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from gramps.gen.db import DbTxn, DbWriteBase
+from gramps.gen.db.utils import make_database
+from gramps.gen.lib import Media
+
+from gramps_webapi.api import media
+from gramps_webapi.api.media import get_referenced_checksums
+
+
+class TestReferencedChecksums(unittest.TestCase):
+    """Test looking up the checksums referenced by media objects."""
+
+    def setUp(self) -> None:
+        self.dbdir = tempfile.mkdtemp()
+        self.db: DbWriteBase = make_database("sqlite")
+        self.db.load(self.dbdir)
+        with DbTxn("Add media", self.db) as trans:
+            for checksum in ["aaa", "bbb", "bbb"]:
+                obj = Media()
+                obj.set_checksum(checksum)
+                self.db.add_media(obj, trans)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.dbdir)
+
+    def test_referenced(self):
+        assert get_referenced_checksums(self.db, {"aaa", "ccc"}) == {"aaa"}
+        assert get_referenced_checksums(self.db, {"bbb"}) == {"bbb"}
+        assert get_referenced_checksums(self.db, {"ccc"}) == set()
+
+    def test_chunks(self):
+        checksums = {"aaa", "bbb", "ccc", "ddd"}
+        with patch.object(media, "CHECKSUM_QUERY_CHUNK_SIZE", 1):
+            assert get_referenced_checksums(self.db, checksums) == {"aaa", "bbb"}
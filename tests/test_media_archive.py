@@ -0,0 +1,132 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Unit tests for `gramps_webapi.api.media_archive`."""
+
+import threading
+import time
+import unittest
+import zipfile
+from io import BytesIO
+
+from gramps_webapi.api.media_archive import (
+    ArchiveEntry,
+    get_compress_type,
+    prefetch_entries,
+    stream_zip,
+)
+
+
+def make_entry(name, data, mime="text/plain"):
+    return ArchiveEntry(
+        arcname=name, mime=mime, open=lambda: BytesIO(data), size=len(data)
+    )
+
+
+class TestMediaArchive(unittest.TestCase):
+    """Test the media archive utilities."""
+
+    def test_compress_type(self):
+        assert get_compress_type("image/jpeg") == zipfile.ZIP_STORED
+        assert get_compress_type("video/mp4") == zipfile.ZIP_STORED
+        assert get_compress_type("text/plain") == zipfile.ZIP_DEFLATED
+        assert get_compress_type("image/tiff") == zipfile.ZIP_DEFLATED
+        assert get_compress_type("") == zipfile.ZIP_DEFLATED
+
+    def test_stream_zip(self):
+        entries = [
+            make_entry("a.txt", b"a" * 10000),
+            make_entry("dir/b.jpg", b"\xff\xd8" + b"b" * 5000, mime="image/jpeg"),
+            make_entry("empty.txt", b""),
+        ]
+        chunks = list(stream_zip(entries))
+        assert len(chunks) > 1
+        with zipfile.ZipFile(BytesIO(b"".join(chunks))) as zip_file:
+            assert zip_file.testzip() is None
+            assert zip_file.namelist() == ["a.txt", "dir/b.jpg", "empty.txt"]
+            assert zip_file.read("a.txt") == b"a" * 10000
+            assert zip_file.read("empty.txt") == b""
+            info_a = zip_file.getinfo("a.txt")
+            assert info_a.compress_type == zipfile.ZIP_DEFLATED
+            assert info_a.compress_size < info_a.file_size
+            info_b = zip_file.getinfo("dir/b.jpg")
+            assert info_b.compress_type == zipfile.ZIP_STORED
+
+    def test_prefetch_entries(self):
+        opened = []
+        lock = threading.Lock()
+
+        def make_open(i):
+            def _open():
+                time.sleep(0.01 * (5 - i))
+                with lock:
+                    opened.append(i)
+                return BytesIO(str(i).encode())
+
+            return _open
+
+        entries = [
+            ArchiveEntry(arcname=str(i), mime="text/plain", open=make_open(i))
+            for i in range(5)
+        ]
+        result = list(prefetch_entries(entries, max_workers=5, max_pending=3))
+        # order is preserved although files are opened in parallel
+        assert [entry.arcname for entry in result] == ["0", "1", "2", "3", "4"]
+        assert [entry.open().read() for entry in result] == [
+            b"0",
+            b"1",
+            b"2",
+            b"3",
+            b"4",
+        ]
+        assert sorted(opened) == [0, 1, 2, 3, 4]
+
+    def test_prefetch_entries_closed(self):
+        started = threading.Event()
+        release = threading.Event()
+        files = []
+
+        def make_open(i):
+            def _open():
+                if i > 0:
+                    started.set()
+                    release.wait()
+                fobj = BytesIO(str(i).encode())
+                files.append(fobj)
+                return fobj
+
+            return _open
+
+        entries = [
+            ArchiveEntry(arcname=str(i), mime="text/plain", open=make_open(i))
+            for i in range(3)
+        ]
+        result = prefetch_entries(entries, max_workers=2, max_pending=3)
+        first = next(result)
+        first.open().close()
+        started.wait()
+        # the consumer stops while the other files are still being opened
+        result.close()
+        release.set()
+        for _ in range(100):
+            if len(files) == 3 and all(fobj.closed for fobj in files):
+                break
+            time.sleep(0.01)
+        assert len(files) == 3
+        assert all(fobj.closed for fobj in files)
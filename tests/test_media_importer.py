@@ -25,24 +25,28 @@ import tempfile
 import zipfile
 from pathlib import Path
 from typing import List
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
+import boto3
 import pytest
 from gramps.cli.clidbman import CLIDbManager
 from gramps.gen.db import DbTxn
 from gramps.gen.dbstate import DbState
 from gramps.gen.lib import Media
+from moto import mock_s3
 
 from gramps_webapi.api.file import get_checksum
 from gramps_webapi.api.media import get_media_handler
 from gramps_webapi.api.media_importer import MediaImporter
 from gramps_webapi.api.resources.util import add_object
+from gramps_webapi.api.s3 import clear_s3_cache
 from gramps_webapi.app import create_app
 from gramps_webapi.auth import user_db
 from gramps_webapi.const import ENV_CONFIG_FILE, TEST_AUTH_CONFIG
 from gramps_webapi.dbmanager import WebDbManager
 
 ZIP_NAME = "file.zip"
+BUCKET = "test-media-importer"
 
 
 def create_zip(names, temp_dir, delete_files: bool = False) -> List[str]:
@@ -71,8 +75,8 @@ def create_media(db_handle, file_paths, checksums):
             add_object(db_handle, obj, trans)
 
 
-@pytest.fixture
-def setup():
+def make_setup(media_base_dir=None):
+    """Create a tree and an app and yield the tree, database and temp dir."""
     name = "Test MediaImporter"
     dbman = CLIDbManager(DbState())
     dirpath, _name = dbman.create_new_db_cli(name, dbid="sqlite")
@@ -85,7 +89,7 @@ def setup():
             config={
                 "TESTING": True,
                 "RATELIMIT_ENABLED": False,
-                "MEDIA_BASE_DIR": media_dir,
+                "MEDIA_BASE_DIR": media_base_dir or media_dir,
             }
         )
     with app.app_context():
@@ -97,6 +101,34 @@ def setup():
     shutil.rmtree(temp_dir)
 
 
+@pytest.fixture
+def setup():
+    yield from make_setup()
+
+
+@pytest.fixture
+def setup_s3():
+    with mock_s3():
+        clear_s3_cache()
+        boto3.resource("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        yield from make_setup(media_base_dir=f"s3://{BUCKET}")
+    clear_s3_cache()
+
+
+def spy_uploads(media_importer, fail_checksums=()):
+    """Replace the upload method by a mock recording the calls."""
+    upload_file = media_importer.media_handler.upload_file
+
+    def upload(stream, checksum, mime, path=None):
+        if checksum in fail_checksums:
+            raise OSError("Upload failed")
+        upload_file(stream, checksum, mime, path=path)
+
+    mock = MagicMock(side_effect=upload)
+    media_importer.media_handler.upload_file = mock
+    return mock
+
+
 def test_no_media(setup):
     """Test without media objects.
 
@@ -172,3 +204,58 @@ def test_mixed(setup):
     mi = MediaImporter(tree, "uid", db_handle, zip_file_name)
     result = mi()
     assert result == {"missing": 4, "uploaded": 2, "failures": 0}
+
+
+def test_same_checksum_s3(setup_s3):
+    """Test several objects with the same file on object storage.
+
+    The file is stored by checksum, so it is uploaded once."""
+    tree, db_handle, temp_dir = setup_s3
+    checksums = create_zip(["f1.jpg"], temp_dir)
+    create_media(db_handle, ["f1.jpg", "copy/f1.jpg"], checksums * 2)
+    zip_file_name = os.path.join(temp_dir, ZIP_NAME)
+    mi = MediaImporter(tree, "uid", db_handle, zip_file_name)
+    assert mi.media_handler.content_addressed
+    upload = spy_uploads(mi)
+    result = mi()
+    assert result == {"missing": 1, "uploaded": 1, "failures": 0}
+    assert upload.call_count == 1
+    assert mi.media_handler.get_remote_keys() == set(checksums)
+
+
+def test_same_checksum_local(setup):
+    """Test several objects with the same file on local storage.
+
+    The file is stored by path, so it is uploaded once per distinct path."""
+    tree, db_handle, temp_dir = setup
+    checksums = create_zip(["f1.jpg"], temp_dir)
+    paths = ["f1.jpg", "copy/f1.jpg", "copy/f1.jpg"]
+    create_media(db_handle, paths, checksums * 3)
+    zip_file_name = os.path.join(temp_dir, ZIP_NAME)
+    mi = MediaImporter(tree, "uid", db_handle, zip_file_name)
+    upload = spy_uploads(mi)
+    result = mi()
+    assert result == {"missing": 1, "uploaded": 1, "failures": 0}
+    assert sorted(call.kwargs["path"] for call in upload.call_args_list) == [
+        "copy/f1.jpg",
+        "f1.jpg",
+    ]
+    for path in paths:
+        with open(os.path.join(temp_dir, "media", path), "rb") as f:
+            assert get_checksum(f) == checksums[0]
+
+
+def test_failed_upload(setup):
+    """Test that a failing upload is counted and the others succeed."""
+    tree, db_handle, temp_dir = setup
+    files = ["f1.jpg", "subfolder/f2.jpg"]
+    checksums = create_zip(files, temp_dir)
+    create_media(db_handle, files, checksums)
+    zip_file_name = os.path.join(temp_dir, ZIP_NAME)
+    mi = MediaImporter(tree, "uid", db_handle, zip_file_name)
+    spy_uploads(mi, fail_checksums=[checksums[1]])
+    result = mi()
+    assert result == {"missing": 2, "uploaded": 1, "failures": 1}
+    assert mi.failed_checksums == {checksums[1]}
+    assert os.path.exists(os.path.join(temp_dir, "media", files[0]))
+    assert not os.path.exists(os.path.join(temp_dir, "media", files[1]))
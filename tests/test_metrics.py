@@ -0,0 +1,138 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Tests for the metrics."""
+
+import os
+import unittest
+from unittest.mock import patch
+
+from gramps.cli.clidbman import CLIDbManager
+from gramps.gen.dbstate import DbState
+
+from gramps_webapi.app import create_app
+from gramps_webapi.auth import add_user, user_db
+from gramps_webapi.auth.const import ROLE_OWNER
+from gramps_webapi.const import ENV_CONFIG_FILE, TEST_AUTH_CONFIG
+from gramps_webapi.util.metrics import (
+    Counter,
+    Histogram,
+    enable_metrics,
+    metrics_enabled,
+)
+
+
+class TestMetrics(unittest.TestCase):
+    """Test cases for the metric types."""
+
+    def tearDown(self):
+        enable_metrics(False)
+
+    def test_disabled(self):
+        enable_metrics(False)
+        counter = Counter("test_disabled", "Test counter.", ["result"])
+        histogram = Histogram("test_disabled_seconds", "Test histogram.")
+        counter.inc(result="hit")
+        with histogram.time():
+            pass
+        assert counter.get(result="hit") == 0
+        assert histogram.get_count() == 0
+
+    def test_render(self):
+        enable_metrics()
+        counter = Counter("test_lookups", "Test counter.", ["result"])
+        histogram = Histogram("test_seconds", "Test histogram.", buckets=[0.1, 1])
+        counter.inc(result="hit")
+        counter.inc(2, result='mi"ss')
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        assert counter.render() == (
+            "# HELP test_lookups Test counter.\n"
+            "# TYPE test_lookups counter\n"
+            'test_lookups_total{result="hit"} 1.0\n'
+            'test_lookups_total{result="mi\\"ss"} 2.0\n'
+        )
+        assert histogram.render() == (
+            "# HELP test_seconds Test histogram.\n"
+            "# TYPE test_seconds histogram\n"
+            'test_seconds_bucket{le="0.1"} 1.0\n'
+            'test_seconds_bucket{le="1.0"} 2.0\n'
+            'test_seconds_bucket{le="+Inf"} 3.0\n'
+            "test_seconds_sum 5.55\n"
+            "test_seconds_count 3.0\n"
+        )
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+    """Test cases for the /metrics endpoint."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.name = "Test Web API"
+        cls.dbman = CLIDbManager(DbState())
+        dbpath, _name = cls.dbman.create_new_db_cli(cls.name, dbid="sqlite")
+        tree = os.path.basename(dbpath)
+        with patch.dict("os.environ", {ENV_CONFIG_FILE: TEST_AUTH_CONFIG}):
+            cls.app = create_app(
+                config={
+                    "TESTING": True,
+                    "RATELIMIT_ENABLED": False,
+                    "METRICS_ENABLED": True,
+                }
+            )
+            cls.client = cls.app.test_client()
+        with cls.app.app_context():
+            user_db.create_all()
+            add_user(name="owner", password="123", role=ROLE_OWNER, tree=tree)
+
+    @classmethod
+    def tearDownClass(cls):
+        enable_metrics(False)
+        cls.dbman.remove_database(cls.name)
+
+    def test_metrics(self):
+        assert metrics_enabled()
+        rv = self.client.post(
+            "/api/token/", json={"username": "owner", "password": "123"}
+        )
+        assert rv.status_code == 200
+        token = rv.json["access_token"]
+        rv = self.client.get(
+            "/api/people/", headers={"Authorization": f"Bearer {token}"}
+        )
+        assert rv.status_code == 200
+        rv = self.client.get("/metrics")
+        assert rv.status_code == 200
+        assert rv.mimetype == "text/plain"
+        text = rv.get_data(as_text=True)
+        assert (
+            'gramps_webapi_request_duration_seconds_count{endpoint="api.people",'
+            'method="GET",status="200"} 1.0'
+        ) in text
+        assert 'gramps_webapi_db_open_duration_seconds_count{mode="read"}' in text
+        assert "gramps_webapi_db_close_duration_seconds_count" in text
+
+    def test_metrics_disabled(self):
+        with patch.dict("os.environ", {ENV_CONFIG_FILE: TEST_AUTH_CONFIG}):
+            app = create_app(config={"TESTING": True, "RATELIMIT_ENABLED": False})
+        enable_metrics()
+        rv = app.test_client().get("/metrics")
+        # served by the single page app route instead
+        assert "gramps_webapi" not in rv.get_data(as_text=True)
@@ -0,0 +1,109 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Tests for the local cache of original media files on object storage."""
+
+import shutil
+import tempfile
+import threading
+import time
+
+import boto3
+import pytest
+from moto import mock_s3
+
+from gramps_webapi.api.original_cache import (
+    OriginalCache,
+    get_original_cache_stats,
+    reset_original_cache_stats,
+)
+
+BUCKET = "test-s3-bucket"
+
+
+@pytest.fixture
+def cache():
+    base_dir = tempfile.mkdtemp()
+    reset_original_cache_stats()
+    yield OriginalCache(base_dir=base_dir, max_bytes=10000)
+    shutil.rmtree(base_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def client():
+    with mock_s3():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        client.put_object(Bucket=BUCKET, Key="abcdef", Body=b"original")
+        yield client
+
+
+def test_download_once(cache, client):
+    def download(f):
+        client.download_fileobj(BUCKET, "abcdef", f)
+
+    for _ in range(3):
+        with cache.get("abcdef", download) as fobj:
+            assert fobj.read() == b"original"
+    assert get_original_cache_stats() == {"hits": 2, "misses": 1}
+
+
+def test_single_flight(cache):
+    calls = []
+
+    def download(f):
+        calls.append(1)
+        time.sleep(0.2)
+        f.write(b"original")
+
+    results = []
+
+    def get():
+        with cache.get("abcdef", download) as fobj:
+            results.append(fobj.read())
+
+    threads = [threading.Thread(target=get) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [b"original"] * 5
+    assert get_original_cache_stats() == {"hits": 4, "misses": 1}
+
+
+def test_failed_download(cache):
+    def download(f):
+        raise OSError("Download failed")
+
+    with pytest.raises(OSError):
+        cache.get("abcdef", download)
+    assert not cache.exists("abcdef")
+    with cache.get("abcdef", lambda f: f.write(b"original")) as fobj:
+        assert fobj.read() == b"original"
+
+
+def test_evict(cache):
+    for i in range(5):
+        with cache.get(f"checksum{i}", lambda f: f.write(b"x" * 3000)):
+            pass
+        # files are evicted in the background
+        cache.wait()
+    assert cache._get_total_size() <= 9000
+    assert cache.exists("checksum4")
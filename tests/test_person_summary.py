@@ -0,0 +1,186 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Unit tests for `gramps_webapi.person_summary`."""
+
+import shutil
+import tempfile
+import unittest
+
+from gramps.gen.db import DbTxn, DbWriteBase
+from gramps.gen.db.utils import make_database
+from gramps.gen.lib import Date, Event, EventRef, EventType, Person, Surname
+from sqlalchemy import delete
+
+from gramps_webapi.api.resources.sort import sort_objects
+from gramps_webapi.api.sorted_handles import clear_sorted_handles_cache
+from gramps_webapi.person_summary import PersonSummary
+from gramps_webapi.undodb import DbUndoSQLWeb, migrate
+
+
+def make_person(surname: str, first_name: str) -> Person:
+    """Make a person with a primary name."""
+    person = Person()
+    name = person.get_primary_name()
+    name.set_first_name(first_name)
+    surname_obj = Surname()
+    surname_obj.set_surname(surname)
+    name.set_surname_list([surname_obj])
+    return person
+
+
+class TestPersonSummary(unittest.TestCase):
+    """Test the materialized person summary table."""
+
+    def setUp(self) -> None:
+        self.dbdir = tempfile.mkdtemp()
+        self.db: DbWriteBase = make_database("sqlite")
+
+        def create_undo_manager():
+            path = self.db.undolog
+            return DbUndoSQLWeb(grampsdb=self.db, dburl=f"sqlite:///{path}")
+
+        self.db._create_undo_manager = create_undo_manager
+        self.db.load(self.dbdir)
+        self.summary = self.db.get_undodb().person_summary
+
+        with DbTxn("Add test people", self.db) as trans:
+            self.handles = [
+                self.db.add_person(make_person("Smith", "John"), trans),
+                self.db.add_person(make_person("Adams", "Anna"), trans),
+                self.db.add_person(make_person("Miller", "Zoe"), trans),
+            ]
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.dbdir)
+
+    def _get_summaries(self):
+        return self.summary.get_sort_values(["surname", "surname_key", "birth_sortval"])
+
+    def test_added(self):
+        assert self.summary.count() == 3
+        summaries = self._get_summaries()
+        assert set(summaries) == set(self.handles)
+        assert summaries[self.handles[0]] == {
+            "surname": "Smith",
+            "surname_key": "SmithJohn",
+            "birth_sortval": 0,
+        }
+
+    def test_modify_delete_undo(self):
+        person = self.db.get_person_from_handle(self.handles[0])
+        person.get_primary_name().get_primary_surname().set_surname("Baker")
+        with DbTxn("Modify person", self.db) as trans:
+            self.db.commit_person(person, trans)
+        assert self._get_summaries()[self.handles[0]]["surname"] == "Baker"
+        with DbTxn("Delete person", self.db) as trans:
+            self.db.remove_person(self.handles[1], trans)
+        assert self.summary.count() == 2
+        self.db.undo()
+        assert self.summary.count() == 3
+        self.db.undo()
+        assert self._get_summaries()[self.handles[0]]["surname"] == "Smith"
+
+    def test_event_change(self):
+        person = self.db.get_person_from_handle(self.handles[2])
+        event = Event()
+        event.set_type(EventType.BIRTH)
+        event.set_date_object(Date(1900, 1, 1))
+        with DbTxn("Add birth", self.db) as trans:
+            event_handle = self.db.add_event(event, trans)
+            event_ref = EventRef()
+            event_ref.ref = event_handle
+            person.add_event_ref(event_ref)
+            person.set_birth_ref(event_ref)
+            self.db.commit_person(person, trans)
+        sortval = self._get_summaries()[self.handles[2]]["birth_sortval"]
+        assert sortval == Date(1900, 1, 1).get_sort_value()
+        event = self.db.get_event_from_handle(event_handle)
+        event.set_date_object(Date(1800, 1, 1))
+        with DbTxn("Modify birth", self.db) as trans:
+            self.db.commit_event(event, trans)
+        sortval = self._get_summaries()[self.handles[2]]["birth_sortval"]
+        assert sortval == Date(1800, 1, 1).get_sort_value()
+
+    def test_migrate(self):
+        with self.summary.SQLSession() as session:
+            session.execute(delete(PersonSummary))
+            session.commit()
+        assert self.summary.count() == 0
+        migrate(self.db.get_undodb())
+        assert self.summary.count() == 3
+
+    def test_sort_incomplete(self):
+        with self.summary.SQLSession() as session:
+            session.execute(
+                delete(PersonSummary).where(PersonSummary.handle == self.handles[1])
+            )
+            session.commit()
+        people = [self.db.get_person_from_handle(handle) for handle in self.handles]
+        people = sort_objects(self.db, "Person", people, ["surname"])
+        assert [person.handle for person in people] == [
+            self.handles[1],
+            self.handles[2],
+            self.handles[0],
+        ]
+
+    def test_sort(self):
+        people = [self.db.get_person_from_handle(handle) for handle in self.handles]
+        people = sort_objects(self.db, "Person", people, ["surname"])
+        assert [person.handle for person in people] == [
+            self.handles[1],
+            self.handles[2],
+            self.handles[0],
+        ]
+        people = sort_objects(self.db, "Person", people, ["-name"])
+        assert [person.handle for person in people] == [
+            self.handles[0],
+            self.handles[2],
+            self.handles[1],
+        ]
+
+    def test_batch_stale(self):
+        with DbTxn("Add person in batch", self.db, batch=True) as trans:
+            self.db.add_person(make_person("Clark", "Carl"), trans)
+        # batch transactions only mark the table as stale
+        assert self.summary.count() == 0
+        self.db.get_undodb().ensure_person_summary()
+        assert self.summary.count() == 4
+
+    def test_sort_ranks(self):
+        clear_sorted_handles_cache()
+        people = [self.db.get_person_from_handle(handle) for handle in self.handles]
+        people = sort_objects(self.db, "Person", people, ["surname"], tree_id="tree")
+        assert [person.handle for person in people] == [
+            self.handles[1],
+            self.handles[2],
+            self.handles[0],
+        ]
+        person = self.db.get_person_from_handle(self.handles[0])
+        person.get_primary_name().get_primary_surname().set_surname("Baker")
+        with DbTxn("Modify person", self.db) as trans:
+            self.db.commit_person(person, trans)
+        people = [self.db.get_person_from_handle(handle) for handle in self.handles]
+        people = sort_objects(self.db, "Person", people, ["surname"], tree_id="tree")
+        assert [person.handle for person in people] == [
+            self.handles[1],
+            self.handles[0],
+            self.handles[2],
+        ]
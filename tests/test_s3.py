@@ -21,14 +21,18 @@
 
 import os
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import boto3
 import pytest
 from moto import mock_s3
 
 from gramps_webapi.api.media import MediaHandler
-from gramps_webapi.api.s3 import get_object_keys_size
+from gramps_webapi.api.s3 import (
+    get_client,
+    get_object_keys_size,
+    get_presigned_url_cached,
+)
 from .test_endpoints.test_upload import get_image
 
 
@@ -80,3 +84,37 @@ def test_upload_prefix(bucket):
         get_object_keys_size(handler.bucket_name, "mytree", handler.endpoint_url).keys()
     )
     assert sorted(keys) == sorted([f"mytree/{checksum}", f"mytree/{checksum2}"])
+
+
+def test_client_shared(bucket):
+    client = get_client()
+    assert get_client() is client
+    assert get_client("http://localhost:9000") is not client
+    handler = MediaHandler(URL)
+    img, checksum, size = get_image(0)
+    handler.upload_file(img, checksum, "image/jpeg")
+    assert handler.get_remote_keys() == {checksum}
+
+
+def test_presigned_url_cached(bucket):
+    client = get_client()
+    params = {"Bucket": BUCKET, "Key": "abc", "ResponseContentType": "image/jpeg"}
+    url = get_presigned_url_cached(client, params, expires_in=3600)
+    assert url
+    assert get_presigned_url_cached(client, params, expires_in=3600) == url
+    params_download = {**params, "ResponseContentDisposition": "attachment"}
+    assert get_presigned_url_cached(client, params_download, expires_in=3600) != url
+
+
+def test_presigned_url_expired():
+    client = MagicMock()
+    client.meta.endpoint_url = "http://s3.test"
+    client.generate_presigned_url.side_effect = ["url1", "url2"]
+    params = {"Bucket": BUCKET, "Key": "expired"}
+    with patch("gramps_webapi.api.s3.time.monotonic", return_value=0):
+        assert get_presigned_url_cached(client, params, expires_in=100) == "url1"
+    with patch("gramps_webapi.api.s3.time.monotonic", return_value=40):
+        assert get_presigned_url_cached(client, params, expires_in=100) == "url1"
+    # URLs are not reused once their reuse period has passed
+    with patch("gramps_webapi.api.s3.time.monotonic", return_value=60):
+        assert get_presigned_url_cached(client, params, expires_in=100) == "url2"
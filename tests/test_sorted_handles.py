@@ -0,0 +1,131 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Unit tests for `gramps_webapi.api.sorted_handles`."""
+
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from gramps.gen.db import DbTxn, DbWriteBase
+from gramps.gen.db.utils import make_database
+from gramps.gen.lib import Name, Person, Source, Surname
+
+from gramps_webapi.api import sorted_handles
+from gramps_webapi.api.sorted_handles import (
+    clear_sorted_handles_cache,
+    get_sorted_handle_index,
+)
+from gramps_webapi.undodb import DbUndoSQLWeb
+
+
+class TestSortedHandles(unittest.TestCase):
+    """Test the cached default sort order."""
+
+    def setUp(self) -> None:
+        clear_sorted_handles_cache()
+        self.dbdir = tempfile.mkdtemp()
+        self.db: DbWriteBase = make_database("sqlite")
+
+        def create_undo_manager():
+            path = self.db.undolog
+            return DbUndoSQLWeb(grampsdb=self.db, dburl=f"sqlite:///{path}")
+
+        self.db._create_undo_manager = create_undo_manager
+        self.db.load(self.dbdir)
+        self.undodb = self.db.get_undodb()
+
+        with DbTxn("Add test sources", self.db) as trans:
+            self.handles = []
+            for title in ["B", "C", "A"]:
+                source = Source()
+                source.set_title(title)
+                self.handles.append(self.db.add_source(source, trans))
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.dbdir)
+
+    def _get_sorted_handles(self):
+        handle_index = get_sorted_handle_index(self.db, "Source", tree_id="tree")
+        return sorted(handle_index, key=handle_index.get)
+
+    def test_sort_generation(self):
+        assert self.undodb.get_sort_generation("Source") == 1
+        assert self.undodb.get_sort_generation("Note") == 0
+        source = self.db.get_source_from_handle(self.handles[0])
+        source.set_author("Author")
+        with DbTxn("Modify source author", self.db) as trans:
+            self.db.commit_source(source, trans)
+        assert self.undodb.get_sort_generation("Source") == 1
+        source.set_title("D")
+        with DbTxn("Modify source title", self.db) as trans:
+            self.db.commit_source(source, trans)
+        assert self.undodb.get_sort_generation("Source") == 2
+        self.db.undo()
+        assert self.undodb.get_sort_generation("Source") == 3
+
+    def test_cached_order(self):
+        handles = self._get_sorted_handles()
+        assert handles == [self.handles[2], self.handles[0], self.handles[1]]
+        assert get_sorted_handle_index(
+            self.db, "Source", tree_id="tree"
+        ) is get_sorted_handle_index(self.db, "Source", tree_id="tree")
+        source = self.db.get_source_from_handle(self.handles[2])
+        source.set_title("Z")
+        with DbTxn("Modify source title", self.db) as trans:
+            self.db.commit_source(source, trans)
+        handles = self._get_sorted_handles()
+        assert handles == [self.handles[0], self.handles[1], self.handles[2]]
+
+    def test_given_name_change(self):
+        with DbTxn("Add test people", self.db) as trans:
+            person_handles = []
+            for first_name in ["Anna", "Berta"]:
+                person = Person()
+                name = Name()
+                name.set_first_name(first_name)
+                surname = Surname()
+                surname.set_surname("Smith")
+                name.add_surname(surname)
+                person.set_primary_name(name)
+                person_handles.append(self.db.add_person(person, trans))
+        handle_index = get_sorted_handle_index(self.db, "Person", tree_id="tree")
+        assert sorted(handle_index, key=handle_index.get) == person_handles
+        person_generation = self.undodb.get_sort_generation("Person")
+        family_generation = self.undodb.get_sort_generation("Family")
+        person = self.db.get_person_from_handle(person_handles[0])
+        person.get_primary_name().set_first_name("Clara")
+        with DbTxn("Modify given name", self.db) as trans:
+            self.db.commit_person(person, trans)
+        assert self.undodb.get_sort_generation("Person") == person_generation + 1
+        assert self.undodb.get_sort_generation("Family") == family_generation + 1
+        handle_index = get_sorted_handle_index(self.db, "Person", tree_id="tree")
+        assert sorted(handle_index, key=handle_index.get) == person_handles[::-1]
+
+    def test_cache_max_handles(self):
+        with patch.object(sorted_handles, "SORTED_HANDLES_CACHE_MAX_HANDLES", 4):
+            first = get_sorted_handle_index(self.db, "Source", tree_id="tree")
+            assert get_sorted_handle_index(self.db, "Source", tree_id="tree") is first
+            # a second tree exceeds the total number of handles
+            get_sorted_handle_index(self.db, "Source", tree_id="other")
+            assert (
+                get_sorted_handle_index(self.db, "Source", tree_id="tree") is not first
+            )
@@ -0,0 +1,58 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Tests for the synthetic tree generator."""
+
+import shutil
+import tempfile
+import unittest
+
+from gramps.gen.db.utils import make_database
+
+from gramps_webapi.synthetic import generate_tree
+
+
+def generate_people(num_people: int, seed: int):
+    """Generate a tree and return the people's handles, IDs and names."""
+    dbdir = tempfile.mkdtemp()
+    db = make_database("sqlite")
+    db.load(dbdir)
+    try:
+        counts = generate_tree(db, num_people, seed=seed)
+        assert counts["Person"] == db.get_number_of_people()
+        return sorted(
+            (person.handle, person.gramps_id, person.get_primary_name().first_name)
+            for person in db.iter_people()
+        )
+    finally:
+        db.close()
+        shutil.rmtree(dbdir)
+
+
+class TestSyntheticTree(unittest.TestCase):
+    """Test cases for the synthetic tree generator."""
+
+    def test_number_of_people(self):
+        """Test that the requested number of people is generated."""
+        assert len(generate_people(300, seed=0)) == 300
+
+    def test_deterministic(self):
+        """Test that the same seed generates the same tree."""
+        assert generate_people(100, seed=1) == generate_people(100, seed=1)
+        assert generate_people(100, seed=1) != generate_people(100, seed=2)
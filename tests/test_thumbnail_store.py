@@ -0,0 +1,96 @@
+#
+# Gramps Web API - A RESTful API for the Gramps genealogy program
+#
+# Copyright (C) 2025      David Straub
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+#
+
+"""Unit tests for `gramps_webapi.api.thumbnail_store`."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from io import BytesIO
+
+from gramps_webapi.api.thumbnail_store import ThumbnailStore
+
+
+class TestThumbnailStore(unittest.TestCase):
+    """Test the content-addressed thumbnail store."""
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.store = ThumbnailStore(base_dir=self.base_dir, max_bytes=1000)
+
+    def tearDown(self):
+        self.store.clear()
+        shutil.rmtree(self.base_dir, ignore_errors=True)
+
+    def test_make_key(self):
+        key = ThumbnailStore.make_key("abcdef", 200, square=True, crop=(0, 10, 50, 60))
+        assert "200_crop-0-10-50-60_square" in key
+        assert ThumbnailStore.make_key("abcdef") != ThumbnailStore.make_key(
+            "abcdef", 200
+        )
+        # thumbnails are not shared between trees or files
+        assert ThumbnailStore.make_key("abcdef", tree="a") != ThumbnailStore.make_key(
+            "abcdef", tree="b"
+        )
+        assert ThumbnailStore.make_key(
+            "abcdef", tree="a", path="x.jpg"
+        ) != ThumbnailStore.make_key("abcdef", tree="a", path="y.jpg")
+
+    def test_put_open(self):
+        key = ThumbnailStore.make_key("abcdef", 100)
+        assert not self.store.exists(key)
+        assert self.store.open(key) is None
+        self.store.put(key, BytesIO(b"thumbnail"))
+        assert self.store.exists(key)
+        fobj = self.store.open(key)
+        assert fobj is not None
+        with fobj:
+            assert fobj.read() == b"thumbnail"
+        # no temporary files are left behind
+        for _, _, files in os.walk(self.base_dir):
+            assert all(name.endswith(".jpg") for name in files)
+
+    def test_key_outside_store(self):
+        key = ThumbnailStore.make_key("../../../../escaped", 100)
+        self.store.put(key, BytesIO(b"thumbnail"))
+        path = os.path.realpath(self.store._get_path(key))
+        assert path.startswith(os.path.realpath(self.base_dir) + os.sep)
+        assert self.store.exists(key)
+
+    def test_evict(self):
+        large_store = ThumbnailStore(base_dir=self.base_dir, max_bytes=10000)
+        keys = [ThumbnailStore.make_key(f"checksum{i}", 100) for i in range(5)]
+        for i, key in enumerate(keys):
+            large_store.put(key, BytesIO(b"x" * 300))
+            # the size is determined in the background after the first put
+            large_store.wait()
+            # ensure distinct modification times
+            os.utime(large_store._get_path(key), (i, i))
+        # the first key is used again, so it is not the least recently used
+        fobj = self.store.open(keys[0])
+        assert fobj is not None
+        fobj.close()
+        self.store.put("checksum5_100", BytesIO(b"x" * 300))
+        self.store.wait()
+        assert self.store._get_total_size() <= 900
+        assert self.store.exists(keys[0])
+        assert self.store.exists("checksum5_100")
+        assert not self.store.exists(keys[1])
+        assert self.store.exists(keys[4])